@@ -2,13 +2,11 @@
 
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
-from flask_bcrypt import Bcrypt
 from flask_jwt_extended import JWTManager
 from config import Config
 
 # Initialize extensions without the app first
 db = SQLAlchemy()
-bcrypt = Bcrypt()
 jwt = JWTManager()
 
 def create_app(config_class=Config):
@@ -17,7 +15,6 @@ def create_app(config_class=Config):
 
     # Initialize extensions with app
     db.init_app(app)
-    bcrypt.init_app(app)
     jwt.init_app(app)
 
     # Register blueprints
@@ -1,26 +1,56 @@
 # app/__init__.py
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
-from flask_bcrypt import Bcrypt
 from flask_jwt_extended import JWTManager
 from flask_migrate import Migrate
 from config import Config
+from app import database
+from app.predict import validation
+from app.metrics import Metrics
+from app.profiling import Profiler
+from app.predict.registry import ModelRegistry
+from app.predict.batching import MicroBatcher
+from app.predict.cache import PredictionCache
+from app.predict.audit import AuditLog
+from app.workers import WorkerPool
+from app.auth.cache import IdentityCache, UserCache
+from app.auth.passwords import PasswordHasher
 
 # Initialize extensions without the app first
 db = SQLAlchemy()
-bcrypt = Bcrypt()
 jwt = JWTManager()
 migrate = Migrate()
+model_registry = ModelRegistry()
+prediction_batcher = MicroBatcher()
+prediction_cache = PredictionCache()
+audit_log = AuditLog()
+worker_pool = WorkerPool()
+identity_cache = IdentityCache()
+user_cache = UserCache()
+password_hasher = PasswordHasher()
+metrics = Metrics()
+profiler = Profiler()
 
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
     
     # Initialize extensions with app
+    metrics.init_app(app)  # Per-stage latency histograms served at /metrics
+    profiler.init_app(app)  # On-demand sampling profiles, started by an admin
+    database.init_app(app)  # Engine pool options; SQLite gets WAL via a connect hook
+    validation.init_app(app)  # orjson for request/response bodies when installed (JSON_CODEC)
     db.init_app(app)
-    bcrypt.init_app(app)
     jwt.init_app(app)
     migrate.init_app(app, db)  # Initialize Flask-Migrate
+    model_registry.init_app(app)  # Loads the model now unless MODEL_LOAD_MODE is 'lazy'
+    prediction_batcher.init_app(app)
+    prediction_cache.init_app(app)
+    audit_log.init_app(app)  # Background writer for the prediction audit trail
+    worker_pool.init_app(app)  # Process pool for scoring and bcrypt (WORKER_POOL_SIZE)
+    password_hasher.init_app(app, worker_pool)  # Sets (or calibrates) the bcrypt cost
+    identity_cache.init_app(app)
+    user_cache.init_app(app)
     
     # Register blueprints
     from app.auth.routes import auth_bp
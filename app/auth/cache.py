@@ -0,0 +1,100 @@
+# app/auth/cache.py
+from collections import namedtuple
+
+from sqlalchemy import event
+
+from app.cache import TTLCache
+
+# Detached copy of the User columns needed to log in, safe to share across requests
+CachedUser = namedtuple('CachedUser', ['id', 'username', 'email', 'password', 'role'])
+
+class IdentityCache:
+    """Verified JWT identities keyed by the token's jti.
+
+    An entry also stores a digest of the full token, so a hit only counts for
+    the exact token that was verified before; it never outlives the token's
+    own expiry.
+    """
+
+    def __init__(self, app=None):
+        self._cache = TTLCache()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self._cache = TTLCache(
+            max_entries=app.config['AUTH_IDENTITY_CACHE_SIZE'],
+            ttl=app.config['AUTH_IDENTITY_CACHE_TTL']
+        )
+        app.extensions['identity_cache'] = self
+
+    def get(self, jti):
+        return self._cache.get(jti)
+
+    def set(self, jti, entry, ttl):
+        if ttl > 0:
+            self._cache.set(jti, entry, ttl=min(ttl, self._cache.ttl or ttl))
+
+    def stats(self):
+        return self._cache.stats()
+
+class UserCache:
+    """Login lookups of User rows by username or email.
+
+    Rows are cached as CachedUser tuples. Inserts, updates (e.g. a role
+    change) and deletes of User rows invalidate the cache through SQLAlchemy
+    mapper events; the TTL bounds staleness caused by other processes.
+    """
+
+    def __init__(self, app=None):
+        self._cache = TTLCache()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        from app.models.user import User
+
+        self._cache = TTLCache(
+            max_entries=app.config['AUTH_USER_CACHE_SIZE'],
+            ttl=app.config['AUTH_USER_CACHE_TTL']
+        )
+        app.extensions['user_cache'] = self
+
+        for name, listener in (('after_insert', self._on_insert),
+                               ('after_update', self._on_change),
+                               ('after_delete', self._on_change)):
+            if not event.contains(User, name, listener):
+                event.listen(User, name, listener)
+
+    def lookup(self, field, value, query):
+        """Return the CachedUser for a lowercased username/email, calling query() on a miss"""
+        key = (field, value)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+
+        user = query()
+        if user is None:
+            return None
+        cached = CachedUser(user.id, user.username, user.email, user.password, user.role)
+        self._cache.set(key, cached)
+        return cached
+
+    def invalidate(self, username=None, email=None):
+        if username is not None:
+            self._cache.pop(('username', username.lower()))
+        if email is not None:
+            self._cache.pop(('email', email.lower()))
+
+    def clear(self):
+        self._cache.clear()
+
+    def _on_insert(self, mapper, connection, target):
+        self.invalidate(target.username, target.email)
+
+    def _on_change(self, mapper, connection, target):
+        # Old username/email values are not at hand here, so start afresh
+        self.clear()
+
+    def stats(self):
+        return self._cache.stats()
@@ -0,0 +1,74 @@
+# app/auth/decorators.py
+import base64
+import hashlib
+import hmac
+import json
+import time
+from functools import wraps
+
+from flask import g, jsonify, request
+from flask_jwt_extended import get_jwt, get_jwt_identity, verify_jwt_in_request
+
+from app import identity_cache
+from app.metrics import stage
+
+def _bearer_token():
+    header = request.headers.get('Authorization', '')
+    parts = header.split()
+    if len(parts) == 2 and parts[0] == 'Bearer':
+        return parts[1]
+    return None
+
+def _peek_jti(token):
+    """Read the jti claim without verifying; only used as a cache key"""
+    try:
+        payload = token.split('.')[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+        return claims.get('jti')
+    except (IndexError, ValueError, AttributeError):
+        return None
+
+def current_identity():
+    """Return the JWT identity of the request, decoding the token at most once.
+
+    A token seen before is recognised by its jti and full-token digest and
+    answered from the identity cache; otherwise flask_jwt_extended verifies
+    it (raising its usual 401/422 errors) and the result is cached.
+    """
+    if 'current_user' in g:
+        return g.current_user
+
+    token = _bearer_token()
+    jti = _peek_jti(token) if token else None
+    digest = hashlib.sha256(token.encode()).digest() if token else None
+
+    if jti:
+        entry = identity_cache.get(jti)
+        if entry is not None:
+            cached_digest, identity, expires = entry
+            if hmac.compare_digest(cached_digest, digest) and expires > time.time():
+                g.current_user = identity
+                return identity
+
+    verify_jwt_in_request()
+    claims = get_jwt()
+    identity = get_jwt_identity()
+    if token and claims.get('jti'):
+        expires = claims.get('exp', time.time())
+        identity_cache.set(claims['jti'], (digest, identity, expires), ttl=expires - time.time())
+
+    g.current_user = identity
+    return identity
+
+def role_required(*roles):
+    """Require a valid JWT whose identity has one of `roles`"""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage('jwt'):
+                identity = current_identity()
+            if not isinstance(identity, dict) or identity.get("role") not in roles:
+                return jsonify({"error": "Unauthorized access"}), 403
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,111 @@
+# app/auth/passwords.py
+import contextlib
+import math
+import re
+import threading
+import time
+
+import bcrypt as bcrypt_lib
+
+# $2b$12$... -> cost 12
+_COST_PATTERN = re.compile(r'^\$2[abxy]?\$(\d{2})\$')
+
+def hash_cost(pw_hash):
+    """Return the bcrypt cost factor stored in a hash, or None if it is not bcrypt"""
+    match = _COST_PATTERN.match(pw_hash or '')
+    return int(match.group(1)) if match else None
+
+# bcrypt only uses the first 72 bytes; bcrypt >= 5 raises on longer input
+# instead of truncating, so truncate here to match hashes made before
+MAX_PASSWORD_BYTES = 72
+
+def hash_password(password, rounds):
+    """bcrypt hash of `password` at cost `rounds`, as text"""
+    return bcrypt_lib.hashpw(password.encode('utf-8')[:MAX_PASSWORD_BYTES],
+                             bcrypt_lib.gensalt(rounds=rounds)).decode('utf-8')
+
+def check_password(pw_hash, password):
+    try:
+        return bcrypt_lib.checkpw(password.encode('utf-8')[:MAX_PASSWORD_BYTES], pw_hash.encode('utf-8'))
+    except ValueError:
+        # Not a bcrypt hash
+        return False
+
+class PasswordHasherBusy(Exception):
+    """Raised when no hashing slot frees up within BCRYPT_WAIT_TIMEOUT"""
+
+def calibrate_rounds(target_ms, min_rounds, max_rounds, sample_rounds=8):
+    """Pick the cost whose hash time on this machine is closest to target_ms.
+
+    Each extra round doubles the work, so one timing at a cheap cost is
+    enough to extrapolate.
+    """
+    salt = bcrypt_lib.gensalt(rounds=sample_rounds)
+    start = time.perf_counter()
+    bcrypt_lib.hashpw(b'calibration', salt)
+    sample_ms = (time.perf_counter() - start) * 1000.0
+
+    rounds = sample_rounds + round(math.log2(max(target_ms, 1e-3) / max(sample_ms, 1e-3)))
+    return max(min_rounds, min(max_rounds, rounds)), sample_ms
+
+class PasswordHasher:
+    """bcrypt hashing with a configurable, optionally calibrated cost.
+
+    The cost comes from BCRYPT_LOG_ROUNDS, or, when BCRYPT_TARGET_MS is set,
+    from timing bcrypt at startup (clamped to BCRYPT_MIN_ROUNDS..BCRYPT_MAX_ROUNDS).
+    At most BCRYPT_THREADS hashes run at once, in the process pool when
+    WORKER_POOL_SIZE > 0, otherwise on the request thread (bcrypt releases
+    the GIL). A request that finds every slot taken waits up to
+    BCRYPT_WAIT_TIMEOUT seconds, then gets PasswordHasherBusy, so a burst
+    of logins is turned away instead of queueing without bound.
+    """
+
+    def __init__(self, app=None):
+        self.rounds = 12
+        self.calibration = None
+        self.wait_timeout = 5.0
+        self._slots = threading.BoundedSemaphore(1)
+        self._pool = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app, worker_pool=None):
+        self.rounds = app.config.get('BCRYPT_LOG_ROUNDS', 12)
+        target_ms = app.config['BCRYPT_TARGET_MS']
+        if target_ms:
+            self.rounds, sample_ms = calibrate_rounds(
+                target_ms, app.config['BCRYPT_MIN_ROUNDS'], app.config['BCRYPT_MAX_ROUNDS']
+            )
+            self.calibration = {"target_ms": target_ms, "sample_ms_at_cost_8": round(sample_ms, 3)}
+            app.logger.info("bcrypt cost calibrated to %d for a %.0f ms target", self.rounds, target_ms)
+
+        # Hashes made here must use the same cost as the ones checked for rehash
+        app.config['BCRYPT_LOG_ROUNDS'] = self.rounds
+        self._pool = worker_pool if worker_pool is not None and worker_pool.enabled else None
+        self.wait_timeout = app.config['BCRYPT_WAIT_TIMEOUT']
+        self._slots = threading.BoundedSemaphore(app.config['BCRYPT_THREADS'])
+        app.extensions['password_hasher'] = self
+
+    def hash(self, password):
+        with self._slot():
+            if self._pool is not None:
+                return self._pool.hash_password(password, self.rounds)
+            return hash_password(password, self.rounds)
+
+    def verify(self, pw_hash, password):
+        with self._slot():
+            if self._pool is not None:
+                return self._pool.check_password(pw_hash, password)
+            return check_password(pw_hash, password)
+
+    def needs_rehash(self, pw_hash):
+        return hash_cost(pw_hash) != self.rounds
+
+    @contextlib.contextmanager
+    def _slot(self):
+        if not self._slots.acquire(timeout=self.wait_timeout):
+            raise PasswordHasherBusy(f"No password hashing slot free within {self.wait_timeout}s")
+        try:
+            yield
+        finally:
+            self._slots.release()
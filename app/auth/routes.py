@@ -1,8 +1,12 @@
 # app/auth/routes.py
 from flask import Blueprint, request, jsonify
-from app import db, bcrypt
+from app import db, password_hasher, user_cache
+from app.auth.passwords import PasswordHasherBusy
 from app.models.user import User
+from app.metrics import stage
 from flask_jwt_extended import create_access_token
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
 import re
 
 auth_bp = Blueprint('auth', __name__)
@@ -12,6 +16,11 @@ def is_valid_email(email):
     pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
     return re.match(pattern, email) is not None
 
+def _hasher_busy():
+    response = jsonify({"error": "Server busy", "message": "Too many logins at once, retry shortly"})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
     data = request.get_json()
@@ -32,30 +41,42 @@ def register():
         return jsonify({"error": "Invalid role"}), 400
     
     # Check if username or email already exists
-    if User.query.filter_by(username=username).first():
+    with stage('db_lookup'):
+        username_taken = User.query.filter(func.lower(User.username) == username.lower()).first()
+        email_taken = not username_taken and User.query.filter(func.lower(User.email) == email.lower()).first()
+    if username_taken:
         return jsonify({"error": "Username already exists"}), 400
     
-    if User.query.filter_by(email=email).first():
+    if email_taken:
         return jsonify({"error": "Email already registered"}), 400
     
     try:
-        hashed_password = bcrypt.generate_password_hash(password).decode('utf-8')
+        with stage('bcrypt_hash'):
+            hashed_password = password_hasher.hash(password)
         new_user = User(
             username=username,
             email=email,
             password=hashed_password,
             role=role
         )
-        db.session.add(new_user)
-        db.session.commit()
+        with stage('db_commit'):
+            db.session.add(new_user)
+            db.session.commit()
         return jsonify({"message": "User registered successfully"}), 201
+    except IntegrityError:
+        # A concurrent registration took the name or email (in any case) first
+        db.session.rollback()
+        return jsonify({"error": "Username or email already exists"}), 400
+    except PasswordHasherBusy:
+        return _hasher_busy()
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": "Registration failed", "details": str(e)}), 500
 
 @auth_bp.route('/login', methods=['POST'])
 def login():
-    data = request.get_json()
+    with stage('parse'):
+        data = request.get_json()
     if not data:
         return jsonify({"error": "Missing request data"}), 400
 
@@ -67,18 +88,33 @@ def login():
         return jsonify({"error": "Missing required fields"}), 400
     
     try:
-        # Check if login is with email or username
-        if '@' in identifier:
-            user = User.query.filter_by(email=identifier).first()
-        else:
-            user = User.query.filter_by(username=identifier).first()
+        # Check if login is with email or username (case-insensitive, served by the
+        # lower() indexes); cached, so repeat logins skip the database
+        key = identifier.lower()
+        with stage('db_lookup'):
+            if '@' in identifier:
+                user = user_cache.lookup('email', key, lambda: User.query.filter(func.lower(User.email) == key).first())
+            else:
+                user = user_cache.lookup('username', key, lambda: User.query.filter(func.lower(User.username) == key).first())
 
-        if user and bcrypt.check_password_hash(user.password, password):
-            access_token = create_access_token(identity={
-                "username": user.username,
-                "email": user.email,
-                "role": user.role
-            })
+        with stage('bcrypt_verify'):
+            verified = user is not None and password_hasher.verify(user.password, password)
+        if verified:
+            # Upgrade hashes made with another cost while we have the plain password
+            if password_hasher.needs_rehash(user.password):
+                with stage('bcrypt_hash'):
+                    new_hash = password_hasher.hash(password)
+                with stage('db_commit'):
+                    stored = db.session.get(User, user.id)
+                    stored.password = new_hash
+                    db.session.commit()
+
+            with stage('jwt_encode'):
+                access_token = create_access_token(identity={
+                    "username": user.username,
+                    "email": user.email,
+                    "role": user.role
+                })
             return jsonify({
                 "access_token": access_token,
                 "username": user.username,
@@ -87,5 +123,7 @@ def login():
             }), 200
         
         return jsonify({"error": "Invalid credentials"}), 401
+    except PasswordHasherBusy:
+        return _hasher_busy()
     except Exception as e:
         return jsonify({"error": "Login failed", "details": str(e)}), 500
@@ -0,0 +1,47 @@
+# app/background.py
+import os
+import threading
+
+class BackgroundThread:
+    """A daemon thread started on first use, once per process.
+
+    Threads do not survive fork: when the server forks its workers after
+    create_app(), each worker starts its own thread the first time it needs
+    one. Extensions call ensure() from the request path; it costs a getpid()
+    once the thread is running.
+    """
+
+    def __init__(self, target, name):
+        self.target = target
+        self.name = name
+        self.thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def ensure(self, before_start=None):
+        """Start the thread if this process has none; returns True if it was started now.
+
+        `before_start` runs under the lock first, to give the new thread
+        fresh per-process state (queues, events).
+        """
+        pid = os.getpid()
+        if self._pid == pid:
+            return False
+        with self._lock:
+            if self._pid == pid:
+                return False
+            if before_start is not None:
+                before_start()
+            self.thread = threading.Thread(target=self.target, name=self.name, daemon=True)
+            self.thread.start()
+            self._pid = pid
+        return True
+
+    @property
+    def started_here(self):
+        """True when this process started the thread"""
+        return self._pid == os.getpid()
+
+    def reset(self):
+        """Let the next ensure() start a new thread, e.g. after init_app"""
+        self._pid = None
@@ -0,0 +1,38 @@
+# app/database.py
+import sqlite3
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+def engine_options(app):
+    """SQLAlchemy engine options for the configured database.
+
+    Server databases get a sized connection pool with pre-ping and recycling;
+    SQLite keeps SQLAlchemy's defaults and is tuned per connection instead
+    (see _set_sqlite_pragmas).
+    """
+    uri = app.config['SQLALCHEMY_DATABASE_URI']
+    if uri.startswith('sqlite'):
+        return {}
+    return {
+        "pool_size": app.config['DB_POOL_SIZE'],
+        "max_overflow": app.config['DB_MAX_OVERFLOW'],
+        "pool_pre_ping": app.config['DB_POOL_PRE_PING'],
+        "pool_recycle": app.config['DB_POOL_RECYCLE'],
+    }
+
+def init_app(app):
+    """Fill SQLALCHEMY_ENGINE_OPTIONS unless the config already sets them"""
+    if not app.config.get('SQLALCHEMY_ENGINE_OPTIONS'):
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app)
+
+@event.listens_for(Engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets readers (logins) proceed while a write (registration) commits;
+    # synchronous=NORMAL is durable across application crashes under WAL
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA busy_timeout=5000")
+        cursor.close()
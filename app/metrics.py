@@ -0,0 +1,149 @@
+# app/metrics.py
+import bisect
+import contextlib
+import random
+import threading
+import time
+
+from flask import Response, current_app, g, has_request_context, request
+
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_NO_TIMER = contextlib.nullcontext()
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, in Prometheus terms"""
+
+    def __init__(self, name, documentation, label_names, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Per-bucket counts plus +Inf, then sum and count
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = [(labels, list(counts), total, count)
+                        for labels, (counts, total, count) in sorted(self._series.items())]
+        for labels, counts, total, count in snapshot:
+            label_text = ','.join(f'{name}="{value}"' for name, value in zip(self.label_names, labels))
+            prefix = label_text + ',' if label_text else ''
+            cumulative = 0
+            for bound, n in zip(self.buckets + ('+Inf',), counts):
+                cumulative += n
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{label_text}}} {total}')
+            lines.append(f'{self.name}_count{{{label_text}}} {count}')
+        return lines
+
+class _StageTimer:
+    __slots__ = ('histogram', 'name', 'start')
+
+    def __init__(self, histogram, name):
+        self.histogram = histogram
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start, request.endpoint or 'unmatched', self.name)
+        return False
+
+class Metrics:
+    """Request and per-stage latency histograms served at /metrics.
+
+    METRICS_SAMPLE_RATE picks the fraction of requests that are timed;
+    blocks wrapped in stage() inside a sampled request are recorded per
+    endpoint. Counts are per process, as Prometheus expects of each
+    scraped worker.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.sample_rate = 1.0
+        self._lock = threading.Lock()
+        self._reset()
+        if app is not None:
+            self.init_app(app)
+
+    def _reset(self):
+        self.requests = Histogram('app_request_duration_seconds', "Request latency by endpoint and status",
+                                  ('endpoint', 'method', 'status'))
+        self.stages = Histogram('app_stage_duration_seconds', "Time spent in each stage of a request",
+                                ('endpoint', 'stage'))
+        self._requests_total = {}
+
+    def init_app(self, app):
+        self._reset()
+        self.enabled = app.config['METRICS_ENABLED']
+        self.sample_rate = app.config['METRICS_SAMPLE_RATE']
+        if not 0.0 <= self.sample_rate <= 1.0:
+            raise ValueError("METRICS_SAMPLE_RATE must be between 0 and 1")
+        app.extensions['metrics'] = self
+        if not self.enabled:
+            return
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.add_url_rule('/metrics', 'metrics', self._serve)
+
+    def _before_request(self):
+        g.metrics_sampled = self.sample_rate >= 1.0 or random.random() < self.sample_rate
+        if g.metrics_sampled:
+            g.metrics_start = time.perf_counter()
+
+    def _after_request(self, response):
+        endpoint = request.endpoint or 'unmatched'
+        key = (endpoint, request.method, str(response.status_code))
+        with self._lock:
+            self._requests_total[key] = self._requests_total.get(key, 0) + 1
+        if g.get('metrics_sampled'):
+            self.requests.observe(time.perf_counter() - g.metrics_start, *key)
+        return response
+
+    def stage_timer(self, name):
+        return _StageTimer(self.stages, name)
+
+    def render(self):
+        lines = ["# HELP app_requests_total Requests handled, sampled or not",
+                 "# TYPE app_requests_total counter"]
+        with self._lock:
+            totals = sorted(self._requests_total.items())
+        for (endpoint, method, status), count in totals:
+            lines.append(f'app_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"}} {count}')
+        lines.append("# HELP app_metrics_sample_rate Fraction of requests timed")
+        lines.append("# TYPE app_metrics_sample_rate gauge")
+        lines.append(f"app_metrics_sample_rate {self.sample_rate}")
+        lines += self.requests.render()
+        lines += self.stages.render()
+        return '\n'.join(lines) + '\n'
+
+    def _serve(self):
+        return Response(self.render(), mimetype='text/plain; version=0.0.4')
+
+def stage(name):
+    """Context manager timing a block as `name` when the current request is sampled.
+
+    Outside a request (pool workers, the micro-batcher thread, scripts) and
+    for unsampled requests it does nothing.
+    """
+    if not has_request_context() or not g.get('metrics_sampled'):
+        return _NO_TIMER
+    return current_app.extensions['metrics'].stage_timer(name)
@@ -8,5 +8,12 @@ class User(db.Model):
     password = db.Column(db.String(120), nullable=False)
     role = db.Column(db.String(20), nullable=False)  # 'doctor' or 'admin'
     
+    # Case-insensitive lookups by username/email; unique, so a login matches
+    # at most one user (migration 5b1e7c3a9f02)
+    __table_args__ = (
+        db.Index('ix_user_username_lower', db.func.lower(username), unique=True),
+        db.Index('ix_user_email_lower', db.func.lower(email), unique=True),
+    )
+    
     def __repr__(self):
         return f'<User {self.username}>'
\ No newline at end of file
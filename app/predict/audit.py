@@ -0,0 +1,261 @@
+# app/predict/audit.py
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from app.background import BackgroundThread
+from app.predict.core import diagnose
+from app.predict.history import HistoryStore
+
+class JsonlSink:
+    """Append-only JSON Lines file, rotated once it reaches max_bytes"""
+
+    name = 'jsonl'
+
+    def __init__(self, directory, max_bytes, filename='predictions.jsonl'):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.path = os.path.join(directory, filename)
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, records):
+        lines = ''.join(json.dumps(record, separators=(',', ':')) + '\n' for record in records)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(lines)
+            size = f.tell()
+        if self.max_bytes and size >= self.max_bytes:
+            self._rotate()
+
+    def _rotate(self):
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')
+        base, ext = os.path.splitext(self.path)
+        os.replace(self.path, f"{base}-{stamp}{ext}")
+
+class MatrixRecords:
+    """The rows of one scored feature matrix, turned into records on the writer thread"""
+
+    __slots__ = ('common', 'features', 'matrix', 'labels', 'confidence')
+
+    def __init__(self, common, features, matrix, labels, confidence):
+        self.common = common
+        self.features = features
+        self.matrix = matrix
+        self.labels = labels
+        self.confidence = confidence
+
+    def __len__(self):
+        return len(self.matrix)
+
+    def records(self):
+        confidences = np.round(self.confidence * 100, 2).tolist()
+        return [
+            dict(self.common, features=dict(zip(self.features, row)), prediction=prediction,
+                 confidence=confidence)
+            for row, prediction, confidence in zip(self.matrix.tolist(), diagnose(self.labels), confidences)
+        ]
+
+class AuditLog:
+    """Records who asked for which prediction, off the request path.
+
+    Request threads only put one entry per request on an in-memory queue
+    bounded to AUDIT_QUEUE_SIZE records (a batch entry counts all its rows);
+    a background thread writes them in bulk to every sink (AUDIT_BATCH_SIZE
+    records or every AUDIT_FLUSH_INTERVAL seconds). When the queue is full,
+    AUDIT_BACKPRESSURE decides: 'drop' the entry (its records counted) or
+    'block' the request for up to AUDIT_BLOCK_TIMEOUT seconds. Pending
+    records are flushed at interpreter exit.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.sinks = []
+        self.history = None
+        self.batch_size = 500
+        self.flush_interval = 1.0
+        self.backpressure = 'drop'
+        self.block_timeout = 0.05
+        self.queue_size = 10000
+        self._queue = queue.Queue()
+        # Guards the counters, updated from request threads and the writer
+        self._lock = threading.Lock()
+        # Signalled when the writer takes records off the queue
+        self._space = threading.Condition(self._lock)
+        self._queued = 0
+        self._writer = BackgroundThread(self._run, 'audit-writer')
+        self._stop = threading.Event()
+        self.written = {}
+        self.dropped = 0
+        self.failed = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config['AUDIT_ENABLED']
+        self.batch_size = app.config['AUDIT_BATCH_SIZE']
+        self.flush_interval = app.config['AUDIT_FLUSH_INTERVAL']
+        self.backpressure = app.config['AUDIT_BACKPRESSURE']
+        self.block_timeout = app.config['AUDIT_BLOCK_TIMEOUT']
+        if self.backpressure not in ('drop', 'block'):
+            raise ValueError(f"AUDIT_BACKPRESSURE must be 'drop' or 'block', got {self.backpressure!r}")
+
+        # Bounded by the records it holds (self._queued), not by its entries
+        self.queue_size = app.config['AUDIT_QUEUE_SIZE']
+        self._queue = queue.Queue()
+        self._queued = 0
+        self._writer.reset()
+        self.sinks = []
+        self.history = None
+        if self.enabled:
+            log_dir = app.config['AUDIT_LOG_DIR'] or os.path.join(app.instance_path, 'audit')
+            self.sinks.append(JsonlSink(log_dir, app.config['AUDIT_MAX_BYTES']))
+            if app.config['HISTORY_ENABLED']:
+                self.history = HistoryStore(
+                    app.config['HISTORY_DIR'] or os.path.join(app.instance_path, 'history'),
+                    fmt=app.config['HISTORY_FORMAT'],
+                    part_seconds=app.config['HISTORY_PART_SECONDS'],
+                    part_rows=app.config['HISTORY_PART_ROWS'],
+                    compact_parts=app.config['HISTORY_COMPACT_PARTS']
+                )
+                self.sinks.append(self.history)
+        self.written = {sink.name: 0 for sink in self.sinks}
+        app.extensions['audit_log'] = self
+
+    def record(self, user, model_version, endpoint, features, prediction, confidence):
+        """Queue one prediction record; never raises into the request"""
+        if not self.enabled:
+            return
+        self._ensure_writer()
+        self._put(1, {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "user": user.get("username") if isinstance(user, dict) else user,
+            "role": user.get("role") if isinstance(user, dict) else None,
+            "endpoint": endpoint,
+            "model_version": model_version,
+            "features": features,
+            "prediction": prediction,
+            "confidence": confidence
+        })
+
+    def record_matrix(self, user, model_version, endpoint, features, matrix, labels, confidence):
+        """Queue the rows of a scored matrix as one entry, without building a dict per row.
+
+        `features` names the columns of `matrix`; `labels` and `confidence`
+        are what score() returned for its rows. The arrays are kept as they
+        are until the writer thread turns them into records.
+        """
+        if not self.enabled or not len(matrix):
+            return
+        self._ensure_writer()
+        username = user.get("username") if isinstance(user, dict) else user
+        role = user.get("role") if isinstance(user, dict) else None
+        self._put(len(matrix), MatrixRecords({
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "user": username,
+            "role": role,
+            "endpoint": endpoint,
+            "model_version": model_version
+        }, features, matrix, labels, confidence))
+
+    def _put(self, rows, entry):
+        with self._lock:
+            if self._queued + rows > self.queue_size and self.backpressure == 'block':
+                self._space.wait_for(lambda: self._queued + rows <= self.queue_size, self.block_timeout)
+            if self._queued + rows > self.queue_size:
+                self.dropped += rows
+                return
+            self._queued += rows
+        self._queue.put_nowait(entry)
+
+    def _ensure_writer(self):
+        if self._writer.ensure(before_start=self._stop.clear):
+            atexit.register(self.shutdown)
+
+    def _drain(self, block):
+        """Take up to batch_size records, waiting up to flush_interval for the first"""
+        records = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(records) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                if block and timeout > 0:
+                    entry = self._queue.get(timeout=timeout)
+                else:
+                    entry = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if type(entry) is MatrixRecords:
+                records.extend(entry.records())
+            else:
+                records.append(entry)
+        if records:
+            with self._lock:
+                self._queued -= len(records)
+                self._space.notify_all()
+        return records
+
+    def _write(self, records):
+        for sink in self.sinks:
+            try:
+                sink.write(records)
+            except Exception:
+                # Auditing must never take down the prediction service
+                with self._lock:
+                    self.failed += len(records)
+            else:
+                with self._lock:
+                    self.written[sink.name] += len(records)
+
+    def _flush_sinks(self, force):
+        # Sinks that buffer (the history store) get a chance to write when idle
+        for sink in self.sinks:
+            flush = getattr(sink, 'flush', None)
+            if flush is None:
+                continue
+            try:
+                flush(force=force)
+            except Exception:
+                with self._lock:
+                    self.failed += 1
+
+    def _run(self):
+        while not self._stop.is_set():
+            records = self._drain(block=True)
+            if records:
+                self._write(records)
+            else:
+                self._flush_sinks(force=False)
+
+    def shutdown(self, timeout=5.0):
+        """Stop the writer and flush whatever is still queued"""
+        if not self._writer.started_here:
+            return
+        self._stop.set()
+        self._writer.thread.join(timeout)
+        while True:
+            records = self._drain(block=False)
+            if not records:
+                break
+            self._write(records)
+        self._flush_sinks(force=True)
+
+    def stats(self):
+        with self._lock:
+            queued = self._queued
+            written = dict(self.written)
+            dropped = self.dropped
+            failed = self.failed
+        return {
+            "enabled": self.enabled,
+            "queue_depth": queued,
+            "queue_size": self.queue_size,
+            "backpressure": self.backpressure,
+            "written": written,
+            "dropped": dropped,
+            "failed": failed
+        }
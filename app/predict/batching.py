@@ -0,0 +1,130 @@
+# app/predict/batching.py
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from app.background import BackgroundThread
+from app.predict.core import score
+from app.profiling import track
+
+# Upper bounds of the batch-size histogram buckets
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+class MicroBatcher:
+    """Coalesces concurrent single-row predictions into one matrix.
+
+    Request threads put their row on a queue and wait; a background thread
+    takes up to PREDICT_BATCH_MAX_SIZE rows, or whatever arrived within
+    PREDICT_BATCH_MAX_WAIT_MS of the first one, scores them with a single
+    predict_proba pass and hands each thread its own result.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.max_batch_size = 32
+        self.max_wait = 0.002
+        self._queue = queue.Queue()
+        self._worker = BackgroundThread(self._run, 'prediction-batcher')
+        self._stats_lock = threading.Lock()
+        self._reset_stats()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config['PREDICT_BATCHING_ENABLED']
+        self.max_batch_size = app.config['PREDICT_BATCH_MAX_SIZE']
+        self.max_wait = app.config['PREDICT_BATCH_MAX_WAIT_MS'] / 1000.0
+        if self.max_batch_size < 1:
+            raise ValueError("PREDICT_BATCH_MAX_SIZE must be at least 1")
+        app.extensions['prediction_batcher'] = self
+
+    def _reset_stats(self):
+        self._batches = 0
+        self._rows = 0
+        self._histogram = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+        self._max_queue_depth = 0
+
+    def score(self, loaded, input_data):
+        """Score one (1, n_features) row; returns (probabilities, labels, confidence)"""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((loaded, input_data, future))
+
+        depth = self._queue.qsize()
+        if depth > self._max_queue_depth:
+            self._max_queue_depth = depth
+        return future.result()
+
+    def _ensure_worker(self):
+        self._worker.ensure(before_start=self._new_queue)
+
+    def _new_queue(self):
+        # A queue inherited through fork may hold the parent's requests or a held lock
+        self._queue = queue.Queue()
+
+    def _collect(self, pending):
+        """Block for one request, then gather more until the batch is full or the wait expires"""
+        batch = [pending.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(pending.get(timeout=remaining) if remaining > 0 else pending.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        pending = self._queue
+        while True:
+            batch = self._collect(pending)
+
+            # Requests that raced a model reload are scored by the version they started with
+            groups = {}
+            for item in batch:
+                groups.setdefault(id(item[0]), []).append(item)
+
+            for items in groups.values():
+                loaded = items[0][0]
+                try:
+                    with track('micro_batch'):
+                        probabilities, labels, confidence = score(
+                            loaded.model, np.vstack([item[1] for item in items]), loaded.scaler
+                        )
+                except Exception as e:
+                    for _, _, future in items:
+                        future.set_exception(e)
+                    continue
+                for i, (_, _, future) in enumerate(items):
+                    future.set_result((probabilities[i:i + 1], labels[i:i + 1], confidence[i:i + 1]))
+
+            self._record(len(batch))
+
+    def _record(self, size):
+        bucket = next((i for i, bound in enumerate(BATCH_SIZE_BUCKETS) if size <= bound),
+                      len(BATCH_SIZE_BUCKETS))
+        with self._stats_lock:
+            self._batches += 1
+            self._rows += size
+            self._histogram[bucket] += 1
+
+    def stats(self):
+        """Queue depth and batch-size histogram since startup"""
+        with self._stats_lock:
+            bounds = list(BATCH_SIZE_BUCKETS) + ["+Inf"]
+            return {
+                "enabled": self.enabled,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self._max_queue_depth,
+                "batches": self._batches,
+                "rows": self._rows,
+                "mean_batch_size": round(self._rows / self._batches, 2) if self._batches else None,
+                "batch_size_histogram": [
+                    {"le": bound, "count": count} for bound, count in zip(bounds, self._histogram)
+                ]
+            }
@@ -0,0 +1,49 @@
+# app/predict/binary.py
+import struct
+
+import numpy as np
+
+# Packed little-endian matrix, request and response alike
+MIMETYPE = 'application/x-feature-matrix'
+
+# magic, format version, bytes per value (4 or 8), columns, rows, feature set, reserved;
+# 24 bytes so float64 data after it stays 8-byte aligned
+HEADER = struct.Struct('<4sBBHI8s4x')
+MAGIC = b'BCFM'
+FORMAT_VERSION = 1
+DTYPES = {4: np.dtype('<f4'), 8: np.dtype('<f8')}
+
+class BinaryFormatError(ValueError):
+    """Raised for a body that is not a valid feature matrix"""
+
+def decode(body, schema):
+    """Return (matrix, itemsize) for a request body, without copying the values.
+
+    The matrix is a read-only view of `body` with one row per case in the
+    column order of feature_info.json; the header must name the same
+    feature set as `schema`.
+    """
+    if len(body) < HEADER.size:
+        raise BinaryFormatError(f"Body is shorter than the {HEADER.size}-byte header")
+    magic, version, itemsize, n_columns, n_rows, feature_set = HEADER.unpack_from(body)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise BinaryFormatError(f"Expected magic {MAGIC!r} and format version {FORMAT_VERSION}")
+    if itemsize not in DTYPES:
+        raise BinaryFormatError("Values must be float32 (4 bytes) or float64 (8 bytes)")
+    if feature_set != schema.version:
+        raise BinaryFormatError(f"Feature set {feature_set.hex()} does not match the model's "
+                                f"{schema.version.hex()}")
+    if n_columns != schema.n_features:
+        raise BinaryFormatError(f"Expected {schema.n_features} columns, got {n_columns}")
+    expected = HEADER.size + n_rows * n_columns * itemsize
+    if len(body) != expected:
+        raise BinaryFormatError(f"Expected {expected} bytes for {n_rows} rows, got {len(body)}")
+
+    matrix = np.frombuffer(body, dtype=DTYPES[itemsize], count=n_rows * n_columns, offset=HEADER.size)
+    return matrix.reshape(n_rows, n_columns), itemsize
+
+def encode(values, itemsize, feature_set):
+    """Pack a (rows, columns) matrix after a header, as `itemsize`-byte floats"""
+    values = np.ascontiguousarray(values, dtype=DTYPES[itemsize])
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, itemsize, values.shape[1], values.shape[0], feature_set)
+    return header + values.tobytes()
@@ -0,0 +1,65 @@
+# app/predict/cache.py
+import hashlib
+
+import numpy as np
+
+from app.cache import TTLCache
+
+class PredictionCache:
+    """Caches scored rows keyed on the ordered feature vector and model version.
+
+    The key hashes the float64 bytes of the row in REQUIRED_FEATURES order
+    together with LoadedModel.version, so a reload naturally stops serving
+    results computed by the previous model.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self._cache = TTLCache()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config['PREDICT_CACHE_ENABLED']
+        self._cache = TTLCache(
+            max_entries=app.config['PREDICT_CACHE_MAX_ENTRIES'],
+            ttl=app.config['PREDICT_CACHE_TTL']
+        )
+        app.extensions['prediction_cache'] = self
+
+    @staticmethod
+    def key(version, row):
+        # Adding 0.0 turns -0.0 into 0.0 so both spellings share an entry
+        canonical = np.ascontiguousarray(row, dtype=np.float64) + 0.0
+        return hashlib.blake2b(canonical.tobytes() + version.encode(), digest_size=16).digest()
+
+    def score(self, loaded, input_data, scorer):
+        """Return (probabilities, labels, confidence) for input_data.
+
+        Cached rows are answered directly; the rest go through
+        scorer(loaded, rows) in a single call and are then cached.
+        """
+        if not self.enabled:
+            return scorer(loaded, input_data)
+
+        keys = [self.key(loaded.version, row) for row in input_data]
+        cached = [self._cache.get(key) for key in keys]
+        missing = [i for i, entry in enumerate(cached) if entry is None]
+
+        if missing:
+            probabilities, labels, confidence = scorer(loaded, input_data[missing])
+            for j, i in enumerate(missing):
+                cached[i] = (probabilities[j], labels[j], confidence[j])
+                self._cache.set(keys[i], cached[i])
+
+        return (
+            np.array([entry[0] for entry in cached]),
+            np.array([entry[1] for entry in cached]),
+            np.array([entry[2] for entry in cached])
+        )
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self):
+        return dict(self._cache.stats(), enabled=self.enabled)
@@ -0,0 +1,35 @@
+# app/predict/core.py
+import contextlib
+
+import numpy as np
+
+# Class labels of the breast cancer dataset: 0 = malignant, 1 = benign
+DIAGNOSES = {0: "malignant", 1: "benign"}
+
+def _untimed(name):
+    return contextlib.nullcontext()
+
+def score(model, input_data, scaler=None, stage=None):
+    """Run a single predict_proba pass and derive labels and confidence.
+
+    `scaler` is applied first unless the model already takes raw features
+    (see export_model.py). `stage(name)` times the 'transform' and
+    'predict_proba' steps; the routes pass app.metrics.stage, scripts leave
+    it untimed. Returns (probabilities, labels, confidence) where
+    confidence is the probability of the predicted class for each row.
+    """
+    stage = stage or _untimed
+    if scaler is not None and not getattr(model, 'raw_features', False):
+        with stage('transform'):
+            input_data = scaler.transform(input_data)
+
+    with stage('predict_proba'):
+        probabilities = model.predict_proba(input_data)
+    best = probabilities.argmax(axis=1)
+    labels = model.classes_.take(best)
+    confidence = probabilities[np.arange(len(best)), best]
+    return probabilities, labels, confidence
+
+def diagnose(labels):
+    """Map predicted class labels to 'malignant' / 'benign'"""
+    return [DIAGNOSES[int(label)] for label in labels]
@@ -0,0 +1,287 @@
+# app/predict/engine.py
+import hashlib
+import json
+import os
+
+import joblib
+import numpy as np
+
+# Node arrays written by ForestEngine.save_arrays, one .npy file each
+ARRAY_FIELDS = ('feature', 'threshold', 'left', 'right', 'proba', 'roots')
+ARRAYS_HEADER = 'model.json'
+# 2 adds the sha256 of every array and of the input files to the header
+ARRAYS_FORMAT_VERSION = 2
+SUPPORTED_ARRAYS_FORMATS = (1, 2)
+
+# XOR mask mapping float64 bit patterns to integers that sort like the floats
+_SIGN_MASK = np.int64(0x7FFFFFFFFFFFFFFF)
+
+
+def _check_arrays(arrays, header):
+    """Raise ValueError unless `arrays` match the shapes and digests in `header`"""
+    n_nodes = header["n_nodes"]
+    expected_shapes = {
+        'feature': (n_nodes,), 'threshold': (n_nodes,), 'left': (n_nodes,), 'right': (n_nodes,),
+        'proba': (n_nodes, len(header["classes"])), 'roots': (header["n_estimators"],),
+        'scaler_mean': (header["n_features"],), 'scaler_scale': (header["n_features"],)
+    }
+    for name, array in arrays.items():
+        if array.shape != expected_shapes[name]:
+            raise ValueError(f"{name}.npy has shape {array.shape}, the header expects {expected_shapes[name]}")
+    digests = header.get("arrays")
+    if digests is not None:
+        for name, array in arrays.items():
+            if hashlib.sha256(np.ascontiguousarray(array).data).hexdigest() != digests.get(name):
+                raise ValueError(f"{name}.npy does not match {ARRAYS_HEADER}; is an export still running?")
+
+
+class ForestEngine:
+    """Array-backed evaluator for a fitted RandomForestClassifier.
+
+    Every tree's node arrays are concatenated into one flat buffer per field,
+    so a batch is scored by walking all trees for all rows at once: one NumPy
+    step per tree level instead of one Python call per estimator.
+    """
+
+    def __init__(self, feature, threshold, left, right, proba, roots, depth,
+                 classes, n_features, cast_float32=True, raw_features=False):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.proba = proba
+        self.roots = roots
+        self.depth = int(depth)
+        self.classes_ = classes
+        self.n_features_in_ = int(n_features)
+        # sklearn compares float32 inputs against float64 thresholds
+        self.cast_float32 = cast_float32
+        # True once the StandardScaler has been folded into the thresholds
+        self.raw_features = raw_features
+        # sha256 of the files this export was made from, e.g. feature_info.json (see save_arrays)
+        self.inputs = {}
+
+    @classmethod
+    def from_sklearn(cls, forest):
+        """Pack the trees of a fitted forest into contiguous node arrays."""
+        features, thresholds, lefts, rights, probas, roots = [], [], [], [], [], []
+        offset = 0
+        depth = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            node_ids = np.arange(offset, offset + n_nodes, dtype=np.intp)
+            is_leaf = tree.children_left == -1
+
+            # Leaves point back to themselves, so extra walking steps are no-ops
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.intp))
+            thresholds.append(tree.threshold.astype(np.float64))
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left + offset).astype(np.intp))
+            rights.append(np.where(is_leaf, node_ids, tree.children_right + offset).astype(np.intp))
+
+            # Same normalisation as DecisionTreeClassifier.predict_proba
+            value = tree.value[:, 0, :].astype(np.float64)
+            normalizer = value.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            probas.append(value / normalizer)
+
+            roots.append(offset)
+            depth = max(depth, tree.max_depth)
+            offset += n_nodes
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts),
+            right=np.concatenate(rights),
+            proba=np.concatenate(probas),
+            roots=np.asarray(roots, dtype=np.intp),
+            depth=depth,
+            classes=np.asarray(forest.classes_),
+            n_features=forest.n_features_in_,
+        )
+
+    @classmethod
+    def load(cls, model_path):
+        """Load a pickled forest and compile it."""
+        return cls.from_sklearn(joblib.load(model_path))
+
+    def save_arrays(self, directory, scaler=None, inputs=None):
+        """Write the node arrays as uncompressed .npy files plus a JSON header.
+
+        Uncompressed files can be memory-mapped by load_arrays, so every
+        worker on a host shares one page-cache copy of the forest. The
+        scaler's mean_/scale_ are stored too when given. The header records
+        the sha256 of every array and `inputs` ({file name: sha256} of the
+        files the export was made from), so a reader can tell a complete set
+        from one still being written.
+        """
+        os.makedirs(directory, exist_ok=True)
+        arrays = {field: getattr(self, field) for field in ARRAY_FIELDS}
+        if scaler is not None:
+            arrays['scaler_mean'] = np.asarray(scaler.mean_, dtype=np.float64)
+            arrays['scaler_scale'] = np.asarray(scaler.scale_, dtype=np.float64)
+
+        # Each file is written aside and renamed over the old one, so processes
+        # still mapping the previous version keep their (unlinked) pages intact.
+        # The header goes last and marks the new set as complete.
+        digests = {}
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            path = os.path.join(directory, f'{name}.npy')
+            with open(path + '.tmp', 'wb') as f:
+                np.save(f, array)
+            os.replace(path + '.tmp', path)
+            digests[name] = hashlib.sha256(array.data).hexdigest()
+
+        header = {
+            "format_version": ARRAYS_FORMAT_VERSION,
+            "n_estimators": self.n_estimators,
+            "n_nodes": int(len(self.feature)),
+            "depth": self.depth,
+            "classes": self.classes_.tolist(),
+            "n_features": self.n_features_in_,
+            "cast_float32": self.cast_float32,
+            "raw_features": self.raw_features,
+            "has_scaler": scaler is not None,
+            "arrays": digests,
+            "inputs": inputs or {}
+        }
+        header_path = os.path.join(directory, ARRAYS_HEADER)
+        with open(header_path + '.tmp', 'w') as f:
+            json.dump(header, f, indent=2)
+        os.replace(header_path + '.tmp', header_path)
+
+    @classmethod
+    def load_arrays(cls, directory, mmap_mode='r'):
+        """Open arrays written by save_arrays; returns (engine, scaler or None).
+
+        Raises ValueError when the arrays do not form the set the header
+        describes: wrong lengths, or (format 2) contents whose sha256 differs,
+        as happens while an export is replacing the files one by one.
+        """
+        with open(os.path.join(directory, ARRAYS_HEADER), 'r') as f:
+            header = json.load(f)
+        if header.get("format_version") not in SUPPORTED_ARRAYS_FORMATS:
+            raise ValueError(f"Unsupported model array format: {header.get('format_version')}")
+
+        names = ARRAY_FIELDS + (('scaler_mean', 'scaler_scale') if header.get("has_scaler") else ())
+        arrays = {
+            name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mmap_mode)
+            for name in names
+        }
+        _check_arrays(arrays, header)
+        scaler_arrays = [arrays.pop(name) for name in names[len(ARRAY_FIELDS):]]
+
+        engine = cls(
+            depth=header["depth"],
+            classes=np.asarray(header["classes"]),
+            n_features=header["n_features"],
+            cast_float32=header["cast_float32"],
+            raw_features=header["raw_features"],
+            **arrays
+        )
+        engine.inputs = header.get("inputs", {})
+        scaler = ArrayScaler(*scaler_arrays) if scaler_arrays else None
+        return engine, scaler
+
+    @property
+    def n_estimators(self):
+        return len(self.roots)
+
+    def apply(self, X):
+        """Return the leaf reached in every tree, shape (n_trees, n_rows)."""
+        X = np.asarray(X, dtype=np.float32 if self.cast_float32 else np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(
+                f"X has {X.shape[1]} features, but the model expects {self.n_features_in_}"
+            )
+
+        rows = np.arange(X.shape[0])[np.newaxis, :]
+        nodes = np.repeat(self.roots[:, np.newaxis], X.shape[0], axis=1)
+        for _ in range(self.depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return nodes
+
+    def predict_proba(self, X):
+        """Average the per-tree leaf probabilities, shape (n_rows, n_classes)."""
+        # Summing over the leading axis adds the trees in order, like sklearn
+        return np.asarray(self.proba[self.apply(X)].sum(axis=0) / self.n_estimators)
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+
+class ArrayScaler:
+    """StandardScaler.transform from stored mean_/scale_ arrays"""
+
+    def __init__(self, mean, scale):
+        self.mean_ = mean
+        self.scale_ = scale
+
+    def transform(self, X):
+        # Same float64 arithmetic as StandardScaler: subtract, then divide
+        return (np.asarray(X, dtype=np.float64) - self.mean_) / self.scale_
+
+
+def _float_to_key(x):
+    bits = np.asarray(x, dtype=np.float64).view(np.int64)
+    return np.where(bits < 0, bits ^ _SIGN_MASK, bits)
+
+def _key_to_float(key):
+    return np.where(key < 0, key ^ _SIGN_MASK, key).view(np.float64)
+
+def fuse_scaler(engine, scaler):
+    """Fold a fitted StandardScaler into the split thresholds.
+
+    The scaled path sends a raw value x left when
+    float32((x - mean) / scale) <= threshold. That test is monotone in x, so
+    for each split we bisect over the ordered float64 values for the largest
+    x that still goes left. Comparing raw float64 inputs against that bound
+    reproduces the scaled decisions exactly, with no transform at request time.
+    """
+    if engine.raw_features:
+        raise ValueError("Scaler is already folded into this model")
+
+    split = engine.left != np.arange(len(engine.left))
+    column = engine.feature[split]
+    mean = np.asarray(scaler.mean_, dtype=np.float64)[column]
+    scale = np.asarray(scaler.scale_, dtype=np.float64)[column]
+    threshold = engine.threshold[split]
+
+    def goes_left(x):
+        with np.errstate(over='ignore', invalid='ignore'):
+            scaled = ((x - mean) / scale).astype(np.float32)
+        return scaled <= threshold
+
+    max_float = np.finfo(np.float64).max
+    lo = _float_to_key(np.full(len(threshold), -max_float))
+    hi = _float_to_key(np.full(len(threshold), max_float))
+    if not goes_left(_key_to_float(lo)).all() or goes_left(_key_to_float(hi)).any():
+        raise ValueError("Split thresholds are outside the representable range")
+
+    # Invariant: lo goes left, hi goes right; 64 halvings cover every float64
+    for _ in range(64):
+        mid = (lo >> 1) + (hi >> 1) + (lo & hi & 1)
+        left = goes_left(_key_to_float(mid))
+        lo = np.where(left, mid, lo)
+        hi = np.where(left, hi, mid)
+
+    fused_threshold = engine.threshold.copy()
+    fused_threshold[split] = _key_to_float(lo)
+    return ForestEngine(
+        feature=engine.feature,
+        threshold=fused_threshold,
+        left=engine.left,
+        right=engine.right,
+        proba=engine.proba,
+        roots=engine.roots,
+        depth=engine.depth,
+        classes=engine.classes_,
+        n_features=engine.n_features_in_,
+        cast_float32=False,
+        raw_features=True,
+    )
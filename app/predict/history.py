@@ -0,0 +1,340 @@
+# app/predict/history.py
+import contextlib
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Optional: fall back to NumPy .npz partitions
+    pa = None
+    pq = None
+
+try:
+    import fcntl
+except ImportError:  # Windows: compaction falls back to an exclusive lock file
+    fcntl = None
+
+# Columns kept per prediction; strings are stored as fixed-width unicode in .npz
+COLUMNS = ('timestamp_ms', 'user', 'role', 'endpoint', 'model_version', 'prediction', 'confidence')
+PREDICTION_CODES = {"malignant": 0, "benign": 1}
+PREDICTION_NAMES = {code: name for name, code in PREDICTION_CODES.items()}
+CONFIDENCE_BANDS = (50, 60, 70, 80, 90, 100)
+
+# Per-day lock file: flock'ed shared by queries and exclusively by compaction
+LOCK_NAME = '.lock'
+# Without fcntl, a lock file this old was left by a compaction that crashed
+STALE_LOCK_SECONDS = 600
+
+def _day_dir(day):
+    return f"day={day.isoformat()}"
+
+class HistoryStore:
+    """Day-partitioned columnar store of prediction records.
+
+    Each day is a directory of part files: Parquet when pyarrow is installed,
+    otherwise uncompressed NumPy .npz. Records are buffered and written as one
+    part every HISTORY_PART_SECONDS (or HISTORY_PART_ROWS); once a day is
+    over, or once the current day has HISTORY_COMPACT_PARTS parts, its parts
+    are compacted into one file. Queries only open the day directories in
+    range and only the columns they filter on.
+
+    It is used as a sink of the audit log, so it is written from the audit
+    writer thread only. Queries also count the records this process still
+    has buffered, and hold each day's lock so a compaction by another server
+    process cannot remove the parts they are reading.
+    """
+
+    name = 'history'
+
+    def __init__(self, directory, fmt='auto', part_seconds=60.0, part_rows=10000, compact_parts=64):
+        if fmt == 'auto':
+            fmt = 'parquet' if pq is not None else 'npz'
+        if fmt == 'parquet' and pq is None:
+            raise ValueError("HISTORY_FORMAT 'parquet' requires pyarrow")
+        if fmt not in ('parquet', 'npz'):
+            raise ValueError(f"HISTORY_FORMAT must be 'auto', 'parquet' or 'npz', got {fmt!r}")
+
+        self.directory = directory
+        self.format = fmt
+        self.part_seconds = part_seconds
+        self.part_rows = part_rows
+        self.compact_parts = max(compact_parts, 2)
+        self._buffer = []
+        self._buffer_started = None
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    # ---- writing ----
+
+    def write(self, records):
+        """Audit sink interface: buffer records, writing a part when due"""
+        with self._lock:
+            if not self._buffer:
+                self._buffer_started = time.monotonic()
+            self._buffer.extend(records)
+        self.flush(force=False)
+
+    def flush(self, force=True):
+        """Write buffered records as a part; unless forced, only once one is due"""
+        with self._lock:
+            if not self._buffer:
+                return
+            due = (len(self._buffer) >= self.part_rows or
+                   time.monotonic() - self._buffer_started >= self.part_seconds)
+            if not (force or due):
+                return
+            records, self._buffer = self._buffer, []
+            # Still under the lock: a query sees each record either buffered or in a part
+            for day, columns in self._by_day(self._to_columns(records)):
+                self._write_part(day, columns)
+        self._compact(datetime.now(timezone.utc).date())
+
+    @staticmethod
+    def _by_day(columns):
+        """Split columns into (day, columns) by the UTC day of their timestamps"""
+        days = (columns['timestamp_ms'] // 86_400_000).astype(np.int64)
+        for day_number in np.unique(days):
+            mask = days == day_number
+            yield date(1970, 1, 1) + timedelta(days=int(day_number)), {
+                name: values[mask] for name, values in columns.items()
+            }
+
+    @staticmethod
+    def _to_columns(records):
+        timestamps = [
+            int(datetime.fromisoformat(record["timestamp"]).timestamp() * 1000) for record in records
+        ]
+        return {
+            'timestamp_ms': np.array(timestamps, dtype=np.int64),
+            'user': np.array([record.get("user") or "" for record in records], dtype=str),
+            'role': np.array([record.get("role") or "" for record in records], dtype=str),
+            'endpoint': np.array([record.get("endpoint") or "" for record in records], dtype=str),
+            'model_version': np.array([record.get("model_version") or "" for record in records], dtype=str),
+            'prediction': np.array([PREDICTION_CODES.get(record.get("prediction"), -1) for record in records],
+                                   dtype=np.int8),
+            # float64, so the query bounds (Python floats) compare exactly
+            'confidence': np.array([record.get("confidence") or 0.0 for record in records], dtype=np.float64),
+        }
+
+    def _write_part(self, day, columns, name=None):
+        day_path = os.path.join(self.directory, _day_dir(day))
+        os.makedirs(day_path, exist_ok=True)
+        name = name or f"part-{time.time_ns()}-{os.getpid()}"
+        path = os.path.join(day_path, f"{name}.{self.format}")
+        tmp_path = path + '.tmp'
+
+        if self.format == 'parquet':
+            pq.write_table(pa.table(columns), tmp_path)
+        else:
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, **columns)
+        # Readers never see a half-written part
+        os.replace(tmp_path, path)
+
+    def _compact(self, today):
+        """Merge the parts of every finished day, and of today once it has compact_parts, into one file"""
+        for day, day_path in self._days(None, today):
+            # Every server process adds a part to today each HISTORY_PART_SECONDS
+            min_parts = self.compact_parts if day >= today else 2
+            if len(self._parts(day_path)) < min_parts:
+                continue
+            # Several server processes share the directory; one compacts a day at a
+            # time, and never while a query is reading it
+            with self._day_lock(day_path, shared=False) as locked:
+                paths = self._parts(day_path) if locked else []
+                if len(paths) < min_parts:
+                    continue
+                parts = [self._read(path, COLUMNS) for path in paths]
+                merged = {name: np.concatenate([part[name] for part in parts]) for name in COLUMNS}
+                self._write_part(day, merged, name=f"compacted-{time.time_ns()}")
+                for path in paths:
+                    os.remove(path)
+
+    @contextlib.contextmanager
+    def _day_lock(self, day_path, shared):
+        """Hold a day's lock, shared or exclusive; yields False if exclusive and busy.
+
+        With fcntl the lock is an flock, released by the kernel even when its
+        process dies. Without it only compaction locks, with a lock file that
+        is taken over once STALE_LOCK_SECONDS old.
+        """
+        lock_path = os.path.join(day_path, LOCK_NAME)
+        if fcntl is not None:
+            fd = os.open(lock_path, os.O_CREAT | os.O_RDWR)
+            try:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    yield False
+                    return
+                yield True
+            finally:
+                # Closing the descriptor releases the flock
+                os.close(fd)
+            return
+
+        if shared:
+            yield True
+            return
+        if not self._take_lock_file(lock_path):
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            os.remove(lock_path)
+
+    @staticmethod
+    def _take_lock_file(lock_path):
+        try:
+            os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            pass
+        stale_path = f"{lock_path}.stale-{os.getpid()}"
+        try:
+            if time.time() - os.path.getmtime(lock_path) < STALE_LOCK_SECONDS:
+                return False
+            # The rename is atomic, so only one process takes over a stale lock
+            os.rename(lock_path, stale_path)
+        except FileNotFoundError:
+            return False
+        os.remove(stale_path)
+        try:
+            os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            return False
+
+    # ---- reading ----
+
+    def _days(self, start, end):
+        """(day, directory) for every day directory within [start, end]"""
+        if not os.path.isdir(self.directory):
+            return []
+        result = []
+        for entry in sorted(os.listdir(self.directory)):
+            if not entry.startswith('day='):
+                continue
+            day = date.fromisoformat(entry[4:])
+            if (start and day < start) or (end and day > end):
+                continue
+            result.append((day, os.path.join(self.directory, entry)))
+        return result
+
+    @staticmethod
+    def _parts(day_path):
+        return sorted(os.path.join(day_path, name) for name in os.listdir(day_path)
+                      if name.endswith('.parquet') or name.endswith('.npz'))
+
+    @staticmethod
+    def _read(path, columns):
+        """Columns of a part file, or of buffered records already in columns (a dict)"""
+        if isinstance(path, dict):
+            return {name: path[name] for name in columns}
+        if path.endswith('.parquet'):
+            table = pq.read_table(path, columns=list(columns))
+            part = {name: table.column(name).to_numpy() for name in columns}
+        else:
+            # NpzFile loads an array only when it is accessed
+            with np.load(path) as npz:
+                part = {name: npz[name] for name in columns}
+        confidence = part.get('confidence')
+        if confidence is not None and confidence.dtype == np.float32:
+            # Parts written before confidence was float64: values were rounded
+            # to 2 decimals, so rounding again recovers them exactly
+            part['confidence'] = np.round(confidence.astype(np.float64), 2)
+        return part
+
+    def query(self, start, end, user=None, prediction=None, min_confidence=None,
+              max_confidence=None, limit=100):
+        """Filter predictions made between the `start` and `end` dates (inclusive).
+
+        Returns counts by prediction, day and confidence band, plus up to
+        `limit` of the most recent matching records.
+        """
+        filter_columns = ['timestamp_ms', 'prediction', 'confidence']
+        if user is not None:
+            filter_columns.append('user')
+
+        with contextlib.ExitStack() as locks:
+            with self._lock:
+                buffered = self._by_day(self._to_columns(self._buffer)) if self._buffer else ()
+                sources = {}
+                for day, day_path in self._days(start, end):
+                    locks.enter_context(self._day_lock(day_path, shared=True))
+                    sources[day] = self._parts(day_path)
+            # Buffered records are the newest of their day
+            for day, columns in buffered:
+                if (start is None or day >= start) and (end is None or day <= end):
+                    sources.setdefault(day, []).append(columns)
+            return self._query(sorted(sources.items()), filter_columns, user, prediction,
+                               min_confidence, max_confidence, limit)
+
+    def _query(self, partitions, filter_columns, user, prediction, min_confidence,
+               max_confidence, limit):
+        selected = []
+        for day, paths in partitions:
+            for path in paths:
+                try:
+                    part = self._read(path, filter_columns)
+                except FileNotFoundError:
+                    # Compacted meanwhile (only possible without fcntl)
+                    continue
+                mask = np.ones(len(part['timestamp_ms']), dtype=bool)
+                if user is not None:
+                    mask &= part['user'] == user
+                if prediction is not None:
+                    mask &= part['prediction'] == PREDICTION_CODES[prediction]
+                if min_confidence is not None:
+                    mask &= part['confidence'] >= min_confidence
+                if max_confidence is not None:
+                    mask &= part['confidence'] <= max_confidence
+                if mask.any():
+                    selected.append((day, path, mask, part))
+
+        count = sum(int(mask.sum()) for _, _, mask, _ in selected)
+        by_prediction = {name: 0 for name in PREDICTION_CODES}
+        by_day = {}
+        band_counts = np.zeros(len(CONFIDENCE_BANDS) - 1, dtype=np.int64)
+        for day, _, mask, part in selected:
+            codes = part['prediction'][mask]
+            for code, name in PREDICTION_NAMES.items():
+                by_prediction[name] += int((codes == code).sum())
+            by_day[day.isoformat()] = by_day.get(day.isoformat(), 0) + int(mask.sum())
+            band_counts += np.histogram(part['confidence'][mask], bins=CONFIDENCE_BANDS)[0]
+
+        records = []
+        for day, path, mask, _ in reversed(selected):
+            if len(records) >= limit:
+                break
+            # Only the few rows returned need the remaining columns
+            try:
+                part = self._read(path, COLUMNS)
+            except FileNotFoundError:
+                continue
+            for i in np.flatnonzero(mask)[::-1][:limit - len(records)]:
+                records.append({
+                    "timestamp": datetime.fromtimestamp(int(part['timestamp_ms'][i]) / 1000, timezone.utc).isoformat(),
+                    "user": str(part['user'][i]),
+                    "role": str(part['role'][i]),
+                    "endpoint": str(part['endpoint'][i]),
+                    "model_version": str(part['model_version'][i]),
+                    "prediction": PREDICTION_NAMES.get(int(part['prediction'][i])),
+                    "confidence": round(float(part['confidence'][i]), 2)
+                })
+
+        return {
+            "count": count,
+            "by_prediction": by_prediction,
+            "by_day": by_day,
+            "by_confidence_band": {
+                f"{low}-{high}": int(n) for low, high, n in zip(CONFIDENCE_BANDS, CONFIDENCE_BANDS[1:], band_counts)
+            },
+            "records": records
+        }
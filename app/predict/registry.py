@@ -0,0 +1,281 @@
+# app/predict/registry.py
+import hashlib
+import json
+import os
+import threading
+import time
+
+import joblib
+
+from app.background import BackgroundThread
+from app.predict.engine import ForestEngine, ARRAYS_HEADER
+from app.predict.risk import RiskTable
+from app.predict.validation import FeatureSchema, RANGE_MARGIN
+from app.profiling import track
+
+class ModelNotReady(Exception):
+    """Raised when the model is requested before it could be loaded"""
+
+class LoadedModel:
+    """Model, scaler, feature info and risk tiers loaded together from one directory.
+
+    Instances are never mutated: a reload builds a new one and swaps it in,
+    so a request that grabbed a LoadedModel finishes on that version.
+    """
+
+    def __init__(self, model, scaler, feature_info, timings, version, risk=None, schema=None):
+        self.model = model
+        self.scaler = scaler
+        self.feature_info = feature_info
+        self.features = feature_info['features']
+        self.schema = schema or FeatureSchema.from_feature_info(feature_info)
+        self.risk = risk
+        self.timings = timings
+        self.version = version
+        self.loaded_at = time.time()
+
+class ModelRegistry:
+    """Owns the prediction artifacts for an app.
+
+    MODEL_LOAD_MODE = 'eager' loads them inside create_app, so a server that
+    builds the app before forking (gunicorn --preload) shares the pages with
+    its workers copy-on-write. 'lazy' defers loading to the first request.
+
+    New artifacts are picked up by reload(), called from the admin endpoint
+    or by a watcher thread when MODEL_WATCH_INTERVAL > 0. The watcher waits
+    for the files to stay unchanged for one interval, and a set that fails
+    the consistency checks keeps the current model and is tried again.
+    """
+
+    def __init__(self, app=None):
+        self.model_dir = None
+        self.mode = 'eager'
+        self.watch_interval = 0
+        self.range_margin = RANGE_MARGIN
+        self._loaded = None
+        self._error = None
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._watcher = BackgroundThread(self._watch, 'model-watcher')
+        self._watch_signature = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.model_dir = app.config['MODEL_DIR']
+        self.mode = app.config['MODEL_LOAD_MODE']
+        self.watch_interval = app.config['MODEL_WATCH_INTERVAL']
+        self.range_margin = app.config['PREDICT_RANGE_MARGIN'] if app.config['PREDICT_RANGE_CHECK'] else None
+        if self.mode not in ('eager', 'lazy'):
+            raise ValueError(f"MODEL_LOAD_MODE must be 'eager' or 'lazy', got {self.mode!r}")
+
+        self._loaded = None
+        self._error = None
+        self._watcher.reset()
+        app.extensions['model_registry'] = self
+
+        if self.mode == 'eager':
+            loaded = self.load()
+            app.logger.info("Prediction model %s loaded in %.3fs", loaded.version, loaded.timings['total'])
+
+    @classmethod
+    def for_directory(cls, model_dir):
+        """A registry outside any app (e.g. in a pool worker), loaded immediately"""
+        registry = cls()
+        registry.model_dir = model_dir
+        registry.load()
+        return registry
+
+    def _model_source(self):
+        """Pick the artifacts to load: memory-mapped arrays, fused pickle, or the raw pickle"""
+        arrays_dir = os.path.join(self.model_dir, 'model_arrays')
+        if os.path.exists(os.path.join(arrays_dir, ARRAYS_HEADER)):
+            files = sorted(os.path.join(arrays_dir, name) for name in os.listdir(arrays_dir)
+                           if name.endswith('.npy') or name == ARRAYS_HEADER)
+            return 'arrays', files
+
+        fused_model_path = os.path.join(self.model_dir, 'fused_model.pkl')
+        if os.path.exists(fused_model_path):
+            return 'fused', [fused_model_path, os.path.join(self.model_dir, 'scaler_top.pkl')]
+        return 'pickle', [os.path.join(self.model_dir, 'final_model.pkl'),
+                          os.path.join(self.model_dir, 'scaler_top.pkl')]
+
+    def _artifact_files(self):
+        return self._model_source()[1] + [os.path.join(self.model_dir, 'feature_info.json'),
+                                          os.path.join(self.model_dir, 'risk_tiers.json')]
+
+    def _signature(self):
+        """Cheap change detector for the watcher: (path, mtime, size) of every artifact"""
+        signature = []
+        for path in self._artifact_files():
+            try:
+                stat = os.stat(path)
+                signature.append((path, stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append((path, None, None))
+        return tuple(signature)
+
+    def _load_model(self, source):
+        """Return (model, scaler or None) for the chosen source.
+
+        model_arrays/ is mapped read-only, so all workers on a host share one
+        page-cache copy; the pickles are unpickled into each process's heap.
+        """
+        if source == 'arrays':
+            return ForestEngine.load_arrays(os.path.join(self.model_dir, 'model_arrays'), mmap_mode='r')
+        # The fused export (export_model.py) takes raw features, skipping the scaler
+        if source == 'fused':
+            return joblib.load(os.path.join(self.model_dir, 'fused_model.pkl')), None
+        return ForestEngine.load(os.path.join(self.model_dir, 'final_model.pkl')), None
+
+    def _build(self):
+        """Load every artifact from MODEL_DIR into a new LoadedModel; raises on failure"""
+        timings = {}
+        start = time.perf_counter()
+
+        source = self._model_source()[0]
+        feature_info_path = os.path.join(self.model_dir, 'feature_info.json')
+        digest = hashlib.sha256()
+        for path in self._artifact_files():
+            with open(path, 'rb') as f:
+                content = f.read()
+            digest.update(content)
+            if path == feature_info_path:
+                # Parsed from these same bytes below, so the check and the load agree
+                feature_info_bytes = content
+        timings['hash'] = time.perf_counter() - start
+
+        step = time.perf_counter()
+        model, scaler = self._load_model(source)
+        timings['model'] = time.perf_counter() - step
+
+        if scaler is None:
+            step = time.perf_counter()
+            scaler = joblib.load(os.path.join(self.model_dir, 'scaler_top.pkl'))
+            timings['scaler'] = time.perf_counter() - step
+
+        step = time.perf_counter()
+        feature_info = json.loads(feature_info_bytes)
+        self._check_consistent(model, scaler, feature_info, hashlib.sha256(feature_info_bytes).hexdigest())
+        schema = FeatureSchema.from_feature_info(feature_info, self.range_margin)
+        timings['feature_info'] = time.perf_counter() - step
+
+        step = time.perf_counter()
+        risk = RiskTable.load(os.path.join(self.model_dir, 'risk_tiers.json'))
+        timings['risk_tiers'] = time.perf_counter() - step
+
+        timings['total'] = time.perf_counter() - start
+        return LoadedModel(model, scaler, feature_info, timings, digest.hexdigest()[:12], risk, schema)
+
+    @staticmethod
+    def _check_consistent(model, scaler, feature_info, feature_info_sha256):
+        """Raise ValueError when the artifacts come from different trainings.
+
+        train_model.py replaces them one at a time, so a load racing it can
+        see a new feature_info.json next to an old model or the reverse.
+        """
+        features = feature_info['features']
+        exported_from = getattr(model, 'inputs', {}).get('feature_info.json')
+        if exported_from is not None and exported_from != feature_info_sha256:
+            raise ValueError("feature_info.json differs from the one model_arrays was exported from; "
+                             "is training still writing?")
+        if model.n_features_in_ != len(features):
+            raise ValueError(f"Model expects {model.n_features_in_} features, "
+                             f"feature_info.json lists {len(features)}")
+        scaler_features = getattr(scaler, 'feature_names_in_', None)
+        if scaler_features is not None and list(scaler_features) != list(features):
+            raise ValueError("scaler_top.pkl was fitted on other features than feature_info.json lists")
+
+    def load(self):
+        """Build the model from MODEL_DIR and make it current; raises on failure"""
+        with self._reload_lock:
+            signature = self._signature()
+            try:
+                with track('model_load'):
+                    loaded = self._build()
+            except Exception as e:
+                self._error = str(e)
+                raise
+            # A single reference assignment: requests see either version, never a mix
+            self._loaded = loaded
+            self._watch_signature = signature
+            self._error = None
+            return loaded
+
+    def reload(self):
+        """Load the artifacts again and swap them in if their content changed.
+
+        The current model keeps serving while the new one is built. Returns
+        (old_version, new_version); a failed build leaves the current one in place.
+        """
+        old = self._loaded
+        old_version = old.version if old else None
+        with self._reload_lock:
+            signature = self._signature()
+            try:
+                with track('model_load'):
+                    loaded = self._build()
+            except Exception as e:
+                # The signature is not recorded, so the watcher tries this state again
+                self._error = str(e)
+                raise
+            self._watch_signature = signature
+            self._error = None
+            if old is None or loaded.version != old.version:
+                self._loaded = loaded
+        return old_version, self._loaded.version
+
+    def get(self):
+        """Return the current model, loading it now in lazy mode"""
+        self._ensure_watcher()
+        loaded = self._loaded
+        if loaded is not None:
+            return loaded
+
+        with self._lock:
+            if self._loaded is None:
+                try:
+                    self.load()
+                except Exception as e:
+                    raise ModelNotReady(f"Model could not be loaded: {e}") from e
+            return self._loaded
+
+    def _ensure_watcher(self):
+        if self.watch_interval:
+            self._watcher.ensure()
+
+    def _watch(self):
+        pending = None
+        while True:
+            time.sleep(self.watch_interval)
+            signature = self._signature()
+            if self._loaded is None or signature == self._watch_signature:
+                pending = None
+                continue
+            # Wait until the files stop changing for a whole interval before loading them
+            if signature != pending:
+                pending = signature
+                continue
+            try:
+                self.reload()
+            except Exception as e:
+                # Keep serving the current version
+                self._error = f"Reload failed: {e}"
+
+    @property
+    def ready(self):
+        return self._loaded is not None
+
+    def status(self):
+        """Readiness, version and load timings, for the health endpoint"""
+        loaded = self._loaded
+        return {
+            "ready": loaded is not None,
+            "mode": self.mode,
+            "version": loaded.version if loaded else None,
+            "feature_set": loaded.schema.version.hex() if loaded else None,
+            "error": self._error,
+            "load_seconds": {
+                name: round(seconds, 4) for name, seconds in loaded.timings.items()
+            } if loaded else None
+        }
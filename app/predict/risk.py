@@ -0,0 +1,50 @@
+# app/predict/risk.py
+import json
+
+import numpy as np
+
+from app.predict.core import DIAGNOSES
+
+class RiskTable:
+    """Risk tiers per diagnosis, read from risk_tiers.json.
+
+    The file lists, for each diagnosis, tiers with the minimum confidence
+    (in percent) at which they apply plus the severity, message and
+    recommended actions to report. Each tier's response dict is built once;
+    assign() maps whole arrays of predictions to tier indices.
+    """
+
+    def __init__(self, tiers):
+        self.templates = []
+        self._bounds = {}
+        self._offsets = {}
+        for label, name in DIAGNOSES.items():
+            entries = sorted(tiers[name], key=lambda tier: tier['min_confidence'])
+            if not entries or entries[0]['min_confidence'] > 0:
+                raise ValueError(f"Risk tiers for {name!r} must start at min_confidence 0")
+            self._offsets[label] = len(self.templates)
+            self._bounds[label] = np.array([tier['min_confidence'] for tier in entries], dtype=np.float64)
+            self.templates.extend({
+                "severity": tier['severity'],
+                "message": tier['message'],
+                "recommended_actions": list(tier['recommended_actions'])
+            } for tier in entries)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r') as f:
+            return cls(json.load(f))
+
+    def assign(self, labels, confidence):
+        """Tier index of every row, from predicted labels and confidence in [0, 1]"""
+        labels = np.asarray(labels)
+        percent = np.asarray(confidence, dtype=np.float64) * 100
+        return np.select(
+            [labels == label for label in self._offsets],
+            [self._offsets[label] + np.searchsorted(self._bounds[label], percent, side='right') - 1
+             for label in self._offsets]
+        )
+
+    def responses(self, labels, confidence):
+        """Shared response template of every row; callers must not mutate them"""
+        return [self.templates[tier] for tier in self.assign(labels, confidence)]
@@ -1,126 +1,395 @@
 # app/predict/routes.py
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-import joblib
+from flask import Blueprint, request, jsonify, current_app, g, send_from_directory
+from datetime import date, datetime, timedelta, timezone
 import numpy as np
-import os
-import json
+from app import model_registry, prediction_batcher, prediction_cache, worker_pool, audit_log, profiler
+from app.predict import binary
+from app.predict.core import diagnose
+from app.predict.registry import ModelNotReady
+from app.predict.history import PREDICTION_CODES
+from app.auth.decorators import role_required
+from app.metrics import stage
+from app.profiling import PROFILE_SUFFIX
 
 predict_bp = Blueprint('predict', __name__)
 
-# Load the model, scaler, and feature information
-try:
-    base_dir = os.path.abspath(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
-    model_path = os.path.join(base_dir, 'final_model.pkl')
-    scaler_path = os.path.join(base_dir, 'scaler_top.pkl')
-    feature_info_path = os.path.join(base_dir, 'feature_info.json')
-    
-    final_model = joblib.load(model_path)
-    scaler_top = joblib.load(scaler_path)
-    
-    with open(feature_info_path, 'r') as f:
-        feature_info = json.load(f)
-    
-    REQUIRED_FEATURES = feature_info['features']
-    print("Model, scaler, and feature info loaded successfully")
-    
-except Exception as e:
-    print(f"Error loading files: {str(e)}")
-    final_model = None
-    scaler_top = None
-    feature_info = None
-    REQUIRED_FEATURES = []
+def load_model():
+    """Return the loaded model, or an error response tuple if it is unavailable"""
+    try:
+        return model_registry.get(), None
+    except ModelNotReady as e:
+        return None, (jsonify({"error": "Model not initialized", "message": str(e)}), 503)
+
+def score_rows(loaded, input_data):
+    """Score rows, coalescing single rows through the micro-batcher when enabled"""
+    if prediction_batcher.enabled and len(input_data) == 1:
+        return prediction_batcher.score(loaded, input_data)
+    return worker_pool.score(loaded, input_data, stage=stage)
+
+@predict_bp.route('/ready', methods=['GET'])
+def ready():
+    """Readiness probe: 200 once the model is loaded, with load timings"""
+    status = model_registry.status()
+    return jsonify(status), 200 if status["ready"] else 503
+
+@predict_bp.route('/admin/reload', methods=['POST'])
+@role_required('admin')
+def reload_model():
+    """Load the artifacts in MODEL_DIR again and swap them in atomically"""
+    try:
+        old_version, new_version = model_registry.reload()
+    except Exception as e:
+        return jsonify({
+            "error": "Reload failed",
+            "message": str(e),
+            "model_version": model_registry.status()["version"]
+        }), 500
+
+    return jsonify({
+        "message": "Model reloaded" if new_version != old_version else "Model unchanged",
+        "previous_version": old_version,
+        "model_version": new_version
+    }), 200
+
+def _profiling_disabled():
+    return jsonify({"error": "Profiling is disabled"}), 404
+
+@predict_bp.route('/admin/profile', methods=['POST'])
+@role_required('admin')
+def profile_start():
+    """Profile the next `requests` requests and/or the next `seconds` seconds.
+
+    Optional JSON body: requests, seconds, interval_ms and endpoints (only
+    count requests to these endpoints, e.g. ["predict.predict"]). Without a
+    budget the next 100 requests are profiled.
+    """
+    if not profiler.enabled:
+        return _profiling_disabled()
+
+    data = request.get_json(silent=True) or {}
+    try:
+        requests_budget = int(data['requests']) if data.get('requests') is not None else None
+        seconds = float(data['seconds']) if data.get('seconds') is not None else None
+        interval = float(data['interval_ms']) / 1000 if data.get('interval_ms') is not None else None
+        endpoints = data.get('endpoints')
+        if endpoints is not None and (not isinstance(endpoints, list)
+                                      or not all(isinstance(e, str) for e in endpoints)):
+            raise ValueError("endpoints must be a list of endpoint names")
+        session = profiler.start(requests_budget, seconds, interval, endpoints)
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": "Invalid profiling options", "message": str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({"error": "Profiling already running", "message": str(e),
+                        "session": profiler.status()["session"]}), 409
+
+    return jsonify({"message": "Profiling started", "session": session.status()}), 202
+
+@predict_bp.route('/admin/profile', methods=['GET'])
+@role_required('admin')
+def profile_status():
+    """State of the current or last session and the profiles written so far"""
+    if not profiler.enabled:
+        return _profiling_disabled()
+    return jsonify(profiler.status()), 200
+
+@predict_bp.route('/admin/profile', methods=['DELETE'])
+@role_required('admin')
+def profile_stop():
+    """End the running session now and write its profile"""
+    if not profiler.enabled:
+        return _profiling_disabled()
+    session = profiler.stop()
+    if session is None:
+        return jsonify({"error": "No profiling session is running"}), 404
+    return jsonify({"message": "Profiling stopped", "session": session.status()}), 200
+
+@predict_bp.route('/admin/profile/<name>', methods=['GET'])
+@role_required('admin')
+def profile_download(name):
+    """A collapsed-stack file, one 'frame;frame;... count' line per stack"""
+    if not profiler.enabled:
+        return _profiling_disabled()
+    if not name.endswith(PROFILE_SUFFIX):
+        return jsonify({"error": "Profile not found"}), 404
+    return send_from_directory(profiler.directory, name, mimetype='text/plain')
+
+@predict_bp.route('/batching/stats', methods=['GET'])
+@role_required('admin')
+def batching_stats():
+    """Queue depth and batch-size histogram of the micro-batcher"""
+    return jsonify(prediction_batcher.stats()), 200
+
+@predict_bp.route('/cache/stats', methods=['GET'])
+@role_required('admin')
+def cache_stats():
+    """Hit/miss counters and size of the prediction cache"""
+    return jsonify(prediction_cache.stats()), 200
+
+@predict_bp.route('/audit/stats', methods=['GET'])
+@role_required('admin')
+def audit_stats():
+    """Queue depth and written/dropped counters of the audit log"""
+    return jsonify(audit_log.stats()), 200
+
+@predict_bp.route('/history', methods=['GET'])
+@role_required('admin')
+def history():
+    """Query past predictions by date range, user, outcome and confidence.
+
+    Query string: start/end (YYYY-MM-DD, default the last 7 days), user,
+    prediction (malignant|benign), min_confidence, max_confidence, limit.
+    """
+    if audit_log.history is None:
+        return jsonify({"error": "Prediction history is disabled"}), 404
+
+    args = request.args
+    try:
+        end = date.fromisoformat(args['end']) if 'end' in args else datetime.now(timezone.utc).date()
+        start = date.fromisoformat(args['start']) if 'start' in args else end - timedelta(days=6)
+        min_confidence = float(args['min_confidence']) if 'min_confidence' in args else None
+        max_confidence = float(args['max_confidence']) if 'max_confidence' in args else None
+        limit = min(int(args.get('limit', 100)), current_app.config['HISTORY_QUERY_LIMIT'])
+    except ValueError as e:
+        return jsonify({"error": "Invalid query parameters", "message": str(e)}), 400
+
+    prediction = args.get('prediction')
+    if prediction is not None and prediction not in PREDICTION_CODES:
+        return jsonify({
+            "error": "Invalid query parameters",
+            "message": f"prediction must be one of {sorted(PREDICTION_CODES)}"
+        }), 400
+    if start > end or limit < 0:
+        return jsonify({"error": "Invalid query parameters", "message": "start must not be after end"
+                        if start > end else "limit must not be negative"}), 400
+
+    result = audit_log.history.query(
+        start, end,
+        user=args.get('user'),
+        prediction=prediction,
+        min_confidence=min_confidence,
+        max_confidence=max_confidence,
+        limit=limit
+    )
+    result["start"] = start.isoformat()
+    result["end"] = end.isoformat()
+    return jsonify(result), 200
+
+def _predict_binary(loaded):
+    """Score a packed feature matrix (see app/predict/binary.py) and answer in kind.
+
+    The response matrix holds the class probabilities (malignant, benign),
+    one row per case, in the float width of the request; rows that fail
+    validation are NaN and counted in X-Rejected-Rows.
+    """
+    schema = loaded.schema
+    try:
+        with stage('parse'):
+            matrix, itemsize = binary.decode(request.get_data(cache=False), schema)
+    except binary.BinaryFormatError as e:
+        return jsonify({
+            "error": "Invalid binary input",
+            "message": str(e),
+            "feature_set": schema.version.hex(),
+            "required_features": loaded.features
+        }), 400
+
+    max_rows = current_app.config['PREDICT_MAX_BATCH_ROWS']
+    if len(matrix) > max_rows:
+        return jsonify({
+            "error": "Batch too large",
+            "message": f"At most {max_rows} cases can be scored per request"
+        }), 413
+
+    try:
+        with stage('validate'):
+            accepted = schema.accepted(matrix)
+            rows = matrix if accepted.all() else matrix[accepted]
+
+        probabilities = np.full((len(matrix), len(loaded.model.classes_)), np.nan)
+        if len(rows):
+            with stage('score'):
+                # float64 input is scored in place; float32 needs one widening copy
+                scored, labels, confidence = prediction_cache.score(
+                    loaded, rows.astype(np.float64, copy=False), score_rows
+                )
+                probabilities[accepted] = scored
+            with stage('audit'):
+                audit_log.record_matrix(g.current_user, loaded.version, 'binary', schema.features,
+                                        rows, labels, confidence)
+    except Exception as e:
+        return jsonify({"error": "Prediction failed", "message": str(e)}), 500
+
+    with stage('serialize'):
+        response = current_app.response_class(binary.encode(probabilities, itemsize, schema.version),
+                                              mimetype=binary.MIMETYPE)
+    response.headers['X-Model-Version'] = loaded.version
+    response.headers['X-Rejected-Rows'] = str(len(matrix) - int(accepted.sum()))
+    return response
 
 @predict_bp.route('/predict', methods=['POST'])
-@jwt_required()
+@role_required('doctor', 'admin')
 def predict():
-    if final_model is None or scaler_top is None:
-        return jsonify({"error": "Model not initialized"}), 500
+    loaded, error_response = load_model()
+    if error_response:
+        return error_response
+    if request.mimetype == binary.MIMETYPE:
+        return _predict_binary(loaded)
+    required_features = loaded.features
 
     try:
-        current_user = get_jwt_identity()
-        if current_user["role"] not in ["doctor", "admin"]:
-            return jsonify({"error": "Unauthorized access"}), 403
-
-        data = request.get_json(force=True)
-        
-        # Handle dictionary input format
-        if not isinstance(data, dict) or 'features' not in data:
-            return jsonify({
-                "error": "Invalid input format",
-                "message": "Expected format: {'features': {feature_name: value, ...}}",
-                "example": {
-                    "features": {
-                        "worst area": 515.8,
-                        "worst concave points": 0.0737,
-                        # ... other features
-                    }
-                }
-            }), 400
-
-        features_dict = data['features']
-        
-        # Validate all required features are present
-        missing_features = set(REQUIRED_FEATURES) - set(features_dict.keys())
-        if missing_features:
-            return jsonify({
-                "error": "Missing features",
-                "missing_features": list(missing_features),
-                "required_features": REQUIRED_FEATURES
-            }), 400
+        with stage('parse'):
+            data = request.get_json(force=True, silent=True)
 
-        # Convert dictionary to ordered list based on feature importance
-        features_list = [features_dict[feature] for feature in REQUIRED_FEATURES]
+        with stage('validate'):
+            # Handle dictionary input format
+            if not isinstance(data, dict) or 'features' not in data:
+                return jsonify({
+                    "error": "Invalid input format",
+                    "message": "Expected format: {'features': {feature_name: value, ...}}",
+                    "example": {
+                        "features": {
+                            "worst area": 515.8,
+                            "worst concave points": 0.0737,
+                            # ... other features
+                        }
+                    }
+                }), 400
 
-        # Validate numerical values
-        if not all(isinstance(x, (int, float)) for x in features_list):
-            return jsonify({
-                "error": "Invalid feature values",
-                "message": "All features must be numerical values"
-            }), 400
+            # Ordered by feature importance, checked for type, finiteness and range
+            features_dict = data['features']
+            input_row, error = loaded.schema.parse(features_dict)
+            if error:
+                error["required_features"] = required_features
+                return jsonify(error), 400
 
         # Make prediction
-        input_data = np.array(features_list).reshape(1, -1)
-        scaled_data = scaler_top.transform(input_data)
-        prediction = final_model.predict(scaled_data)
-        probabilities = final_model.predict_proba(scaled_data)[0]
-        
-        result = "malignant" if prediction[0] == 0 else "benign"
-        confidence = float(probabilities[0] if result == "malignant" else probabilities[1])
+        with stage('score'):
+            _, labels, confidence = prediction_cache.score(loaded, input_row.reshape(1, -1), score_rows)
+        result = diagnose(labels)[0]
 
+        features_received = {feature: features_dict[feature] for feature in required_features}
         response = {
             "prediction": result,
-            "confidence": round(confidence * 100, 2),
-            "features_received": {
-                feature: value for feature, value in zip(REQUIRED_FEATURES, features_list)
-            }
+            "confidence": round(float(confidence[0]) * 100, 2),
+            "model_version": loaded.version
         }
+        if current_app.config['PREDICT_ECHO_FEATURES']:
+            response["features_received"] = features_received
+        response.update(loaded.risk.responses(labels, confidence)[0])
 
-        if result == "malignant":
-            response.update({
-                "severity": "High Risk",
-                "message": "Please consult a doctor immediately.",
-                "recommended_actions": [
-                    "Schedule immediate follow-up",
-                    "Prepare medical history",
-                    "Contact oncology department"
-                ]
-            })
-        else:
-            response.update({
-                "severity": "Low Risk",
-                "message": "No immediate action required.",
-                "recommended_actions": [
-                    "Continue regular check-ups",
-                    "Schedule next screening as recommended"
-                ]
-            })
-
-        return jsonify(response), 200
+        with stage('audit'):
+            audit_log.record(g.current_user, loaded.version, 'predict', features_received,
+                             result, response["confidence"])
+        with stage('serialize'):
+            return jsonify(response), 200
 
     except Exception as e:
         return jsonify({
             "error": "Prediction failed",
             "message": str(e),
-            "required_features": REQUIRED_FEATURES
-        }), 500
\ No newline at end of file
+            "required_features": required_features
+        }), 500
+
+
+def _batch_rows(data):
+    """Turn a batch payload into a list of per-case feature dicts.
+
+    Accepts either {'cases': [{feature: value, ...}, ...]} or the columnar
+    form {'features': {feature: [value, ...], ...}}. Returns (rows, error).
+    """
+    if not isinstance(data, dict):
+        return None, "Request body must be a JSON object"
+
+    if 'cases' in data:
+        cases = data['cases']
+        if not isinstance(cases, list):
+            return None, "'cases' must be a list of feature dictionaries"
+        return cases, None
+
+    if 'features' in data:
+        columns = data['features']
+        if not isinstance(columns, dict) or not all(isinstance(v, list) for v in columns.values()):
+            return None, "'features' must map each feature name to a list of values"
+        lengths = {len(v) for v in columns.values()}
+        if len(lengths) > 1:
+            return None, "All feature columns must have the same length"
+        n_rows = lengths.pop() if lengths else 0
+        return [{name: values[i] for name, values in columns.items()} for i in range(n_rows)], None
+
+    return None, "Expected 'cases' (list of feature dicts) or 'features' (feature name -> list of values)"
+
+@predict_bp.route('/batch', methods=['POST'])
+@role_required('doctor', 'admin')
+def predict_batch():
+    loaded, error_response = load_model()
+    if error_response:
+        return error_response
+    if request.mimetype == binary.MIMETYPE:
+        return _predict_binary(loaded)
+    required_features = loaded.features
+
+    try:
+        with stage('parse'):
+            data = request.get_json(force=True, silent=True)
+        rows, error = _batch_rows(data)
+        if error:
+            return jsonify({
+                "error": "Invalid input format",
+                "message": error,
+                "required_features": required_features
+            }), 400
+
+        max_rows = current_app.config['PREDICT_MAX_BATCH_ROWS']
+        if len(rows) > max_rows:
+            return jsonify({
+                "error": "Batch too large",
+                "message": f"At most {max_rows} cases can be scored per request"
+            }), 413
+
+        results = [None] * len(rows)
+        valid_indices = []
+        with stage('validate'):
+            # Cases are parsed straight into their row of one preallocated matrix
+            matrix = np.empty((len(rows), loaded.schema.n_features))
+            for i, case in enumerate(rows):
+                _, row_error = loaded.schema.parse(case, out=matrix[i])
+                if row_error:
+                    results[i] = dict(row_error, index=i)
+                else:
+                    valid_indices.append(i)
+
+        if valid_indices:
+            # One matrix, one scaler pass and one forest pass for the whole batch
+            with stage('score'):
+                input_data = matrix if len(valid_indices) == len(rows) else matrix[valid_indices]
+                _, labels, confidence = prediction_cache.score(loaded, input_data, score_rows)
+
+            risk_responses = loaded.risk.responses(labels, confidence)
+            for i, result, row_confidence, risk in zip(valid_indices, diagnose(labels), confidence,
+                                                       risk_responses):
+                response = {
+                    "index": i,
+                    "prediction": result,
+                    "confidence": round(float(row_confidence) * 100, 2)
+                }
+                response.update(risk)
+                results[i] = response
+            # One audit entry for the whole request, expanded on the writer thread
+            audit_log.record_matrix(g.current_user, loaded.version, 'batch', loaded.schema.features,
+                                    input_data, labels, confidence)
+
+        with stage('serialize'):
+            return jsonify({
+                "model_version": loaded.version,
+                "count": len(rows),
+                "scored": len(valid_indices),
+                "failed": len(rows) - len(valid_indices),
+                "results": results
+            }), 200
+
+    except Exception as e:
+        return jsonify({
+            "error": "Batch prediction failed",
+            "message": str(e),
+            "required_features": required_features
+        }), 500
@@ -0,0 +1,144 @@
+# app/predict/validation.py
+import hashlib
+import math
+
+import numpy as np
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Optional: Flask's json module is used instead
+    orjson = None
+
+# How far beyond the training min/max a value may go, as a fraction of that range
+RANGE_MARGIN = 0.5
+
+# Bounds when there are no statistics: still false for NaN and infinities
+_FLOAT_MAX = float(np.finfo(np.float64).max)
+
+class FeatureSchema:
+    """feature_info.json compiled for validating request rows.
+
+    The feature order is fixed once per loaded model, and so are the
+    accepted bounds: the training min/max from the "statistics" section
+    widened by `margin` times the training range, never below 0 for a
+    feature that was never negative. Without statistics (or with margin
+    None) only finiteness is checked. Bounds are plain Python floats so a
+    10-feature row is checked with chained comparisons, cheaper than NumPy
+    calls on arrays that small.
+    """
+
+    def __init__(self, features, statistics=None, margin=RANGE_MARGIN):
+        self.features = tuple(features)
+        self.index = {name: i for i, name in enumerate(self.features)}
+        self.n_features = len(self.features)
+        self.lower = [-_FLOAT_MAX] * self.n_features
+        self.upper = [_FLOAT_MAX] * self.n_features
+        if statistics and margin is not None:
+            for i, name in enumerate(self.features):
+                low, high = statistics[name]['min'], statistics[name]['max']
+                span = high - low
+                self.lower[i] = max(low - margin * span, 0.0) if low >= 0 else low - margin * span
+                self.upper[i] = high + margin * span
+        self._checks = tuple(zip(range(self.n_features), self.features, self.lower, self.upper))
+        self._lower_array = np.array(self.lower)
+        self._upper_array = np.array(self.upper)
+        # Identifies the ordered feature list, e.g. in binary request headers
+        self.version = hashlib.sha256('\n'.join(self.features).encode('utf-8')).digest()[:8]
+
+    @classmethod
+    def from_feature_info(cls, feature_info, margin=RANGE_MARGIN):
+        return cls(feature_info['features'], feature_info.get('statistics'), margin)
+
+    def parse(self, features, out=None):
+        """Fill a float64 row from a {feature: value} dict.
+
+        Writes into `out` when given (a row of a preallocated matrix).
+        Returns (row, error) where error is None or a dict for the response.
+        """
+        if type(features) is not dict:
+            return None, {"error": "Invalid input format", "message": "Each case must be a dictionary of features"}
+
+        row = np.empty(self.n_features) if out is None else out
+        missing_features = []
+        invalid_features = []
+        rejected = []
+        for i, name, low, high in self._checks:
+            value = features.get(name)
+            # bool is an int subclass; checking the exact type rejects it and stays cheap
+            value_type = type(value)
+            if value_type is float or value_type is int:
+                # False for NaN and infinities as well
+                if low <= value <= high:
+                    row[i] = value
+                else:
+                    rejected.append(name)
+            elif value is None and name not in features:
+                missing_features.append(name)
+            else:
+                invalid_features.append(name)
+
+        if missing_features:
+            return None, {"error": "Missing features", "missing_features": missing_features}
+        if invalid_features:
+            return None, {
+                "error": "Invalid feature values",
+                "message": "All features must be numerical values",
+                "invalid_features": invalid_features
+            }
+
+        if not rejected:
+            return row, None
+
+        non_finite = [name for name in rejected
+                      if type(features[name]) is float and not math.isfinite(features[name])]
+        if non_finite:
+            return None, {
+                "error": "Invalid feature values",
+                "message": "Feature values must be finite numbers",
+                "invalid_features": non_finite
+            }
+        return None, {
+            "error": "Feature values out of range",
+            "message": "Values are too far outside the range seen in training",
+            "out_of_range": {
+                name: {"value": features[name], "min": self.lower[self.index[name]],
+                       "max": self.upper[self.index[name]]}
+                for name in rejected
+            }
+        }
+
+    def accepted(self, matrix):
+        """Boolean mask of the rows of `matrix` whose values are all finite and within bounds"""
+        return ((matrix >= self._lower_array) & (matrix <= self._upper_array)).all(axis=1)
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson.
+
+    Dates, decimals and dataclasses still go through Flask's default
+    conversion, so responses are unchanged. orjson rejects NaN/Infinity
+    literals in request bodies.
+    """
+
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+def init_app(app):
+    """Use orjson for request and response bodies per JSON_CODEC"""
+    codec = app.config['JSON_CODEC']
+    if codec == 'auto':
+        codec = 'orjson' if orjson is not None else 'json'
+    if codec == 'orjson' and orjson is None:
+        raise ValueError("JSON_CODEC 'orjson' requires orjson")
+    if codec not in ('orjson', 'json'):
+        raise ValueError(f"JSON_CODEC must be 'auto', 'orjson' or 'json', got {codec!r}")
+    if codec == 'orjson':
+        app.json = OrjsonProvider(app)
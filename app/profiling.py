@@ -0,0 +1,280 @@
+# app/profiling.py
+import collections
+import contextlib
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+from flask import g, request
+
+# Profiler control and scraping are never profiled themselves
+EXEMPT_ENDPOINTS = ('metrics', 'predict.profile_start', 'predict.profile_status',
+                    'predict.profile_stop', 'predict.profile_download')
+
+PROFILE_SUFFIX = '.collapsed'
+
+# The running session of this process, if any; sys._current_frames() is process-wide
+_session = None
+_session_lock = threading.Lock()
+
+def _frame_name(code, module):
+    return f"{module}:{code.co_qualname}"
+
+def _stack(frame, max_depth):
+    """Frame names from the outermost call to `frame`, at most max_depth deep"""
+    names = []
+    while frame is not None and len(names) < max_depth:
+        names.append(_frame_name(frame.f_code, frame.f_globals.get('__name__', '?')))
+        frame = frame.f_back
+    names.reverse()
+    return names
+
+class ProfileSession:
+    """Samples the stacks of registered threads until its budget runs out.
+
+    Threads are registered while they serve a profiled request or load a
+    model; a background thread reads their current frame every `interval`
+    seconds and counts each distinct stack, prefixed with the thread's
+    label (the endpoint, or 'model_load'). The session ends after `requests`
+    profiled requests have finished or once `seconds` have passed, whichever
+    comes first, and writes the counts as collapsed stacks to `path`.
+    """
+
+    def __init__(self, path, requests=None, seconds=None, interval=0.005, endpoints=None, max_depth=128,
+                 logger=None):
+        self.path = path
+        self.logger = logger or logging.getLogger(__name__)
+        self.remaining = requests
+        self.seconds = seconds
+        self.interval = interval
+        self.endpoints = set(endpoints) if endpoints else None
+        self.max_depth = max_depth
+        self.started = time.time()
+        self.deadline = time.monotonic() + seconds if seconds else None
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self.profiled = 0
+        self.finished = None
+        self.error = None
+        self._threads = {}
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._sample, name='profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def begin_request(self, endpoint):
+        """Register the current thread for this request if the budget allows"""
+        if self.endpoints is not None and endpoint not in self.endpoints:
+            return False
+        with self._lock:
+            if self._done.is_set() or self.remaining == 0:
+                return False
+            if self.remaining is not None:
+                self.remaining -= 1
+            self._threads[threading.get_ident()] = endpoint
+            self.profiled += 1
+        return True
+
+    def end_request(self):
+        with self._lock:
+            self._threads.pop(threading.get_ident(), None)
+
+    @contextlib.contextmanager
+    def track(self, label):
+        ident = threading.get_ident()
+        with self._lock:
+            # Nested in a profiled request, the stack already shows where we are
+            registered = ident not in self._threads and not self._done.is_set()
+            if registered:
+                self._threads[ident] = label
+        try:
+            yield
+        finally:
+            if registered:
+                with self._lock:
+                    self._threads.pop(ident, None)
+
+    def stop(self):
+        """End the session now and wait for its profile to be written"""
+        self._done.set()
+        if self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def _expired(self):
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return True
+        return self.remaining == 0 and not self._threads
+
+    def _sample(self):
+        own = threading.get_ident()
+        try:
+            while not self._done.wait(self.interval):
+                frames = sys._current_frames()
+                with self._lock:
+                    threads = list(self._threads.items())
+                    if self._expired():
+                        break
+                for ident, label in threads:
+                    frame = frames.get(ident)
+                    if frame is None or ident == own:
+                        continue
+                    self.stacks[(label, *_stack(frame, self.max_depth))] += 1
+                    self.samples += 1
+                del frames
+        except Exception as e:
+            self.error = f"Sampling failed: {e}"
+            self.logger.exception("Profiling session %s stopped early", os.path.basename(self.path))
+        finally:
+            # Always end the session, or it would block new ones until restart
+            self._done.set()
+            try:
+                self._write()
+            except Exception as e:
+                self.error = f"Writing the profile failed: {e}"
+                self.logger.exception("Could not write profile %s", self.path)
+
+    def _write(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{';'.join(stack)} {count}\n")
+        os.replace(tmp_path, self.path)
+        self.finished = time.time()
+
+    @property
+    def active(self):
+        return not self._done.is_set()
+
+    def status(self):
+        with self._lock:
+            remaining = self.remaining
+            threads = len(self._threads)
+        return {
+            "active": self.active,
+            "profile": os.path.basename(self.path),
+            "started": datetime.fromtimestamp(self.started, timezone.utc).isoformat(),
+            "requests_remaining": remaining,
+            "requests_profiled": self.profiled,
+            "in_flight": threads,
+            "seconds_left": (round(max(self.deadline - time.monotonic(), 0.0), 3)
+                             if self.deadline is not None and self.active else None),
+            "samples": self.samples,
+            "distinct_stacks": len(self.stacks),
+            "error": self.error,
+            "interval_ms": self.interval * 1000
+        }
+
+class Profiler:
+    """On-demand sampling profiler for the running worker process.
+
+    An admin starts a session for the next N requests or a time window (see
+    the /predict/admin/profile routes); no restart is needed and nothing is
+    sampled otherwise. The result is one collapsed-stack file per session in
+    PROFILE_DIR, ready for flamegraph.pl or speedscope. Sessions are per
+    process: with several server workers, only the one that received the
+    start request is profiled.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.directory = None
+        self.interval = 0.005
+        self.max_seconds = 300.0
+        self.max_requests = 10000
+        self.last = None
+        self.logger = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config['PROFILE_ENABLED']
+        self.directory = app.config['PROFILE_DIR'] or os.path.join(app.instance_path, 'profiles')
+        self.interval = app.config['PROFILE_INTERVAL']
+        self.max_seconds = app.config['PROFILE_MAX_SECONDS']
+        self.max_requests = app.config['PROFILE_MAX_REQUESTS']
+        self.last = None
+        self.logger = app.logger
+        app.extensions['profiler'] = self
+        if not self.enabled:
+            return
+
+        app.before_request(self._before_request)
+        app.teardown_request(self._teardown_request)
+
+    def start(self, requests=None, seconds=None, interval=None, endpoints=None):
+        """Start a session; raises ValueError on a bad budget, RuntimeError if one is running"""
+        global _session
+        if requests is None and seconds is None:
+            requests = 100
+        if requests is not None and not 0 < requests <= self.max_requests:
+            raise ValueError(f"requests must be between 1 and {self.max_requests}")
+        if seconds is not None and not 0 < seconds <= self.max_seconds:
+            raise ValueError(f"seconds must be between 0 and {self.max_seconds}")
+        interval = self.interval if interval is None else interval
+        if not 0.0005 <= interval <= 1.0:
+            raise ValueError("interval must be between 0.0005 and 1 second")
+
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')
+        path = os.path.join(self.directory, f"profile-{stamp}-{os.getpid()}{PROFILE_SUFFIX}")
+        with _session_lock:
+            if _session is not None and _session.active:
+                raise RuntimeError("A profiling session is already running")
+            # A request budget alone still ends after PROFILE_MAX_SECONDS
+            session = ProfileSession(path, requests, seconds or self.max_seconds, interval, endpoints,
+                                     logger=self.logger)
+            session.start()
+            _session = self.last = session
+        return session
+
+    def stop(self):
+        """End the running session early; returns it, or None if none was running"""
+        session = _session
+        if session is None or not session.active:
+            return None
+        session.stop()
+        return session
+
+    def status(self):
+        session = _session
+        return {
+            "enabled": self.enabled,
+            "session": session.status() if session is not None else None,
+            "profiles": self.profiles()
+        }
+
+    def profiles(self):
+        """Names of the collapsed-stack files written so far, newest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted((name for name in os.listdir(self.directory) if name.endswith(PROFILE_SUFFIX)),
+                      reverse=True)
+
+    def _before_request(self):
+        session = _session
+        if session is None or not session.active or request.endpoint in EXEMPT_ENDPOINTS:
+            return
+        if session.begin_request(request.endpoint or 'unmatched'):
+            g.profile_session = session
+
+    def _teardown_request(self, exc):
+        session = g.pop('profile_session', None)
+        if session is not None:
+            session.end_request()
+
+def track(label):
+    """Context manager adding the current thread to a running session as `label`.
+
+    Used for work outside the request threads (model loads, the
+    micro-batcher) that a profile should still show; a no-op when no session
+    is running.
+    """
+    session = _session
+    if session is None or not session.active:
+        return contextlib.nullcontext()
+    return session.track(label)
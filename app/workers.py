@@ -0,0 +1,101 @@
+# app/workers.py
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from app.auth.passwords import check_password, hash_password
+from app.predict.core import score
+from app.predict.registry import ModelRegistry
+
+# Per-process state of pool workers, set up by _init_worker
+_worker_registry = None
+
+def _init_worker(model_dir):
+    """Pool initializer: load the model once so every task finds it ready"""
+    global _worker_registry
+    _worker_registry = ModelRegistry.for_directory(model_dir)
+
+class ModelVersionMismatch(Exception):
+    """Raised by a worker whose model directory no longer holds the requested version"""
+
+def _score_task(input_data, version):
+    # Catch up if the parent reloaded a newer model since this worker started
+    loaded = _worker_registry.get()
+    if loaded.version != version:
+        _worker_registry.reload()
+        loaded = _worker_registry.get()
+        if loaded.version != version:
+            raise ModelVersionMismatch(f"Worker has model {loaded.version}, request expects {version}")
+    return score(loaded.model, input_data, loaded.scaler)
+
+class WorkerPool:
+    """Process pool for CPU-bound work: forest scoring and bcrypt.
+
+    With WORKER_POOL_SIZE > 0 the calls below run in worker processes, each
+    with the model preloaded, so a burst of logins cannot starve predictions
+    of the GIL and one server process can use every core. With 0 they run
+    inline in the request thread.
+    """
+
+    def __init__(self, app=None):
+        self.size = 0
+        self.model_dir = None
+        self.bcrypt_rounds = 12
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.size = app.config['WORKER_POOL_SIZE']
+        self.model_dir = app.config['MODEL_DIR']
+        self.bcrypt_rounds = app.config.get('BCRYPT_LOG_ROUNDS', 12)
+        app.extensions['worker_pool'] = self
+
+    @property
+    def enabled(self):
+        return self.size > 0
+
+    def _get_executor(self):
+        # Pools do not survive fork: each server process creates its own
+        if self._executor_pid != os.getpid():
+            with self._lock:
+                if self._executor_pid != os.getpid():
+                    # Not fork: this process already runs the batcher, audit and
+                    # watcher threads, whose locks a forked child would inherit held
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.size,
+                        mp_context=multiprocessing.get_context('forkserver'),
+                        initializer=_init_worker,
+                        initargs=(self.model_dir,)
+                    )
+                    self._executor_pid = os.getpid()
+                    atexit.register(self._executor.shutdown, wait=False, cancel_futures=True)
+        return self._executor
+
+    def score(self, loaded, input_data, stage=None):
+        """Score rows with `loaded`'s model version; returns (probabilities, labels, confidence).
+
+        `stage` times the steps when they run in this process (see core.score).
+        """
+        if not self.enabled:
+            return score(loaded.model, input_data, loaded.scaler, stage)
+        try:
+            return self._get_executor().submit(_score_task, input_data, loaded.version).result()
+        except ModelVersionMismatch:
+            # The artifacts changed again since `loaded` was built: score with it here
+            return score(loaded.model, input_data, loaded.scaler, stage)
+
+    def hash_password(self, password, rounds=None):
+        rounds = rounds or self.bcrypt_rounds
+        if not self.enabled:
+            return hash_password(password, rounds)
+        return self._get_executor().submit(hash_password, password, rounds).result()
+
+    def check_password(self, pw_hash, password):
+        if not self.enabled:
+            return check_password(pw_hash, password)
+        return self._get_executor().submit(check_password, pw_hash, password).result()
@@ -0,0 +1,150 @@
+# app/wsgi_adapter.py
+"""WSGI-to-ASGI adapter running each request on a bounded thread pool.
+
+Adapted from asgiref's WsgiToAsgi, which runs the WSGI application through a
+thread-sensitive sync_to_async: every request then shares one thread, so a
+login hashing its password holds up all the others. Only public asyncio
+APIs are used, so no asgiref internals can change underneath it.
+"""
+import asyncio
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+
+def build_environ(scope, body, duplicate_header_limit=100):
+    """WSGI environ for an ASGI http scope; raises ValueError on too many duplicate headers"""
+    script_name = scope.get("root_path", "").encode("utf8").decode("latin1")
+    path_info = scope["path"].encode("utf8").decode("latin1")
+    if path_info.startswith(script_name):
+        path_info = path_info[len(script_name):]
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": script_name,
+        "PATH_INFO": path_info,
+        "QUERY_STRING": scope["query_string"].decode("ascii"),
+        "SERVER_PROTOCOL": f"HTTP/{scope['http_version']}",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": body,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    # Required in WSGI, not in ASGI
+    server = scope.get("server") or ("localhost", 80)
+    environ["SERVER_NAME"] = server[0]
+    environ["SERVER_PORT"] = str(server[1])
+    if scope.get("client") is not None:
+        environ["REMOTE_ADDR"] = scope["client"][0]
+
+    headers = {}
+    for name, value in scope.get("headers", []):
+        name = name.decode("latin1")
+        if name == "content-length":
+            key = "CONTENT_LENGTH"
+        elif name == "content-type":
+            key = "CONTENT_TYPE"
+        else:
+            key = "HTTP_" + name.upper().replace("-", "_")
+        values = headers.setdefault(key, [])
+        if duplicate_header_limit and len(values) >= duplicate_header_limit:
+            raise ValueError(f"Too many duplicate headers: {key} exceeds limit of {duplicate_header_limit}")
+        values.append(value.decode("latin1"))
+    for key, values in headers.items():
+        environ[key] = ",".join(values)
+    return environ
+
+class _WsgiRequest:
+    """One request, run on a pool thread; ASGI messages are sent back through the event loop"""
+
+    def __init__(self, application, scope, body, send, loop, duplicate_header_limit):
+        self.application = application
+        self.scope = scope
+        self.body = body
+        self._send = send
+        self.loop = loop
+        self.duplicate_header_limit = duplicate_header_limit
+        self.response_start = None
+        self.response_started = False
+        self.content_length = None
+
+    def send(self, message):
+        asyncio.run_coroutine_threadsafe(self._send(message), self.loop).result()
+
+    def start_response(self, status, response_headers, exc_info=None):
+        if self.response_started and exc_info:
+            raise exc_info[1].with_traceback(exc_info[2])
+        if self.response_start is not None and exc_info is None:
+            raise ValueError("start_response cannot be called a second time without exc_info")
+        self.content_length = None
+        for name, value in response_headers:
+            if name.lower() == "content-length":
+                self.content_length = int(value)
+        self.response_start = {
+            "type": "http.response.start",
+            "status": int(status.split(" ", 1)[0]),
+            "headers": [(name.lower().encode("ascii"), value.encode("ascii"))
+                        for name, value in response_headers],
+        }
+
+    def run(self):
+        try:
+            environ = build_environ(self.scope, self.body, self.duplicate_header_limit)
+        except ValueError:
+            self.send({"type": "http.response.start", "status": 400,
+                       "headers": [(b"content-type", b"text/plain")]})
+            self.send({"type": "http.response.body", "body": b"Bad Request: Too many duplicate headers"})
+            return
+
+        output = self.application(environ, self.start_response)
+        try:
+            sent = 0
+            for chunk in output:
+                if not self.response_started:
+                    self.response_started = True
+                    self.send(self.response_start)
+                # Never send more than the Content-Length the application announced
+                if self.content_length is not None:
+                    chunk = chunk[:self.content_length - sent]
+                self.send({"type": "http.response.body", "body": chunk, "more_body": True})
+                sent += len(chunk)
+                if sent == self.content_length:
+                    break
+        finally:
+            # Runs the application's teardown (Flask's teardown_request, ...)
+            close = getattr(output, "close", None)
+            if close is not None:
+                close()
+        if not self.response_started:
+            self.response_started = True
+            self.send(self.response_start)
+        self.send({"type": "http.response.body"})
+
+class ThreadedWsgiToAsgi:
+    """ASGI application running a WSGI one on a pool of `max_threads` threads.
+
+    Requests beyond max_threads wait for a free thread, so a slow request
+    (a login hashing its password) only holds up its own thread.
+    """
+
+    def __init__(self, wsgi_application, max_threads=32, duplicate_header_limit=100):
+        self.wsgi_application = wsgi_application
+        self.duplicate_header_limit = duplicate_header_limit
+        self.executor = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix='asgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            raise ValueError("WSGI adapter received a non-HTTP scope")
+        with SpooledTemporaryFile(max_size=65536) as body:
+            while True:
+                message = await receive()
+                if message["type"] != "http.request":
+                    raise ValueError("WSGI adapter received a non-HTTP-request message")
+                body.write(message.get("body", b""))
+                if not message.get("more_body"):
+                    break
+            body.seek(0)
+            loop = asyncio.get_running_loop()
+            request = _WsgiRequest(self.wsgi_application, scope, body, send, loop, self.duplicate_header_limit)
+            await loop.run_in_executor(self.executor, request.run)
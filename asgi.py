@@ -0,0 +1,16 @@
+# asgi.py
+"""ASGI entry point.
+
+Run with an ASGI server, e.g.:
+    WORKER_POOL_SIZE=4 uvicorn asgi:asgi_app --host 0.0.0.0 --port 5000
+
+Each request runs on its own thread from a pool of ASGI_THREADS (see
+app/wsgi_adapter.py), and the CPU-bound parts (forest scoring, bcrypt) are
+handed to the WORKER_POOL_SIZE process pool, so a login hashing its
+password does not hold up other requests.
+"""
+from app import create_app
+from app.wsgi_adapter import ThreadedWsgiToAsgi
+
+app = create_app()
+asgi_app = ThreadedWsgiToAsgi(app, max_threads=app.config['ASGI_THREADS'])
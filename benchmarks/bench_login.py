@@ -0,0 +1,83 @@
+# benchmarks/bench_login.py
+"""Login throughput of /auth/login for each bcrypt cost setting.
+
+Run from the project root: python benchmarks/bench_login.py --costs 10 11 12
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from app import create_app, db
+
+def run_cost(rounds, clients, logins_per_client, pool_size):
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite://'
+        BCRYPT_LOG_ROUNDS = rounds
+        BCRYPT_TARGET_MS = 0
+        WORKER_POOL_SIZE = pool_size
+        AUTH_USER_CACHE_TTL = 300
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+    client = app.test_client()
+    client.post('/auth/register', json={
+        "username": "bench", "password": "bench-password", "email": "bench@example.com"
+    })
+
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def worker():
+        local_client = app.test_client()
+        for _ in range(logins_per_client):
+            start = time.perf_counter()
+            response = local_client.post('/auth/login', json={"username": "bench", "password": "bench-password"})
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                if response.status_code != 200:
+                    errors.append(response.status_code)
+
+    threads = [threading.Thread(target=worker) for _ in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    latencies_ms = np.array(latencies) * 1000.0
+    return {
+        "cost": rounds,
+        "logins": len(latencies),
+        "errors": len(errors),
+        "throughput_per_s": len(latencies) / wall,
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--costs', type=int, nargs='+', default=[10, 11, 12])
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--logins', type=int, default=5, help="Logins per client")
+    parser.add_argument('--pool-size', type=int, default=0, help="WORKER_POOL_SIZE to run with")
+    args = parser.parse_args()
+
+    print(f"{'cost':>4} {'logins':>7} {'errors':>6} {'logins/s':>9} {'p50 ms':>8} {'p95 ms':>8}")
+    for rounds in args.costs:
+        result = run_cost(rounds, args.clients, args.logins, args.pool_size)
+        print(f"{result['cost']:>4} {result['logins']:>7} {result['errors']:>6} "
+              f"{result['throughput_per_s']:>9.1f} {result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f}")
+
+if __name__ == "__main__":
+    main()
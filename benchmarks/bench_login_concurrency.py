@@ -0,0 +1,98 @@
+# benchmarks/bench_login_concurrency.py
+"""/auth/login under many parallel clients against a file-backed SQLite store.
+
+Every client logs in as its own user with the user cache disabled, so each
+request reaches the database; bcrypt runs at a low cost so the database
+and connection handling dominate.
+
+Run from the project root: python benchmarks/bench_login_concurrency.py --clients 50
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+
+from config import Config
+from app import create_app, db
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--logins', type=int, default=20, help="Logins per client")
+    parser.add_argument('--bcrypt-rounds', type=int, default=4)
+    parser.add_argument('--database-url', default=None,
+                        help="Database to use instead of a temporary SQLite file")
+    args = parser.parse_args()
+
+    db_dir = tempfile.mkdtemp()
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = args.database_url or f"sqlite:///{os.path.join(db_dir, 'bench.db')}"
+        BCRYPT_LOG_ROUNDS = args.bcrypt_rounds
+        BCRYPT_TARGET_MS = 0
+        AUTH_USER_CACHE_SIZE = 0
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        journal_mode = None
+        if BenchConfig.SQLALCHEMY_DATABASE_URI.startswith('sqlite'):
+            journal_mode = db.session.execute(text("PRAGMA journal_mode")).scalar()
+
+    client = app.test_client()
+    for i in range(args.clients):
+        client.post('/auth/register', json={
+            "username": f"user{i}", "password": "bench-password", "email": f"user{i}@example.com"
+        })
+
+    latencies, errors = [], []
+    lock = threading.Lock()
+    barrier = threading.Barrier(args.clients)
+
+    def worker(i):
+        local_client = app.test_client()
+        barrier.wait()
+        for _ in range(args.logins):
+            start = time.perf_counter()
+            response = local_client.post('/auth/login', json={
+                "username": f"User{i}", "password": "bench-password"
+            })
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                if response.status_code != 200:
+                    errors.append(response.status_code)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    latencies_ms = np.array(latencies) * 1000.0
+    print(json.dumps({
+        "database": BenchConfig.SQLALCHEMY_DATABASE_URI.split(':')[0],
+        "journal_mode": journal_mode,
+        "engine_options": app.config['SQLALCHEMY_ENGINE_OPTIONS'],
+        "clients": args.clients,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "throughput_per_s": round(len(latencies) / wall, 1),
+        "p50_ms": round(float(np.percentile(latencies_ms, 50)), 2),
+        "p95_ms": round(float(np.percentile(latencies_ms, 95)), 2),
+        "p99_ms": round(float(np.percentile(latencies_ms, 99)), 2),
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
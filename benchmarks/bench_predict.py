@@ -0,0 +1,67 @@
+# benchmarks/bench_predict.py
+"""Per-request latency of the prediction core, before and after.
+
+Run from the project root: python benchmarks/bench_predict.py
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import warnings
+
+import joblib
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.predict.core import score
+from app.predict.engine import ForestEngine
+
+def time_per_call(fn, repeat):
+    """Median latency of fn() in microseconds"""
+    fn()  # warm-up
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return float(np.median(samples) * 1e6)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=500)
+    args = parser.parse_args()
+
+    warnings.simplefilter('ignore', UserWarning)
+    final_model = joblib.load('final_model.pkl')
+    scaler_top = joblib.load('scaler_top.pkl')
+    engine = ForestEngine.from_sklearn(final_model)
+    fused = joblib.load('fused_model.pkl') if os.path.exists('fused_model.pkl') else None
+
+    with open('feature_info.json', 'r') as f:
+        n_features = len(json.load(f)['features'])
+    row = np.array([[515.8, 0.0737, 0.02799, 12.88, 0.07741, 89.61, 81.47, 12.4, 467.8, 0.2403]])
+    assert row.shape[1] == n_features
+
+    def before():
+        # Original view: scale, then predict and predict_proba back to back
+        scaled = scaler_top.transform(row)
+        final_model.predict(scaled)
+        final_model.predict_proba(scaled)
+
+    cases = {
+        "sklearn predict + predict_proba": before,
+        "sklearn single pass": lambda: score(final_model, row, scaler_top),
+        "engine single pass": lambda: score(engine, row, scaler_top),
+    }
+    if fused is not None:
+        cases["fused engine single pass"] = lambda: score(fused, row)
+
+    results = {name: time_per_call(fn, args.repeat) for name, fn in cases.items()}
+    baseline = results["sklearn predict + predict_proba"]
+    for name, latency in results.items():
+        print(f"{name:34s} {latency:10.1f} us/request  ({baseline / latency:5.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,357 @@
+# benchmarks/load_test.py
+"""Load test of /auth/login and /predict/predict, reported as JSON.
+
+By default the app runs in-process on a temporary SQLite database (bcrypt
+at a low cost); --url drives a running server instead. Users are seeded
+first, then --clients threads send requests for --duration seconds, either
+as fast as the server answers or paced to a total --rate per second. With a
+rate, latency is measured from each request's scheduled start, so time
+spent queued behind a slow server counts.
+
+Each prediction sends a dataset row with every value scaled by a random
+factor within --jitter, so repeated rows do not turn into prediction cache
+hits; the in-process app runs without the cache unless --cache is given.
+The report records the server's cache and micro-batching settings and its
+cache hit rate during the run, read from the admin stats endpoints.
+
+Save a run with --output and compare a later one with --baseline: the
+exit status is 1 when p95 latency, throughput or error rate regressed by
+more than --tolerance.
+
+Run from the project root: python benchmarks/load_test.py --clients 20 --duration 10
+"""
+import argparse
+import http.client
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sklearn.datasets import load_breast_cancer
+
+PASSWORD = "bench-password"
+ADMIN_USER = "loadtest-admin"
+# Server settings that must match for two reports to be compared
+SETTING_KEYS = ("enabled", "max_batch_size", "max_wait_ms")
+
+class InProcessClient:
+    """Flask test client with the (status, body) interface of HttpClient"""
+
+    def __init__(self, app):
+        self._client = app.test_client()
+
+    def post(self, path, payload, token=None):
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        response = self._client.post(path, json=payload, headers=headers)
+        return response.status_code, response.get_data()
+
+    def get(self, path, token=None):
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        response = self._client.get(path, headers=headers)
+        return response.status_code, response.get_data()
+
+class HttpClient:
+    """One keep-alive connection to a running server"""
+
+    def __init__(self, url, timeout=30):
+        parts = urlsplit(url)
+        connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self._prefix = parts.path.rstrip('/')
+        self._connect = lambda: connection_class(parts.netloc, timeout=timeout)
+        self._connection = self._connect()
+
+    def post(self, path, payload, token=None):
+        return self._request('POST', path, json.dumps(payload), token)
+
+    def get(self, path, token=None):
+        return self._request('GET', path, None, token)
+
+    def _request(self, method, path, body, token):
+        headers = {"Content-Type": "application/json"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        try:
+            self._connection.request(method, self._prefix + path, body=body, headers=headers)
+            response = self._connection.getresponse()
+            return response.status, response.read()
+        except (OSError, http.client.HTTPException):
+            # Start the next request on a fresh connection
+            self._connection.close()
+            self._connection = self._connect()
+            raise
+
+def make_client_factory(args):
+    """Return (config description, factory of per-thread clients)"""
+    if args.url:
+        return {"mode": "http", "url": args.url}, lambda: HttpClient(args.url)
+
+    from config import Config
+    from app import create_app, db
+
+    work_dir = tempfile.mkdtemp()
+
+    class LoadTestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(work_dir, 'load_test.db')}"
+        BCRYPT_LOG_ROUNDS = args.bcrypt_rounds
+        BCRYPT_TARGET_MS = 0
+        AUDIT_LOG_DIR = os.path.join(work_dir, 'audit')
+        HISTORY_DIR = os.path.join(work_dir, 'history')
+        # Replayed dataset rows would otherwise be answered from the cache
+        PREDICT_CACHE_ENABLED = args.cache
+
+    app = create_app(LoadTestConfig)
+    with app.app_context():
+        db.create_all()
+    return {"mode": "in-process", "bcrypt_rounds": args.bcrypt_rounds}, lambda: InProcessClient(app)
+
+def seed_users(client, n_users):
+    """Register the load-test doctors and the admin reading stats; existing ones are reused"""
+    users = [(f"loadtest{i}", "doctor") for i in range(n_users)] + [(ADMIN_USER, "admin")]
+    for username, role in users:
+        status, body = client.post('/auth/register', {
+            "username": username, "password": PASSWORD,
+            "email": f"{username}@example.com", "role": role
+        })
+        if status not in (201, 400):
+            raise RuntimeError(f"Seeding {username} failed with {status}: {body[:200]!r}")
+
+def server_stats(client):
+    """Prediction cache and micro-batching stats of the server, or None where unavailable"""
+    status, body = client.post('/auth/login', {"username": ADMIN_USER, "password": PASSWORD})
+    if status != 200:
+        return {"cache": None, "batching": None}
+    token = json.loads(body)["access_token"]
+    stats = {}
+    for name, path in (("cache", '/predict/cache/stats'), ("batching", '/predict/batching/stats')):
+        status, body = client.get(path, token)
+        stats[name] = json.loads(body) if status == 200 else None
+    return stats
+
+def server_settings(before, after):
+    """Cache and batching settings, with the hit rate and mean batch size of the run alone"""
+    settings = {"prediction_cache": None, "batching": None}
+    cache_before, cache_after = before["cache"], after["cache"]
+    if cache_before and cache_after:
+        hits = cache_after["hits"] - cache_before["hits"]
+        misses = cache_after["misses"] - cache_before["misses"]
+        settings["prediction_cache"] = {
+            "enabled": cache_after["enabled"],
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else None
+        }
+    batching_before, batching_after = before["batching"], after["batching"]
+    if batching_before and batching_after:
+        batches = batching_after["batches"] - batching_before["batches"]
+        rows = batching_after["rows"] - batching_before["rows"]
+        settings["batching"] = {
+            "enabled": batching_after["enabled"],
+            "max_batch_size": batching_after["max_batch_size"],
+            "max_wait_ms": batching_after["max_wait_ms"],
+            "mean_batch_size": round(rows / batches, 2) if batches else None
+        }
+    return settings
+
+def login(client, i):
+    status, body = client.post('/auth/login', {"username": f"loadtest{i}", "password": PASSWORD})
+    if status != 200:
+        raise RuntimeError(f"Login of loadtest{i} failed with {status}: {body[:200]!r}")
+    return json.loads(body)["access_token"]
+
+def load_cases():
+    """Every row of the dataset, as (feature names, matrix)"""
+    with open('feature_info.json', 'r') as f:
+        features = json.load(f)['features']
+    return features, load_breast_cancer(as_frame=True).data[features].to_numpy()
+
+def make_case(features, matrix, rng, jitter):
+    """Request body for a random row, each value scaled by up to +/- jitter"""
+    row = matrix[rng.integers(len(matrix))]
+    if jitter:
+        row = row * rng.uniform(1 - jitter, 1 + jitter, len(row))
+    return {"features": dict(zip(features, row.tolist()))}
+
+def summarize(samples, wall):
+    """Latency percentiles, throughput and errors of (latency_s, status) samples"""
+    if not samples:
+        return {"requests": 0}
+    latencies_ms = np.array([latency for latency, _ in samples]) * 1000.0
+    statuses = Counter(str(status) for _, status in samples)
+    errors = sum(n for status, n in statuses.items() if not status.startswith('2'))
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "error_rate": round(errors / len(samples), 4),
+        "status_codes": dict(statuses),
+        "throughput_per_s": round(len(samples) / wall, 1),
+        "mean_ms": round(float(latencies_ms.mean()), 2),
+        "p50_ms": round(float(np.percentile(latencies_ms, 50)), 2),
+        "p95_ms": round(float(np.percentile(latencies_ms, 95)), 2),
+        "p99_ms": round(float(np.percentile(latencies_ms, 99)), 2),
+        "max_ms": round(float(latencies_ms.max()), 2),
+    }
+
+def run(args, client_factory):
+    """Returns (results per endpoint, server stats before, server stats after)"""
+    features, matrix = load_cases()
+    stats_client = client_factory()
+    seed_users(stats_client, args.users)
+    stats_before = server_stats(stats_client)
+
+    endpoints = {'login': ['login'], 'predict': ['predict'], 'mixed': ['login', 'predict']}[args.endpoint]
+    samples = {endpoint: [] for endpoint in endpoints}
+    lock = threading.Lock()
+    barrier = threading.Barrier(args.clients + 1)
+    # Seconds between two requests of one client to reach --rate in total
+    interval = args.clients / args.rate if args.rate else 0.0
+    state = {}
+
+    def worker(n):
+        client = client_factory()
+        user = n % args.users
+        token = login(client, user) if 'predict' in endpoints else None
+        rng = np.random.default_rng(n)
+        local = {endpoint: [] for endpoint in endpoints}
+        barrier.wait()
+        # Spread the clients' schedules over one interval
+        scheduled = state['start'] + interval * n / args.clients
+        while True:
+            now = time.perf_counter()
+            if now >= state['deadline']:
+                break
+            if interval:
+                if scheduled > now:
+                    time.sleep(scheduled - now)
+                start = scheduled
+                scheduled += interval
+            else:
+                start = now
+
+            if args.endpoint == 'mixed':
+                endpoint = 'login' if rng.random() < args.login_share else 'predict'
+            else:
+                endpoint = endpoints[0]
+            try:
+                if endpoint == 'login':
+                    status, _ = client.post('/auth/login', {"username": f"loadtest{user}", "password": PASSWORD})
+                else:
+                    status, _ = client.post('/predict/predict', make_case(features, matrix, rng, args.jitter),
+                                            token)
+            except Exception as e:
+                status = type(e).__name__
+            local[endpoint].append((time.perf_counter() - start, status))
+        with lock:
+            for endpoint, values in local.items():
+                samples[endpoint].extend(values)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(args.clients)]
+    for thread in threads:
+        thread.start()
+    state['start'] = time.perf_counter() + 0.05
+    state['deadline'] = state['start'] + args.duration
+    barrier.wait()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - state['start']
+
+    results = {endpoint: summarize(values, wall) for endpoint, values in samples.items()}
+    if len(endpoints) > 1:
+        results['all'] = summarize([sample for values in samples.values() for sample in values], wall)
+    return results, stats_before, server_stats(stats_client)
+
+def compare(results, load, baseline, tolerance):
+    """Regressions of `results` against a saved run, as readable strings.
+
+    Throughput is only compared between unpaced runs; with --rate it is set
+    by the rate rather than by the server.
+    """
+    regressions = []
+    compare_throughput = not load["rate_per_s"] and not baseline.get("load", {}).get("rate_per_s")
+    for endpoint, current in results.items():
+        previous = baseline.get("results", {}).get(endpoint)
+        if not previous or not current.get("requests") or not previous.get("requests"):
+            continue
+        if current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{endpoint}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms")
+        if compare_throughput and current["throughput_per_s"] < previous["throughput_per_s"] * (1 - tolerance):
+            regressions.append(f"{endpoint}: throughput {previous['throughput_per_s']}/s -> "
+                               f"{current['throughput_per_s']}/s")
+        if current["error_rate"] > previous["error_rate"] + tolerance / 100:
+            regressions.append(f"{endpoint}: error rate {previous['error_rate']} -> {current['error_rate']}")
+    return regressions
+
+def setting_changes(report, baseline):
+    """Settings that differ from a saved run, which makes its numbers incomparable"""
+    changes = []
+    for section, keys in (("load", ("jitter",)), ("server", ("prediction_cache", "batching"))):
+        for key in keys:
+            current = report.get(section, {}).get(key)
+            previous = baseline.get(section, {}).get(key)
+            if key != "jitter":
+                # Only the settings; hit rates and batch sizes are results
+                current = current and {k: v for k, v in current.items() if k in SETTING_KEYS}
+                previous = previous and {k: v for k, v in previous.items() if k in SETTING_KEYS}
+            if current != previous:
+                changes.append(f"{section}.{key}: {previous} -> {current}")
+    return changes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help="Base URL of a running server (default: run the app in-process)")
+    parser.add_argument('--endpoint', choices=['login', 'predict', 'mixed'], default='mixed')
+    parser.add_argument('--login-share', type=float, default=0.1, help="Share of logins in the mixed load")
+    parser.add_argument('--clients', type=int, default=10, help="Concurrent clients")
+    parser.add_argument('--users', type=int, default=10, help="Users seeded and shared by the clients")
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds of load")
+    parser.add_argument('--rate', type=float, default=0, help="Target requests per second in total (0: no limit)")
+    parser.add_argument('--bcrypt-rounds', type=int, default=4, help="bcrypt cost of the in-process app")
+    parser.add_argument('--cache', action='store_true', help="Enable the prediction cache of the in-process app")
+    parser.add_argument('--jitter', type=float, default=0.01,
+                        help="Scale each feature value by a random factor within +/- this fraction (0: exact rows)")
+    parser.add_argument('--output', help="Also write the report to this file")
+    parser.add_argument('--baseline', help="Report of an earlier run to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed relative regression")
+    args = parser.parse_args()
+
+    target, client_factory = make_client_factory(args)
+    results, stats_before, stats_after = run(args, client_factory)
+
+    report = {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "target": target,
+        "load": {
+            "endpoint": args.endpoint, "clients": args.clients, "users": args.users,
+            "duration_s": args.duration, "rate_per_s": args.rate or None,
+            "login_share": args.login_share if args.endpoint == 'mixed' else None,
+            "jitter": args.jitter
+        },
+        "server": server_settings(stats_before, stats_after),
+        "results": results
+    }
+    regressions = None
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare(results, report["load"], baseline, args.tolerance)
+        report["regressions"] = regressions
+        report["setting_changes"] = setting_changes(report, baseline)
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    if regressions:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
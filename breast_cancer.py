@@ -1,9 +1,12 @@
+import argparse
+import tempfile
+import time
 import numpy as np
 import pandas as pd
 import seaborn as sns
 import matplotlib.pyplot as plt
 from sklearn.datasets import load_breast_cancer
-from sklearn.model_selection import train_test_split, cross_val_score, StratifiedKFold
+from sklearn.model_selection import train_test_split, cross_val_score, StratifiedKFold, GridSearchCV
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import classification_report, roc_auc_score, confusion_matrix
 from sklearn.linear_model import LogisticRegression
@@ -11,9 +14,40 @@ from sklearn.ensemble import RandomForestClassifier
 from sklearn.svm import SVC
 from sklearn.pipeline import Pipeline
 from sklearn.feature_selection import SelectKBest, f_classif
+from sklearn.base import clone
+from joblib import Memory, Parallel, delayed
 import warnings
 warnings.filterwarnings('ignore')
 
+# Numbers of selected features tried by BreastCancerClassifier.search
+SEARCH_K_VALUES = (5, 10, 15, 20, 30)
+
+def _fit_candidate(pipeline, params, X, y):
+    # Candidates pickled in one batch share their estimator instances; fit copies
+    return clone(pipeline).set_params(**clone(params, safe=False)).fit(X, y)
+
+def _row_latency_ms(model, X, repeats=200):
+    """Median time of predict_proba on a single row, in milliseconds"""
+    row = X.iloc[[0]]
+    model.predict_proba(row)
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model.predict_proba(row)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times) * 1000)
+
+def pareto_front(auc, latency):
+    """Mask of candidates no other candidate beats on both AUC and latency"""
+    order = np.lexsort((-np.asarray(auc), np.asarray(latency)))
+    mask = np.zeros(len(order), dtype=bool)
+    best_auc = -np.inf
+    for i in order:
+        if auc[i] > best_auc:
+            mask[i] = True
+            best_auc = auc[i]
+    return mask
+
 class BreastCancerClassifier:
     def __init__(self, random_state=42):
         """Initialize the breast cancer classifier with configuration parameters."""
@@ -34,14 +68,18 @@ class BreastCancerClassifier:
         
         return X, y
     
-    def create_pipeline(self, n_features=15):
-        """Create a pipeline with feature selection and model training."""
+    def create_pipeline(self, n_features=15, C=0.1, memory=None):
+        """Create a pipeline with feature selection and model training.
+
+        `memory` (a joblib.Memory or directory) caches the fitted scaler and
+        feature selector across pipelines fitted on the same data.
+        """
         # Feature selection using ANOVA F-value
         self.feature_selector = SelectKBest(score_func=f_classif, k=n_features)
         
         # Initialize base model with regularization to prevent overfitting
         base_model = LogisticRegression(
-            C=0.1,  # Stronger regularization
+            C=C,  # Stronger regularization by default (0.1)
             max_iter=1000,
             random_state=self.random_state
         )
@@ -51,15 +89,15 @@ class BreastCancerClassifier:
             ('scaler', self.scaler),
             ('feature_selection', self.feature_selector),
             ('classifier', base_model)
-        ])
+        ], memory=memory)
     
-    def evaluate_model(self, X, y, cv=5):
-        """Evaluate model using cross-validation."""
+    def evaluate_model(self, X, y, cv=5, n_jobs=-1):
+        """Evaluate model using cross-validation, one fold per core."""
         # Create stratified k-fold cross-validation
         skf = StratifiedKFold(n_splits=cv, shuffle=True, random_state=self.random_state)
         
         # Compute cross-validation scores
-        cv_scores = cross_val_score(self.model, X, y, cv=skf, scoring='roc_auc')
+        cv_scores = cross_val_score(self.model, X, y, cv=skf, scoring='roc_auc', n_jobs=n_jobs)
         
         return {
             'mean_cv_score': cv_scores.mean(),
@@ -119,6 +157,77 @@ class BreastCancerClassifier:
             'test_predictions': (y_test, y_pred, y_pred_proba)
         }
 
+    def search_space(self, k_values=SEARCH_K_VALUES):
+        """Candidate grid: number of selected features x model family x regularization."""
+        k_values = list(k_values)
+        return [
+            {
+                'feature_selection__k': k_values,
+                'classifier': [LogisticRegression(max_iter=1000, random_state=self.random_state)],
+                'classifier__C': [0.01, 0.1, 1, 10]
+            },
+            {
+                'feature_selection__k': k_values,
+                'classifier': [RandomForestClassifier(random_state=self.random_state)],
+                'classifier__n_estimators': [50, 100, 200],
+                'classifier__max_depth': [4, 8, None]
+            },
+            {
+                'feature_selection__k': k_values,
+                'classifier': [SVC(probability=True, random_state=self.random_state)],
+                'classifier__C': [0.1, 1, 10]
+            }
+        ]
+
+    def search(self, X, y, cv=5, n_jobs=-1, cache_dir=None, k_values=SEARCH_K_VALUES):
+        """Cross-validate every candidate of search_space() across all cores.
+
+        The scaler fits and the f_classif scores are cached with joblib.Memory
+        (in cache_dir, or a temporary directory), so they are computed once per
+        fold instead of once per candidate. Each candidate is then refitted on
+        X and its single-row predict_proba latency measured.
+
+        Returns a DataFrame of ROC-AUC and latency per candidate, sorted by
+        latency, with a 'pareto' column marking the candidates that no other
+        one beats on both.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            memory = Memory(cache_dir or tmp_dir, verbose=0)
+            pipeline = Pipeline([
+                ('scaler', StandardScaler()),
+                ('feature_selection', SelectKBest(score_func=memory.cache(f_classif))),
+                ('classifier', LogisticRegression(max_iter=1000, random_state=self.random_state))
+            ], memory=memory)
+
+            skf = StratifiedKFold(n_splits=cv, shuffle=True, random_state=self.random_state)
+            grid = GridSearchCV(pipeline, self.search_space(k_values), scoring='roc_auc',
+                                cv=skf, n_jobs=n_jobs, refit=False)
+            grid.fit(X, y)
+
+            candidates = grid.cv_results_['params']
+            fitted = Parallel(n_jobs=n_jobs)(
+                delayed(_fit_candidate)(pipeline, params, X, y) for params in candidates
+            )
+
+        # Timed one after another, so candidates do not compete for cores
+        latency = np.array([_row_latency_ms(model, X) for model in fitted])
+        auc = grid.cv_results_['mean_test_score']
+
+        table = pd.DataFrame({
+            'model': [type(params['classifier']).__name__ for params in candidates],
+            'k': [params['feature_selection__k'] for params in candidates],
+            'params': [
+                ', '.join(f"{name.split('__')[-1]}={value}" for name, value in params.items()
+                          if name.startswith('classifier__'))
+                for params in candidates
+            ],
+            'mean_auc': auc,
+            'std_auc': grid.cv_results_['std_test_score'],
+            'latency_ms': latency,
+            'pareto': pareto_front(auc, latency)
+        })
+        return table.sort_values(['latency_ms', 'mean_auc'], ascending=[True, False]).reset_index(drop=True)
+
     def plot_results(self, results):
         """Plot evaluation results including ROC curve and feature importance."""
         # Create subplots
@@ -169,5 +278,34 @@ def main():
     # Plot results
     classifier.plot_results(results)
 
+def search_main(cache_dir=None, n_jobs=-1):
+    """Run the candidate search on the training split and print the Pareto table."""
+    classifier = BreastCancerClassifier()
+    X, y = classifier.load_data()
+    X_train, _, y_train, _ = train_test_split(
+        X, y, test_size=0.2, random_state=classifier.random_state, stratify=y
+    )
+
+    start = time.perf_counter()
+    table = classifier.search(X_train, y_train, n_jobs=n_jobs, cache_dir=cache_dir)
+    print(f"\nSearched {len(table)} candidates in {time.perf_counter() - start:.1f}s")
+
+    print("\nPareto front (ROC-AUC vs single-row latency):")
+    print(table[table['pareto']].drop(columns='pareto').to_string(index=False, float_format='%.4f'))
+
+    print("\nAll candidates:")
+    print(table.to_string(index=False, float_format='%.4f'))
+    return table
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Train and evaluate the breast cancer classifier")
+    parser.add_argument('--search', action='store_true',
+                        help="Sweep k, model family and regularization instead of training one pipeline")
+    parser.add_argument('--cache-dir', help="joblib.Memory directory kept between searches")
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    args = parser.parse_args()
+
+    if args.search:
+        search_main(args.cache_dir, args.n_jobs)
+    else:
+        main()
\ No newline at end of file
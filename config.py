@@ -6,16 +6,89 @@ class Config:
     # Database configuration
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///app.db')  # Changed to app.db for clarity
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Connection pool for server databases (ignored for SQLite, see app/database.py)
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '20'))
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))  # seconds
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'True').lower() in ['true', '1', 't']
     
     # JWT configuration
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', '1642aef0518da735bc33dadc1c9bce947bbbce00ebfc8b1670c9e02dd654e53f')
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
     
+    # Caches of verified token identities (by jti) and of login lookups
+    AUTH_IDENTITY_CACHE_SIZE = int(os.getenv('AUTH_IDENTITY_CACHE_SIZE', '10000'))
+    AUTH_IDENTITY_CACHE_TTL = float(os.getenv('AUTH_IDENTITY_CACHE_TTL', '300'))  # seconds, capped at token expiry
+    AUTH_USER_CACHE_SIZE = int(os.getenv('AUTH_USER_CACHE_SIZE', '10000'))
+    AUTH_USER_CACHE_TTL = float(os.getenv('AUTH_USER_CACHE_TTL', '300'))
+    
+    # Password hashing: fixed bcrypt cost, or calibrated to a target hash time
+    BCRYPT_LOG_ROUNDS = int(os.getenv('BCRYPT_LOG_ROUNDS', '12'))
+    BCRYPT_TARGET_MS = float(os.getenv('BCRYPT_TARGET_MS', '0'))  # 0 = use BCRYPT_LOG_ROUNDS as is
+    BCRYPT_MIN_ROUNDS = int(os.getenv('BCRYPT_MIN_ROUNDS', '10'))
+    BCRYPT_MAX_ROUNDS = int(os.getenv('BCRYPT_MAX_ROUNDS', '15'))
+    BCRYPT_THREADS = int(os.getenv('BCRYPT_THREADS', str(os.cpu_count() or 1)))  # hashes running at once
+    BCRYPT_WAIT_TIMEOUT = float(os.getenv('BCRYPT_WAIT_TIMEOUT', '5'))  # seconds to wait for a slot, then 503
+    
     # Security configurations
     SECRET_KEY = os.getenv('SECRET_KEY', '1642aef0518da735bc33dadc1c9bce947bbbce00ebfc8b1670c9e02dd654e53f')
     
     # Flask configuration
     DEBUG = os.getenv('FLASK_DEBUG', 'False').lower() in ['true', '1', 't']
     
+    # Prediction configuration
+    MODEL_DIR = os.getenv('MODEL_DIR', os.path.abspath(os.path.dirname(__file__)))
+    MODEL_LOAD_MODE = os.getenv('MODEL_LOAD_MODE', 'eager')  # 'eager' (before fork) or 'lazy' (first request)
+    MODEL_WATCH_INTERVAL = float(os.getenv('MODEL_WATCH_INTERVAL', '0'))  # seconds between artifact checks, 0 = off
+    PREDICT_MAX_BATCH_ROWS = int(os.getenv('PREDICT_MAX_BATCH_ROWS', '1000'))
+    PREDICT_ECHO_FEATURES = os.getenv('PREDICT_ECHO_FEATURES', 'True').lower() in ['true', '1', 't']  # features_received
+    PREDICT_RANGE_CHECK = os.getenv('PREDICT_RANGE_CHECK', 'True').lower() in ['true', '1', 't']
+    PREDICT_RANGE_MARGIN = float(os.getenv('PREDICT_RANGE_MARGIN', '0.5'))  # allowed overshoot, fraction of training range
+    JSON_CODEC = os.getenv('JSON_CODEC', 'auto')  # 'orjson' (needs orjson), 'json' or 'auto'
+    
+    # Micro-batching of concurrent /predict/predict calls
+    PREDICT_BATCHING_ENABLED = os.getenv('PREDICT_BATCHING_ENABLED', 'False').lower() in ['true', '1', 't']
+    PREDICT_BATCH_MAX_SIZE = int(os.getenv('PREDICT_BATCH_MAX_SIZE', '32'))
+    PREDICT_BATCH_MAX_WAIT_MS = float(os.getenv('PREDICT_BATCH_MAX_WAIT_MS', '2'))
+    
+    # Cache of scored feature vectors, keyed with the model version
+    PREDICT_CACHE_ENABLED = os.getenv('PREDICT_CACHE_ENABLED', 'True').lower() in ['true', '1', 't']
+    PREDICT_CACHE_MAX_ENTRIES = int(os.getenv('PREDICT_CACHE_MAX_ENTRIES', '10000'))
+    PREDICT_CACHE_TTL = float(os.getenv('PREDICT_CACHE_TTL', '3600'))  # seconds, 0 = no expiry
+    
+    # Prediction audit log, written in bulk by a background thread
+    AUDIT_ENABLED = os.getenv('AUDIT_ENABLED', 'True').lower() in ['true', '1', 't']
+    AUDIT_LOG_DIR = os.getenv('AUDIT_LOG_DIR')  # defaults to <instance>/audit
+    AUDIT_QUEUE_SIZE = int(os.getenv('AUDIT_QUEUE_SIZE', '10000'))
+    AUDIT_BATCH_SIZE = int(os.getenv('AUDIT_BATCH_SIZE', '500'))
+    AUDIT_FLUSH_INTERVAL = float(os.getenv('AUDIT_FLUSH_INTERVAL', '1.0'))  # seconds
+    AUDIT_MAX_BYTES = int(os.getenv('AUDIT_MAX_BYTES', str(50 * 1024 * 1024)))  # rotate after this size
+    AUDIT_BACKPRESSURE = os.getenv('AUDIT_BACKPRESSURE', 'drop')  # 'drop' or 'block' when the queue is full
+    AUDIT_BLOCK_TIMEOUT = float(os.getenv('AUDIT_BLOCK_TIMEOUT', '0.05'))  # seconds, for 'block'
+
+    # Prediction history (columnar, partitioned by day; written by the audit writer)
+    HISTORY_ENABLED = os.getenv('HISTORY_ENABLED', 'True').lower() in ['true', '1', 't']
+    HISTORY_DIR = os.getenv('HISTORY_DIR')  # defaults to <instance>/history
+    HISTORY_FORMAT = os.getenv('HISTORY_FORMAT', 'auto')  # 'parquet' (needs pyarrow), 'npz' or 'auto'
+    HISTORY_PART_SECONDS = float(os.getenv('HISTORY_PART_SECONDS', '60'))  # write a part at least this often
+    HISTORY_PART_ROWS = int(os.getenv('HISTORY_PART_ROWS', '10000'))  # or once this many records are buffered
+    HISTORY_COMPACT_PARTS = int(os.getenv('HISTORY_COMPACT_PARTS', '64'))  # compact the current day at this many parts
+    HISTORY_QUERY_LIMIT = int(os.getenv('HISTORY_QUERY_LIMIT', '1000'))  # max records returned per query
+
+    # Request metrics (Prometheus text format at /metrics)
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() in ['true', '1', 't']
+    METRICS_SAMPLE_RATE = float(os.getenv('METRICS_SAMPLE_RATE', '1.0'))  # fraction of requests timed
+
+    # On-demand sampling profiler (collapsed stacks for flame graphs), started via /predict/admin/profile
+    PROFILE_ENABLED = os.getenv('PROFILE_ENABLED', 'True').lower() in ['true', '1', 't']
+    PROFILE_DIR = os.getenv('PROFILE_DIR')  # defaults to <instance>/profiles
+    PROFILE_INTERVAL = float(os.getenv('PROFILE_INTERVAL', '0.005'))  # seconds between stack samples
+    PROFILE_MAX_SECONDS = float(os.getenv('PROFILE_MAX_SECONDS', '300'))  # longest session
+    PROFILE_MAX_REQUESTS = int(os.getenv('PROFILE_MAX_REQUESTS', '10000'))  # largest request budget
+    
+    # Process pool for CPU-bound scoring and password hashing, 0 = run inline
+    WORKER_POOL_SIZE = int(os.getenv('WORKER_POOL_SIZE', '0'))
+    ASGI_THREADS = int(os.getenv('ASGI_THREADS', '32'))  # request threads when served by asgi.py
+    
     # Migration configuration (added)
     MIGRATION_DIR = os.path.join('migrations')
\ No newline at end of file
@@ -0,0 +1,82 @@
+# export_model.py
+import argparse
+import hashlib
+import json
+import warnings
+
+import joblib
+import numpy as np
+from sklearn.datasets import load_breast_cancer
+
+from app.predict.engine import ForestEngine, fuse_scaler
+
+def probe_rows(engine, X):
+    """Dataset rows plus, for every split, a row sitting on each side of its bound"""
+    split = np.flatnonzero(engine.left != np.arange(len(engine.left)))
+    column = engine.feature[split]
+    bound = engine.threshold[split]
+
+    base = np.repeat(X[:1], 2 * len(split), axis=0)
+    rows = np.arange(len(split))
+    base[2 * rows, column] = bound
+    base[2 * rows + 1, column] = np.nextafter(bound, np.inf)
+    return np.vstack([X, base])
+
+def verify_fused(final_model, scaler_top, fused, X):
+    """Check the fused model against scaler_top.transform + final_model.predict_proba"""
+    with warnings.catch_warnings():
+        # The scaler was fitted on a DataFrame; plain arrays are fine here
+        warnings.simplefilter('ignore', UserWarning)
+        expected = final_model.predict_proba(scaler_top.transform(X))
+    return np.array_equal(fused.predict_proba(X), expected)
+
+def export_fused_model(model_path='final_model.pkl', scaler_path='scaler_top.pkl',
+                       feature_info_path='feature_info.json', output_path='fused_model.pkl',
+                       arrays_dir='model_arrays'):
+    """Write a model with scaler_top folded into its thresholds and verify it.
+
+    The fused model is saved both as a pickle and, when arrays_dir is set, as
+    memory-mappable .npy node arrays (see ForestEngine.save_arrays).
+    """
+    final_model = joblib.load(model_path)
+    scaler_top = joblib.load(scaler_path)
+    with open(feature_info_path, 'rb') as f:
+        feature_info_bytes = f.read()
+    features = json.loads(feature_info_bytes)['features']
+
+    fused = fuse_scaler(ForestEngine.from_sklearn(final_model), scaler_top)
+
+    # Exact equality on the dataset, on random cases and on every split boundary
+    data = load_breast_cancer(as_frame=True)
+    X = data.data[features].to_numpy(dtype=np.float64)
+    rng = np.random.default_rng(42)
+    X_random = rng.uniform(X.min(axis=0) * 0.5, X.max(axis=0) * 1.5, size=(5000, X.shape[1]))
+    X_check = probe_rows(fused, np.vstack([X, X_random]))
+
+    if not verify_fused(final_model, scaler_top, fused, X_check):
+        raise RuntimeError("Fused model predictions differ from the scaler + model path")
+
+    joblib.dump(fused, output_path)
+    print(f"Fused model verified on {len(X_check)} cases and saved to {output_path}")
+
+    if arrays_dir:
+        # The registry refuses arrays next to a feature_info.json they were not made from
+        fused.save_arrays(arrays_dir, scaler=scaler_top,
+                          inputs={'feature_info.json': hashlib.sha256(feature_info_bytes).hexdigest()})
+        mapped, _ = ForestEngine.load_arrays(arrays_dir)
+        if not np.array_equal(mapped.predict_proba(X_check), fused.predict_proba(X_check)):
+            raise RuntimeError(f"Arrays written to {arrays_dir} do not reproduce the fused model")
+        print(f"Memory-mappable model arrays saved to {arrays_dir}/")
+    return fused
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fold scaler_top into final_model thresholds")
+    parser.add_argument('--model', default='final_model.pkl')
+    parser.add_argument('--scaler', default='scaler_top.pkl')
+    parser.add_argument('--feature-info', default='feature_info.json')
+    parser.add_argument('--output', default='fused_model.pkl')
+    parser.add_argument('--arrays-dir', default='model_arrays',
+                        help="Directory for the memory-mappable .npy export ('' to skip)")
+    args = parser.parse_args()
+
+    export_fused_model(args.model, args.scaler, args.feature_info, args.output, args.arrays_dir)
@@ -0,0 +1,48 @@
+"""Add case-insensitive lookup indexes on user
+
+Revision ID: 5b1e7c3a9f02
+Revises: d9aa24a292b7
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b1e7c3a9f02'
+down_revision = 'd9aa24a292b7'
+branch_labels = None
+depends_on = None
+
+
+def _case_duplicates(connection, column):
+    """Values of `column` shared by several users once lowercased"""
+    rows = connection.execute(sa.text(
+        f'SELECT lower({column}), count(*) FROM "user" GROUP BY lower({column}) HAVING count(*) > 1'
+    ))
+    return [value for value, _ in rows]
+
+
+def upgrade():
+    # Logins match username/email case-insensitively; "Bob" and "bob" would be
+    # the same login, so they have to be merged or renamed before this runs
+    connection = op.get_bind()
+    duplicates = {column: _case_duplicates(connection, column) for column in ('username', 'email')}
+    if any(duplicates.values()):
+        details = '; '.join(f"{column}: {', '.join(values)}"
+                            for column, values in duplicates.items() if values)
+        raise RuntimeError(
+            f"Users differing only by case must be renamed before upgrading ({details})"
+        )
+
+    # Unique expression indexes serving lower(username) / lower(email) lookups at login
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.create_index('ix_user_username_lower', [sa.text('lower(username)')], unique=True)
+        batch_op.create_index('ix_user_email_lower', [sa.text('lower(email)')], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_email_lower')
+        batch_op.drop_index('ix_user_username_lower')
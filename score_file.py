@@ -0,0 +1,148 @@
+# score_file.py
+import argparse
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from app.predict.core import score, diagnose
+from app.predict.registry import ModelRegistry
+
+# Per-process model of --workers pool processes, set up by _init_worker
+_worker_loaded = None
+
+def _init_worker(model_dir):
+    global _worker_loaded
+    _worker_loaded = ModelRegistry.for_directory(model_dir).get()
+
+def _score_chunk(X):
+    _, labels, confidence = score(_worker_loaded.model, X, _worker_loaded.scaler)
+    return labels, confidence, _worker_loaded.risk.assign(labels, confidence)
+
+def input_format(path, fmt=None):
+    if fmt:
+        return fmt
+    if path.endswith('.ndjson') or path.endswith('.jsonl'):
+        return 'ndjson'
+    return 'csv'
+
+def read_chunks(path, fmt, features, chunk_size, id_column=None):
+    """Yield DataFrames of at most chunk_size cases, restricted to the needed columns"""
+    source = sys.stdin if path == '-' else path
+    if fmt == 'csv':
+        wanted = set(features) | ({id_column} if id_column else set())
+        return pd.read_csv(source, chunksize=chunk_size, usecols=lambda column: column in wanted)
+    return pd.read_json(source, lines=True, chunksize=chunk_size, dtype=False)
+
+def prepare(chunk, features, means):
+    """Order columns as in feature_info.json and impute missing values with the training means.
+
+    Returns (X, imputed): the float64 feature matrix and the number of
+    imputed values per row. Absent columns and non-numeric values count as
+    missing.
+    """
+    columns = [pd.to_numeric(chunk[feature], errors='coerce').to_numpy(dtype=np.float64)
+               if feature in chunk else np.full(len(chunk), np.nan)
+               for feature in features]
+    X = np.column_stack(columns) if columns else np.empty((len(chunk), 0))
+    missing = ~np.isfinite(X)
+    X[missing] = np.take(means, np.nonzero(missing)[1])
+    return X, missing.sum(axis=1)
+
+def format_results(chunk, offset, labels, confidence, tiers, severities, imputed, id_column=None):
+    results = pd.DataFrame({
+        'prediction': diagnose(labels),
+        'confidence': np.round(confidence * 100, 2),
+        'severity': severities.take(tiers),
+        'imputed_features': imputed
+    })
+    if id_column and id_column in chunk:
+        results.insert(0, id_column, chunk[id_column].to_numpy())
+    else:
+        results.insert(0, 'row', np.arange(offset, offset + len(chunk)))
+    return results
+
+def write_results(out, results, fmt, first):
+    if fmt == 'csv':
+        results.to_csv(out, header=first, index=False)
+    else:
+        lines = results.to_json(orient='records', lines=True)
+        # Older pandas versions leave out the final newline
+        out.write(lines if lines.endswith('\n') else lines + '\n')
+    out.flush()
+
+def score_file(input_path, output_path='-', model_dir='.', chunk_size=10000, workers=0,
+               fmt=None, output_fmt=None, id_column=None):
+    """Stream cases from a CSV or NDJSON file and write one prediction per case.
+
+    Cases are read, imputed and scored chunk_size rows at a time with one
+    predict_proba per chunk, so memory does not grow with the file. With
+    workers > 0 chunks are scored in that many processes, keeping at most
+    2 * workers chunks in flight and writing results in input order.
+    Returns the number of cases scored.
+    """
+    loaded = ModelRegistry.for_directory(model_dir).get()
+    features = loaded.features
+    means = np.asarray(loaded.scaler.mean_, dtype=np.float64)
+    severities = np.array([template["severity"] for template in loaded.risk.templates])
+    fmt = input_format(input_path, fmt)
+    output_fmt = output_fmt or fmt
+
+    out = sys.stdout if output_path == '-' else open(output_path, 'w', newline='')
+    executor = (ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(model_dir,))
+                if workers > 0 else None)
+    pending = deque()
+    count = 0
+
+    def write_next():
+        chunk, offset, imputed, future = pending.popleft()
+        labels, confidence, tiers = future.result()
+        write_results(out, format_results(chunk, offset, labels, confidence, tiers, severities, imputed,
+                                          id_column),
+                      output_fmt, first=offset == 0)
+
+    try:
+        for chunk in read_chunks(input_path, fmt, features, chunk_size, id_column):
+            X, imputed = prepare(chunk, features, means)
+            if executor is None:
+                _, labels, confidence = score(loaded.model, X, loaded.scaler)
+                tiers = loaded.risk.assign(labels, confidence)
+                write_results(out, format_results(chunk, count, labels, confidence, tiers, severities, imputed,
+                                                  id_column),
+                              output_fmt, first=count == 0)
+            else:
+                pending.append((chunk[[id_column]] if id_column in chunk else chunk.iloc[:, :0],
+                                count, imputed, executor.submit(_score_chunk, X)))
+                if len(pending) >= 2 * workers:
+                    write_next()
+            count += len(chunk)
+        while pending:
+            write_next()
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        if out is not sys.stdout:
+            out.close()
+    return count
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score a CSV or NDJSON file of cases in bounded memory")
+    parser.add_argument('input', help="CSV or NDJSON file of cases ('-' for stdin)")
+    parser.add_argument('-o', '--output', default='-', help="Output file (default: stdout)")
+    parser.add_argument('--format', choices=['csv', 'ndjson'],
+                        help="Input format (default: from the file extension)")
+    parser.add_argument('--output-format', choices=['csv', 'ndjson'],
+                        help="Output format (default: the input format)")
+    parser.add_argument('--model-dir', default=os.path.dirname(os.path.abspath(__file__)))
+    parser.add_argument('--chunk-size', type=int, default=10000, help="Cases per chunk")
+    parser.add_argument('--workers', type=int, default=0,
+                        help="Score chunks in this many processes (0: in this process)")
+    parser.add_argument('--id-column', help="Input column copied to the output instead of the row number")
+    args = parser.parse_args()
+
+    n = score_file(args.input, args.output, args.model_dir, args.chunk_size, args.workers,
+                   args.format, args.output_format, args.id_column)
+    print(f"Scored {n} cases", file=sys.stderr)
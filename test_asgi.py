@@ -0,0 +1,74 @@
+# test_asgi.py
+import asyncio
+import time
+
+from app.wsgi_adapter import ThreadedWsgiToAsgi
+
+def slow_wsgi_app(environ, start_response):
+    # Stands in for a login blocked in bcrypt: releases the GIL while it waits
+    time.sleep(0.3 if environ['PATH_INFO'] == '/slow' else 0)
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    return [environ['PATH_INFO'].encode()]
+
+async def call(asgi_app, path):
+    scope = {"type": "http", "method": "GET", "path": path, "query_string": b"",
+             "http_version": "1.1", "headers": []}
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        sent.append(message)
+
+    start = time.perf_counter()
+    await asgi_app(scope, receive, send)
+    return sent[0]["status"], time.perf_counter() - start
+
+async def slow_and_fast(asgi_app):
+    slow = [asyncio.create_task(call(asgi_app, '/slow')) for _ in range(3)]
+    await asyncio.sleep(0.05)
+    fast = await call(asgi_app, '/fast')
+    return await asyncio.gather(*slow), fast
+
+def test_requests_run_concurrently():
+    start = time.perf_counter()
+    slow, fast = asyncio.run(slow_and_fast(ThreadedWsgiToAsgi(slow_wsgi_app, max_threads=4)))
+    elapsed = time.perf_counter() - start
+
+    assert all(status == 200 for status, _ in slow) and fast[0] == 200
+    # A fast request is not queued behind the slow ones, which overlap
+    assert fast[1] < 0.1
+    assert elapsed < 0.6
+
+class ClosingBody(list):
+    closed = False
+
+    def close(self):
+        ClosingBody.closed = True
+
+def echo_wsgi_app(environ, start_response):
+    body = environ['wsgi.input'].read()
+    start_response('201 Created', [('Content-Type', 'text/plain'), ('Content-Length', '9')])
+    return ClosingBody([body, f"|{environ['QUERY_STRING']}|{environ['HTTP_X_TEST']}".encode()])
+
+def test_request_and_response_are_translated():
+    scope = {"type": "http", "method": "POST", "path": "/echo", "query_string": b"a=1",
+             "http_version": "1.1", "headers": [(b"x-test", b"one"), (b"x-test", b"two")]}
+    chunks = [{"type": "http.request", "body": b"abc", "more_body": True},
+              {"type": "http.request", "body": b"def"}]
+    sent = []
+
+    async def receive():
+        return chunks.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(ThreadedWsgiToAsgi(echo_wsgi_app)(scope, receive, send))
+
+    assert sent[0]["status"] == 201
+    # Truncated to the announced Content-Length
+    assert b"".join(message.get("body", b"") for message in sent[1:]) == b"abcdef|a="
+    assert sent[-1] == {"type": "http.response.body"}
+    assert ClosingBody.closed
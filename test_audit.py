@@ -0,0 +1,99 @@
+# test_audit.py
+import threading
+import time
+
+import numpy as np
+from flask import Flask
+
+from app.predict.audit import AuditLog
+
+class GateSink:
+    """Holds the writer thread in write() until the gate opens"""
+    name = 'gate'
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.records = []
+
+    def write(self, records):
+        self.gate.wait(5)
+        self.records.extend(records)
+
+def make_audit_log(tmp_path, backpressure='drop', queue_size=3, block_timeout=0.05):
+    app = Flask(__name__)
+    app.config.update(AUDIT_ENABLED=True, AUDIT_LOG_DIR=str(tmp_path), AUDIT_MAX_BYTES=0,
+                      AUDIT_QUEUE_SIZE=queue_size, AUDIT_BATCH_SIZE=1, AUDIT_FLUSH_INTERVAL=0.01,
+                      AUDIT_BACKPRESSURE=backpressure, AUDIT_BLOCK_TIMEOUT=block_timeout,
+                      HISTORY_ENABLED=False)
+    audit_log = AuditLog(app)
+    sink = GateSink()
+    audit_log.sinks = [sink]
+    audit_log.written = {sink.name: 0}
+    return audit_log, sink
+
+def record_one(audit_log, value=1.0):
+    audit_log.record({"username": "doc", "role": "doctor"}, 'v1', 'predict', {"a": value}, 'benign', 99.0)
+
+def record_rows(audit_log, n):
+    audit_log.record_matrix({"username": "doc", "role": "doctor"}, 'v1', 'batch', ['a'],
+                            np.arange(n, dtype=float).reshape(-1, 1), np.ones(n, dtype=int), np.full(n, 0.9))
+
+def hold_writer(audit_log):
+    # The writer takes the first record and then waits in the sink: the queue stays as we fill it
+    record_one(audit_log)
+    deadline = time.monotonic() + 2
+    while audit_log.stats()["queue_depth"] and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+def test_drop_counts_rows_not_entries(tmp_path):
+    audit_log, sink = make_audit_log(tmp_path)
+    hold_writer(audit_log)
+
+    record_rows(audit_log, 3)
+    assert audit_log.stats()["queue_depth"] == 3
+    record_one(audit_log)
+    record_rows(audit_log, 2)
+    stats = audit_log.stats()
+    assert stats["dropped"] == 3
+    assert stats["queue_depth"] == 3
+
+    sink.gate.set()
+    audit_log.shutdown()
+    stats = audit_log.stats()
+    assert stats["written"] == {"gate": 4}
+    assert stats["queue_depth"] == 0
+    assert [r["features"] for r in sink.records[1:]] == [{"a": 0.0}, {"a": 1.0}, {"a": 2.0}]
+    assert sink.records[1]["prediction"] == "benign" and sink.records[1]["confidence"] == 90.0
+
+def test_an_entry_larger_than_the_queue_is_dropped(tmp_path):
+    audit_log, sink = make_audit_log(tmp_path)
+    record_rows(audit_log, 4)
+    assert audit_log.stats()["dropped"] == 4
+    sink.gate.set()
+    audit_log.shutdown()
+
+def test_block_gives_up_after_the_timeout(tmp_path):
+    audit_log, sink = make_audit_log(tmp_path, backpressure='block', block_timeout=0.1)
+    hold_writer(audit_log)
+    record_rows(audit_log, 3)
+
+    start = time.perf_counter()
+    record_rows(audit_log, 2)
+    assert time.perf_counter() - start >= 0.1
+    assert audit_log.stats()["dropped"] == 2
+
+    sink.gate.set()
+    audit_log.shutdown()
+    assert audit_log.stats()["written"] == {"gate": 4}
+
+def test_block_waits_for_the_writer(tmp_path):
+    audit_log, sink = make_audit_log(tmp_path, backpressure='block', block_timeout=2)
+    hold_writer(audit_log)
+    record_rows(audit_log, 3)
+
+    threading.Timer(0.05, sink.gate.set).start()
+    record_one(audit_log)
+    assert audit_log.stats()["dropped"] == 0
+
+    audit_log.shutdown()
+    assert audit_log.stats()["written"] == {"gate": 5}
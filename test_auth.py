@@ -0,0 +1,78 @@
+# test_auth.py
+import time
+from datetime import timedelta
+
+import pytest
+from flask import Flask, jsonify
+from flask_jwt_extended import JWTManager, create_access_token
+
+from app import identity_cache
+from app.auth.decorators import role_required
+
+def make_app(identity_ttl=300):
+    app = Flask(__name__)
+    app.config.update(JWT_SECRET_KEY='test-secret', AUTH_IDENTITY_CACHE_SIZE=100,
+                      AUTH_IDENTITY_CACHE_TTL=identity_ttl)
+    JWTManager(app)
+    identity_cache.init_app(app)
+
+    @app.route('/admin')
+    @role_required('admin')
+    def admin_only():
+        return jsonify({"ok": True})
+
+    @app.route('/staff')
+    @role_required('admin', 'doctor')
+    def staff():
+        return jsonify({"ok": True})
+
+    return app
+
+def token(app, role, expires=timedelta(hours=1)):
+    with app.app_context():
+        return create_access_token(identity={"username": role, "role": role}, expires_delta=expires)
+
+def bearer(tok):
+    return {'Authorization': f'Bearer {tok}'}
+
+def test_role_required_rejects_other_roles():
+    app = make_app()
+    client = app.test_client()
+    doctor, admin = token(app, 'doctor'), token(app, 'admin')
+
+    assert client.get('/admin', headers=bearer(doctor)).status_code == 403
+    assert client.get('/admin', headers=bearer(doctor)).json == {"error": "Unauthorized access"}
+    assert client.get('/admin', headers=bearer(admin)).status_code == 200
+    assert client.get('/staff', headers=bearer(doctor)).status_code == 200
+    # No token at all is flask_jwt_extended's 401, not a 403
+    assert client.get('/admin').status_code == 401
+
+def test_identity_is_cached_per_token():
+    app = make_app()
+    client = app.test_client()
+    admin = token(app, 'admin')
+
+    client.get('/admin', headers=bearer(admin))
+    client.get('/admin', headers=bearer(admin))
+    assert identity_cache.stats()["hits"] == 1
+
+    # Same jti, another signature: the cached identity is not handed out
+    header, payload, signature = admin.split('.')
+    forged = f"{header}.{payload}.{signature[::-1]}"
+    assert client.get('/admin', headers=bearer(forged)).status_code == 422
+
+@pytest.mark.parametrize('cache_ttl, token_ttl', [(0.2, 3600), (3600, 2)])
+def test_cached_identity_expires(cache_ttl, token_ttl):
+    app = make_app(identity_ttl=cache_ttl)
+    client = app.test_client()
+    admin = token(app, 'admin', expires=timedelta(seconds=token_ttl))
+
+    client.get('/admin', headers=bearer(admin))
+    assert client.get('/admin', headers=bearer(admin)).status_code == 200
+    assert identity_cache.stats()["hits"] == 1
+
+    # The entry lasts AUTH_IDENTITY_CACHE_TTL, or less when the token expires first
+    time.sleep(min(cache_ttl, token_ttl) + 0.1)
+    response = client.get('/admin', headers=bearer(admin))
+    assert identity_cache.stats()["hits"] == 1
+    assert response.status_code == (200 if token_ttl > cache_ttl else 401)
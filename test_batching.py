@@ -0,0 +1,90 @@
+# test_batching.py
+import threading
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.predict.batching import MicroBatcher
+
+class EchoModel:
+    """Scores a row with its first feature, so each result names the row it came from"""
+    raw_features = True
+    classes_ = np.array([0, 1])
+
+    def __init__(self, offset=0.0):
+        self.offset = offset
+        self.calls = []
+
+    def predict_proba(self, X):
+        self.calls.append(len(X))
+        p = X[:, 0] + self.offset
+        return np.column_stack([1 - p, p])
+
+def loaded_model(version, offset=0.0):
+    return SimpleNamespace(model=EchoModel(offset), scaler=None, version=version)
+
+def score_concurrently(batcher, requests):
+    results = [None] * len(requests)
+    start = threading.Barrier(len(requests))
+
+    def client(i, loaded, row):
+        start.wait()
+        results[i] = batcher.score(loaded, row)
+
+    threads = [threading.Thread(target=client, args=(i, loaded, row)) for i, (loaded, row) in enumerate(requests)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    return results
+
+def test_each_caller_gets_its_own_row():
+    batcher = MicroBatcher()
+    batcher.max_batch_size = 8
+    batcher.max_wait = 0.05
+    loaded = loaded_model('v1')
+    values = [i / 100 for i in range(20)]
+
+    results = score_concurrently(batcher, [(loaded, np.array([[v, 0.0]])) for v in values])
+
+    for value, (probabilities, labels, confidence) in zip(values, results):
+        assert probabilities.shape == (1, 2)
+        assert probabilities[0, 1] == value
+        assert labels[0] == (1 if value > 0.5 else 0)
+    stats = batcher.stats()
+    assert stats["rows"] == 20
+    # Rows were coalesced, never more than max_batch_size at a time
+    assert stats["batches"] < 20
+    assert max(loaded.model.calls) <= 8
+
+def test_rows_are_scored_by_the_version_they_started_with():
+    batcher = MicroBatcher()
+    batcher.max_wait = 0.05
+    old, new = loaded_model('v1'), loaded_model('v2', offset=0.5)
+    requests = [(old if i % 2 else new, np.array([[i / 100, 0.0]])) for i in range(10)]
+
+    results = score_concurrently(batcher, requests)
+
+    for (loaded, row), (probabilities, _, _) in zip(requests, results):
+        assert probabilities[0, 1] == row[0, 0] + loaded.model.offset
+    assert sum(old.model.calls) == 5 and sum(new.model.calls) == 5
+
+def test_a_failing_batch_raises_in_every_caller():
+    batcher = MicroBatcher()
+    batcher.max_wait = 0.05
+    loaded = loaded_model('v1')
+    loaded.model.predict_proba = lambda X: 1 / 0
+    errors = []
+
+    def client():
+        try:
+            batcher.score(loaded, np.array([[0.1, 0.0]]))
+        except ZeroDivisionError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=client) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    assert len(errors) == 4
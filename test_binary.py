@@ -0,0 +1,48 @@
+# test_binary.py
+import re
+
+import numpy as np
+import pytest
+
+from app.predict.binary import HEADER, MAGIC, BinaryFormatError, decode, encode
+from app.predict.validation import FeatureSchema
+
+SCHEMA = FeatureSchema(["a", "b", "c"])
+MATRIX = np.arange(6, dtype=np.float64).reshape(2, 3) / 4
+
+def body(values=MATRIX, itemsize=8, feature_set=SCHEMA.version):
+    return encode(values, itemsize, feature_set)
+
+def with_header(data, **fields):
+    values = dict(zip(('magic', 'version', 'itemsize', 'columns', 'rows', 'feature_set'), HEADER.unpack_from(data)))
+    values.update(fields)
+    return HEADER.pack(*values.values()) + data[HEADER.size:]
+
+@pytest.mark.parametrize('itemsize', [4, 8])
+def test_round_trip(itemsize):
+    matrix, decoded_itemsize = decode(body(itemsize=itemsize), SCHEMA)
+    assert decoded_itemsize == itemsize
+    assert matrix.dtype.itemsize == itemsize
+    assert np.array_equal(matrix, MATRIX)
+    # A view of the request body, not a copy
+    assert not matrix.flags.writeable
+
+def test_empty_matrix():
+    matrix, _ = decode(body(np.empty((0, 3))), SCHEMA)
+    assert matrix.shape == (0, 3)
+
+@pytest.mark.parametrize('data, message', [
+    (MAGIC + b'\x01', "shorter than the 24-byte header"),
+    (with_header(body(), magic=b'JSON'), "Expected magic b'BCFM' and format version 1"),
+    (with_header(body(), version=2), "Expected magic b'BCFM' and format version 1"),
+    (with_header(body(), itemsize=2), "must be float32"),
+    (body(feature_set=FeatureSchema(["c", "b", "a"]).version),
+     f"does not match the model's {SCHEMA.version.hex()}"),
+    (with_header(body(), columns=2), "Expected 3 columns, got 2"),
+    (with_header(body(), rows=3), "Expected 96 bytes for 3 rows, got 72"),
+    (body()[:-8], "Expected 72 bytes for 2 rows, got 64"),
+    (body() + b'\x00' * 8, "Expected 72 bytes for 2 rows, got 80"),
+])
+def test_rejected_headers(data, message):
+    with pytest.raises(BinaryFormatError, match=re.escape(message)):
+        decode(data, SCHEMA)
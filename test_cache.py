@@ -0,0 +1,63 @@
+# test_cache.py
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.cache import TTLCache
+from app.predict.cache import PredictionCache
+
+class CountingScorer:
+    """Stands in for score_rows: the probability of class 1 is the first feature"""
+
+    def __init__(self):
+        self.rows = []
+
+    def __call__(self, loaded, input_data):
+        self.rows.append(len(input_data))
+        p = input_data[:, 0]
+        probabilities = np.column_stack([1 - p, p])
+        labels = (p > 0.5).astype(int)
+        return probabilities, labels, probabilities.max(axis=1)
+
+def enabled_cache():
+    cache = PredictionCache()
+    cache.enabled = True
+    cache._cache = TTLCache(max_entries=100)
+    return cache
+
+def test_only_missing_rows_are_scored():
+    cache, scorer = enabled_cache(), CountingScorer()
+    loaded = SimpleNamespace(version='v1')
+
+    cache.score(loaded, np.array([[0.2, 1.0]]), scorer)
+    probabilities, labels, confidence = cache.score(loaded, np.array([[0.9, 1.0], [0.2, 1.0]]), scorer)
+
+    assert scorer.rows == [1, 1]
+    assert probabilities[:, 1].tolist() == [0.9, 0.2]
+    assert labels.tolist() == [1, 0]
+    assert confidence.tolist() == [0.9, 0.8]
+    assert cache.stats()["hits"] == 1
+
+def test_a_new_model_version_misses():
+    cache, scorer = enabled_cache(), CountingScorer()
+    row = np.array([[0.2, 1.0]])
+
+    cache.score(SimpleNamespace(version='v1'), row, scorer)
+    cache.score(SimpleNamespace(version='v1'), row, scorer)
+    assert scorer.rows == [1]
+
+    # A reload swaps in a LoadedModel with another version: nothing computed by v1 is served
+    cache.score(SimpleNamespace(version='v2'), row, scorer)
+    assert scorer.rows == [1, 1]
+    assert cache.stats()["misses"] == 2
+
+def test_signed_zero_shares_an_entry():
+    assert PredictionCache.key('v1', np.array([0.0, 1.0])) == PredictionCache.key('v1', np.array([-0.0, 1.0]))
+    assert PredictionCache.key('v1', np.array([0.0, 1.0])) != PredictionCache.key('v2', np.array([0.0, 1.0]))
+
+def test_disabled_cache_always_scores():
+    cache, scorer = PredictionCache(), CountingScorer()
+    row = np.array([[0.2, 1.0]])
+    cache.score(SimpleNamespace(version='v1'), row, scorer)
+    cache.score(SimpleNamespace(version='v1'), row, scorer)
+    assert scorer.rows == [1, 1]
@@ -0,0 +1,47 @@
+# test_engine.py
+import json
+import joblib
+import numpy as np
+import pytest
+
+from sklearn.datasets import load_breast_cancer
+from sklearn.model_selection import train_test_split
+
+from app.predict.engine import ForestEngine
+
+def load_test_split():
+    """Rebuild the held-out split used by train_model.py, scaled for the model"""
+    with open('feature_info.json', 'r') as f:
+        features = json.load(f)['features']
+    scaler_top = joblib.load('scaler_top.pkl')
+
+    data = load_breast_cancer(as_frame=True)
+    _, X_test, _, y_test = train_test_split(data.data, data.target, test_size=0.2, random_state=42)
+    return scaler_top.transform(X_test[features]), y_test
+
+def test_engine_matches_predict_proba():
+    final_model = joblib.load('final_model.pkl')
+    engine = ForestEngine.from_sklearn(final_model)
+    X_test, _ = load_test_split()
+
+    # Whole batch, then row by row as the single-case route does
+    assert np.array_equal(engine.predict_proba(X_test), final_model.predict_proba(X_test))
+    for row in X_test:
+        assert np.array_equal(engine.predict_proba(row.reshape(1, -1)),
+                              final_model.predict_proba(row.reshape(1, -1)))
+    assert np.array_equal(engine.predict(X_test), final_model.predict(X_test))
+
+def test_load_arrays_rejects_a_mixed_export(tmp_path):
+    engine, _ = ForestEngine.load_arrays('model_arrays')
+    engine.save_arrays(tmp_path)
+    ForestEngine.load_arrays(tmp_path)
+
+    # One file from another export: same length, other contents
+    np.save(tmp_path / 'left.npy', np.roll(np.asarray(engine.left), 1))
+    with pytest.raises(ValueError, match='left.npy does not match'):
+        ForestEngine.load_arrays(tmp_path)
+
+    # ... or another length
+    np.save(tmp_path / 'left.npy', np.asarray(engine.left)[:-1])
+    with pytest.raises(ValueError, match='left.npy has shape'):
+        ForestEngine.load_arrays(tmp_path)
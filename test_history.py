@@ -0,0 +1,89 @@
+# test_history.py
+import os
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from app.predict.history import HistoryStore, _day_dir
+
+NOW = datetime.now(timezone.utc)
+
+def record(user='doc', prediction='benign', confidence=95.0, when=NOW):
+    return {"timestamp": when.isoformat(), "user": user, "role": "doctor", "endpoint": "predict",
+            "model_version": "v1", "prediction": prediction, "confidence": confidence}
+
+def make_store(tmp_path, **kwargs):
+    # Parts are only written on flush(force=True) unless a test says otherwise
+    options = dict(fmt='npz', part_seconds=3600, part_rows=1000)
+    options.update(kwargs)
+    return HistoryStore(str(tmp_path), **options)
+
+def parts(store, day):
+    return store._parts(os.path.join(store.directory, _day_dir(day)))
+
+def test_counts_include_buffered_records(tmp_path):
+    store = make_store(tmp_path)
+    store.write([record(), record(prediction='malignant', confidence=80.0)])
+    store.flush()
+    store.write([record(user='other', confidence=62.5)])
+    assert len(parts(store, NOW.date())) == 1
+
+    result = store.query(NOW.date(), NOW.date())
+    assert result["count"] == 3
+    assert result["by_prediction"] == {"malignant": 1, "benign": 2}
+    assert result["by_day"] == {NOW.date().isoformat(): 3}
+    assert result["by_confidence_band"] == {"50-60": 0, "60-70": 1, "70-80": 0, "80-90": 1, "90-100": 1}
+    # The buffered record is the newest
+    assert result["records"][0]["user"] == "other"
+
+    store.flush()
+    assert store.query(NOW.date(), NOW.date())["count"] == 3
+
+def test_filters(tmp_path):
+    store = make_store(tmp_path)
+    store.write([record(confidence=90.1), record(confidence=90.09), record(user='other', prediction='malignant')])
+    store.flush()
+
+    assert store.query(NOW.date(), NOW.date(), min_confidence=90.1)["count"] == 2
+    assert store.query(NOW.date(), NOW.date(), max_confidence=90.1)["count"] == 2
+    assert store.query(NOW.date(), NOW.date(), user='other')["count"] == 1
+    assert store.query(NOW.date(), NOW.date(), prediction='benign', min_confidence=90.1)["count"] == 1
+    assert store.query(NOW.date(), NOW.date(), limit=1)["records"][0]["confidence"] == 95.0
+    # Days outside the range are not read
+    tomorrow = NOW.date() + timedelta(days=1)
+    assert store.query(tomorrow, tomorrow)["count"] == 0
+
+def test_a_finished_day_is_compacted(tmp_path):
+    store = make_store(tmp_path)
+    yesterday = NOW - timedelta(days=1)
+    store.write([record(when=yesterday)])
+    store.flush()
+    store.write([record(when=yesterday, confidence=70.0)])
+    store.flush()
+
+    day_parts = parts(store, yesterday.date())
+    assert len(day_parts) == 1 and os.path.basename(day_parts[0]).startswith('compacted-')
+    result = store.query(yesterday.date(), yesterday.date())
+    assert result["count"] == 2
+    assert [r["confidence"] for r in result["records"]] == [70.0, 95.0]
+
+def test_today_is_compacted_once_it_has_compact_parts(tmp_path):
+    store = make_store(tmp_path, compact_parts=3)
+    for confidence in (91.0, 92.0):
+        store.write([record(confidence=confidence)])
+        store.flush()
+    assert len(parts(store, NOW.date())) == 2
+
+    store.write([record(confidence=93.0)])
+    store.flush()
+    assert len(parts(store, NOW.date())) == 1
+    assert store.query(NOW.date(), NOW.date())["count"] == 3
+
+def test_float32_parts_read_back_exactly(tmp_path):
+    store = make_store(tmp_path)
+    columns = store._to_columns([record(confidence=90.1)])
+    columns['confidence'] = columns['confidence'].astype(np.float32)
+    store._write_part(NOW.date(), columns)
+
+    assert store.query(NOW.date(), NOW.date(), min_confidence=90.1)["count"] == 1
+    assert store.query(NOW.date(), NOW.date())["records"][0]["confidence"] == 90.1
@@ -27,72 +27,72 @@ def make_prediction(features, token):
     )
     return response.json()
 
-# Test cases - these are example values for the 10 most important features
+# Test cases - rows of the breast cancer dataset, with the 10 features listed in feature_info.json
 test_cases = [
     # Test Case 1 - Likely Malignant
     {
-        "mean radius": 20.57,
-        "mean texture": 17.77,
-        "mean perimeter": 132.9,
-        "mean area": 1326.0,
-        "mean smoothness": 0.08474,
-        "mean compactness": 0.07864,
-        "mean concavity": 0.0869,
-        "mean concave points": 0.07017,
-        "mean symmetry": 0.1812,
-        "mean fractal dimension": 0.05667
+        "worst area": 2019.0,
+        "worst concave points": 0.2654,
+        "mean concave points": 0.1471,
+        "worst radius": 25.38,
+        "mean concavity": 0.3001,
+        "worst perimeter": 184.6,
+        "mean perimeter": 122.8,
+        "mean radius": 17.99,
+        "mean area": 1001.0,
+        "worst concavity": 0.7119
     },
     # Test Case 2 - Likely Benign
     {
-        "mean radius": 12.05,
-        "mean texture": 14.63,
-        "mean perimeter": 78.04,
-        "mean area": 449.3,
-        "mean smoothness": 0.10340,
-        "mean compactness": 0.09791,
-        "mean concavity": 0.06495,
-        "mean concave points": 0.02513,
-        "mean symmetry": 0.1731,
-        "mean fractal dimension": 0.06267
+        "worst area": 711.2,
+        "worst concave points": 0.1288,
+        "mean concave points": 0.04781,
+        "worst radius": 15.11,
+        "mean concavity": 0.06664,
+        "worst perimeter": 99.7,
+        "mean perimeter": 87.46,
+        "mean radius": 13.54,
+        "mean area": 566.3,
+        "worst concavity": 0.239
     },
     # Test Case 3 - Borderline Case
     {
-        "mean radius": 15.13,
-        "mean texture": 15.51,
-        "mean perimeter": 97.65,
-        "mean area": 711.8,
-        "mean smoothness": 0.09463,
-        "mean compactness": 0.08650,
-        "mean concavity": 0.07741,
-        "mean concave points": 0.04768,
-        "mean symmetry": 0.1794,
-        "mean fractal dimension": 0.05742
+        "worst area": 876.5,
+        "worst concave points": 0.1119,
+        "mean concave points": 0.05364,
+        "worst radius": 16.84,
+        "mean concavity": 0.09938,
+        "worst perimeter": 112.0,
+        "mean perimeter": 103.7,
+        "mean radius": 15.85,
+        "mean area": 782.7,
+        "worst concavity": 0.2322
     },
     # Test Case 4 - Strong Malignant Indicators
     {
-        "mean radius": 19.69,
-        "mean texture": 21.25,
-        "mean perimeter": 130.0,
-        "mean area": 1203.0,
-        "mean smoothness": 0.10960,
-        "mean compactness": 0.15990,
-        "mean concavity": 0.1974,
-        "mean concave points": 0.12790,
-        "mean symmetry": 0.2069,
-        "mean fractal dimension": 0.05999
+        "worst area": 567.7,
+        "worst concave points": 0.2575,
+        "mean concave points": 0.1052,
+        "worst radius": 14.91,
+        "mean concavity": 0.2414,
+        "worst perimeter": 98.87,
+        "mean perimeter": 77.58,
+        "mean radius": 11.42,
+        "mean area": 386.1,
+        "worst concavity": 0.6869
     },
     # Test Case 5 - Strong Benign Indicators
     {
-        "mean radius": 11.42,
-        "mean texture": 12.95,
-        "mean perimeter": 73.17,
-        "mean area": 402.7,
-        "mean smoothness": 0.09666,
-        "mean compactness": 0.07806,
-        "mean concavity": 0.03285,
-        "mean concave points": 0.02037,
-        "mean symmetry": 0.1574,
-        "mean fractal dimension": 0.05847
+        "worst area": 630.5,
+        "worst concave points": 0.07283,
+        "mean concave points": 0.0311,
+        "worst radius": 14.5,
+        "mean concavity": 0.04568,
+        "worst perimeter": 96.09,
+        "mean perimeter": 85.63,
+        "mean radius": 13.08,
+        "mean area": 520.0,
+        "worst concavity": 0.189
     }
 ]
 
@@ -109,11 +109,8 @@ def run_tests():
             for feature, value in test_case.items():
                 print(f"{feature}: {value}")
             
-            # Convert dictionary to list maintaining feature order
-            features_list = list(test_case.values())
-            
-            # Make prediction
-            result = make_prediction(features_list, token)
+            # The route expects a {feature_name: value} dictionary
+            result = make_prediction(test_case, token)
             
             print("\nPrediction Results:")
             print(f"Diagnosis: {result['prediction']}")
@@ -0,0 +1,43 @@
+# test_risk.py
+import numpy as np
+import pytest
+
+from app.predict.risk import RiskTable
+
+# Labels: 0 = malignant, 1 = benign
+MALIGNANT, BENIGN = 0, 1
+
+def severities(table, labels, confidence):
+    return [response["severity"] for response in table.responses(labels, confidence)]
+
+def test_malignant_tier_boundaries():
+    table = RiskTable.load('risk_tiers.json')
+    confidence = [0.5, 0.5999, 0.6, 0.7499, 0.75, 1.0]
+
+    # Each tier starts at its min_confidence: >= 75% high, 60-75% moderate, below 60% low
+    assert severities(table, [MALIGNANT] * len(confidence), confidence) == [
+        "Low Risk", "Low Risk", "Moderate Risk", "Moderate Risk", "High Risk", "High Risk"
+    ]
+
+def test_benign_has_a_single_tier():
+    table = RiskTable.load('risk_tiers.json')
+    assert severities(table, [BENIGN] * 3, [0.5, 0.75, 1.0]) == ["Low Risk"] * 3
+
+def test_mixed_rows_are_tiered_by_their_own_diagnosis():
+    table = RiskTable.load('risk_tiers.json')
+    labels = np.array([BENIGN, MALIGNANT, BENIGN, MALIGNANT])
+    confidence = np.array([0.9, 0.9, 0.6, 0.6])
+
+    responses = table.responses(labels, confidence)
+    assert [r["severity"] for r in responses] == ["Low Risk", "High Risk", "Low Risk", "Moderate Risk"]
+    assert responses[0]["message"].startswith("The model is highly confident in a benign diagnosis")
+    # Rows in the same tier share one template
+    assert responses[0] is responses[2]
+
+def test_tiers_are_sorted_and_must_start_at_zero():
+    tier = lambda low, severity: {"min_confidence": low, "severity": severity, "message": "", "recommended_actions": []}
+    table = RiskTable({"malignant": [tier(80, "High"), tier(0, "Low")], "benign": [tier(0, "Low")]})
+    assert severities(table, [MALIGNANT, MALIGNANT], [0.79, 0.8]) == ["Low", "High"]
+
+    with pytest.raises(ValueError, match="must start at min_confidence 0"):
+        RiskTable({"malignant": [tier(50, "High")], "benign": [tier(0, "Low")]})
@@ -0,0 +1,39 @@
+# test_train_model.py
+import train_model
+
+def run_stage(name, func, *args, **kwargs):
+    # train() caches stages with joblib.Memory; the test just runs them
+    return func(*args, **kwargs)
+
+def fitted_split():
+    X, y = train_model.load_data()
+    X_train, X_test, y_train, y_test = train_model.split_data(X, y, train_model.TEST_SIZE, train_model.RANDOM_STATE)
+    scaler = train_model.fit_scaler(X_train)
+    X_train_scaled, X_test_scaled = scaler.transform(X_train), scaler.transform(X_test)
+    model = train_model.fit_final_model(X_train_scaled, y_train, train_model.RANDOM_STATE, n_jobs=1)
+    return model, X_train_scaled, y_train, X_test_scaled, y_test
+
+def test_compress_keeps_full_model_when_no_candidate_passes(monkeypatch):
+    monkeypatch.setattr(train_model, 'COMPRESS_MAX_DEPTHS', (3, None))
+    monkeypatch.setattr(train_model, 'COMPRESS_N_ESTIMATORS', (5, 100))
+    model, X_train, y_train, X_test, y_test = fitted_split()
+
+    kept, report = train_model.compress(run_stage, model, X_train, y_train, X_test, y_test,
+                                        min_accuracy=0.999, n_jobs=1)
+
+    assert kept is model
+    assert report["passing"] == 0
+    assert report["compressed"] is None
+    assert len(report["failed"]) == 1 and report["failed"][0].startswith("accuracy >= 0.9990")
+
+def test_compress_picks_a_passing_candidate(monkeypatch):
+    monkeypatch.setattr(train_model, 'COMPRESS_MAX_DEPTHS', (3, None))
+    monkeypatch.setattr(train_model, 'COMPRESS_N_ESTIMATORS', (5, 100))
+    model, X_train, y_train, X_test, y_test = fitted_split()
+
+    compressed, report = train_model.compress(run_stage, model, X_train, y_train, X_test, y_test,
+                                              min_accuracy=0.9, min_auc=0.9, n_jobs=1)
+
+    assert report["passing"] > 0 and not report["failed"]
+    assert report["compressed"]["accuracy"] >= 0.9
+    assert train_model.node_count(compressed) <= train_model.node_count(model)
@@ -0,0 +1,76 @@
+# test_validation.py
+import json
+
+import numpy as np
+import pytest
+
+from app.predict.validation import FeatureSchema
+
+STATISTICS = {"size": {"min": 0.0, "max": 10.0}, "shift": {"min": -2.0, "max": 2.0}}
+
+def make_schema(margin=0.5):
+    return FeatureSchema(["size", "shift"], STATISTICS, margin)
+
+def test_bounds_widen_the_training_range():
+    schema = make_schema()
+    # A feature never negative in training stays non-negative
+    assert schema.lower == [0.0, -4.0]
+    assert schema.upper == [15.0, 4.0]
+
+def test_a_valid_row_keeps_the_schema_order():
+    row, error = make_schema().parse({"shift": -4.0, "size": 15, "extra": "ignored"})
+    assert error is None
+    assert row.tolist() == [15.0, -4.0]
+
+    out = np.zeros((2, 2))
+    row, _ = make_schema().parse({"size": 1.5, "shift": 0.5}, out=out[1])
+    assert out.tolist() == [[0.0, 0.0], [1.5, 0.5]]
+
+@pytest.mark.parametrize('features, expected', [
+    ([1.0, 2.0], {"error": "Invalid input format", "message": "Each case must be a dictionary of features"}),
+    ({"size": 1.0}, {"error": "Missing features", "missing_features": ["shift"]}),
+    ({"size": "1.0", "shift": None}, {"error": "Invalid feature values",
+                                      "message": "All features must be numerical values",
+                                      "invalid_features": ["size", "shift"]}),
+    ({"size": True, "shift": 0.0}, {"error": "Invalid feature values",
+                                    "message": "All features must be numerical values",
+                                    "invalid_features": ["size"]}),
+    ({"size": float('nan'), "shift": float('-inf')}, {"error": "Invalid feature values",
+                                                      "message": "Feature values must be finite numbers",
+                                                      "invalid_features": ["size", "shift"]}),
+])
+def test_rejection_messages(features, expected):
+    row, error = make_schema().parse(features)
+    assert row is None
+    assert error == expected
+
+def test_out_of_range_values_report_their_bounds():
+    row, error = make_schema().parse({"size": -0.1, "shift": 4.5})
+    assert row is None
+    assert error == {
+        "error": "Feature values out of range",
+        "message": "Values are too far outside the range seen in training",
+        "out_of_range": {
+            "size": {"value": -0.1, "min": 0.0, "max": 15.0},
+            "shift": {"value": 4.5, "min": -4.0, "max": 4.0}
+        }
+    }
+
+def test_without_margin_only_finiteness_is_checked():
+    schema = make_schema(margin=None)
+    assert schema.parse({"size": 1e9, "shift": -1e9})[1] is None
+    assert schema.parse({"size": float('inf'), "shift": 0.0})[1]["message"] == "Feature values must be finite numbers"
+
+def test_accepted_matches_parse():
+    schema = make_schema()
+    matrix = np.array([[15.0, -4.0], [15.01, 0.0], [0.0, np.nan], [-0.1, 0.0], [5.0, 4.0]])
+    assert schema.accepted(matrix).tolist() == [True, False, False, False, True]
+
+def test_schema_of_the_shipped_model():
+    with open('feature_info.json', 'r') as f:
+        feature_info = json.load(f)
+    schema = FeatureSchema.from_feature_info(feature_info)
+    assert schema.features == tuple(feature_info['features'])
+    # The version is a hash of the ordered feature names
+    assert FeatureSchema(reversed(feature_info['features'])).version != schema.version
+    assert len(schema.version) == 8
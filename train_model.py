@@ -1,186 +1,405 @@
 # train_model.py
 
+import argparse
+import copy
+import hashlib
+import json
+import os
+import pickle
+import time
+from datetime import datetime, timezone
+
 import pandas as pd
 import numpy as np
-import json
 import joblib
+import sklearn
+from joblib import Memory
 
 from sklearn.datasets import load_breast_cancer
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import accuracy_score
+from sklearn.metrics import accuracy_score, roc_auc_score
+
+from export_model import export_fused_model
+from app.predict.core import score, diagnose
+from app.predict.engine import ForestEngine
+from app.predict.risk import RiskTable
+
+TEST_SIZE = 0.2
+RANDOM_STATE = 42
+N_TOP_FEATURES = 10
+
+# Artifacts served together; model_manifest.json records their hashes
+ARTIFACTS = ('final_model.pkl', 'scaler_top.pkl', 'feature_info.json')
+DERIVED_ARTIFACTS = ('fused_model.pkl', 'model_arrays')
+MANIFEST_PATH = 'model_manifest.json'
+
+# Compression candidates: depth caps refitted, then tree counts kept from each
+COMPRESS_MAX_DEPTHS = (3, 4, 6, 8, None)
+COMPRESS_N_ESTIMATORS = (5, 10, 20, 30, 50, 75, 100)
 
 # ----------------------------
-# 1. LOAD DATASET AND TRAIN MODEL
+# 1. TRAINING STAGES
 # ----------------------------
+# Each stage only depends on its arguments. train() wraps them in
+# joblib.Memory, which stores each result under a hash of the arguments,
+# so a re-run only recomputes the stages whose inputs changed.
 
-# Load dataset
-data = load_breast_cancer()
-X = pd.DataFrame(data.data, columns=data.feature_names)
-y = data.target
+def load_data():
+    data = load_breast_cancer()
+    X = pd.DataFrame(data.data, columns=data.feature_names)
+    return X, data.target
 
-# Split data into training and test sets
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+def split_data(X, y, test_size, random_state):
+    return train_test_split(X, y, test_size=test_size, random_state=random_state)
 
-# Train an initial model to obtain feature importances
-initial_model = RandomForestClassifier(random_state=42)
-initial_model.fit(X_train, y_train)
+def rank_features(X_train, y_train, random_state, n_jobs=-1):
+    """Feature importances of an initial forest fitted on every feature"""
+    initial_model = RandomForestClassifier(random_state=random_state, n_jobs=n_jobs)
+    initial_model.fit(X_train, y_train)
+    return initial_model.feature_importances_
 
-# Get feature importances and sort indices in descending order
-importances = initial_model.feature_importances_
-indices = np.argsort(importances)[::-1]
+def fit_scaler(X_train_top):
+    return StandardScaler().fit(X_train_top)
 
-# Get top 10 features
-top_features = X.columns[indices][:10].tolist()
+def fit_final_model(X_train_top_scaled, y_train, random_state, n_jobs=-1, max_depth=None):
+    final_model = RandomForestClassifier(random_state=random_state, n_jobs=n_jobs, max_depth=max_depth)
+    final_model.fit(X_train_top_scaled, y_train)
+    # Serving scores one request at a time; a thread pool per call would only add overhead
+    final_model.n_jobs = None
+    return final_model
 
-# Save feature names and (dummy) descriptions
-feature_info = {
-    "features": top_features,
-    "descriptions": {name: f"Description for {name}" for name in top_features},
-    "importance_order": {name: idx + 1 for idx, name in enumerate(top_features)}
-}
-print("Selected Feature Info:")
-print(json.dumps(feature_info, indent=2))
+def truncate_forest(forest, n_estimators):
+    """Copy of a fitted forest that keeps only its first n_estimators trees"""
+    small = copy.copy(forest)
+    small.estimators_ = forest.estimators_[:n_estimators]
+    small.n_estimators = len(small.estimators_)
+    return small
 
-with open('feature_info.json', 'w') as f:
-    json.dump(feature_info, f, indent=2)
+def node_count(forest):
+    return sum(estimator.tree_.node_count for estimator in forest.estimators_)
 
-# Select and scale top features
-X_train_top = X_train[top_features]
-X_test_top = X_test[top_features]
+def row_latency_us(model, X, repeats=500):
+    """Median time to score one row, in microseconds"""
+    row = X[:1]
+    model.predict_proba(row)
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model.predict_proba(row)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times) * 1e6)
 
-scaler_top = StandardScaler()
-X_train_top_scaled = scaler_top.fit_transform(X_train_top)
-X_test_top_scaled = scaler_top.transform(X_test_top)
+def evaluate(model, X_test_scaled, y_test):
+    probabilities = model.predict_proba(X_test_scaled)
+    return {
+        "accuracy": accuracy_score(y_test, model.classes_.take(probabilities.argmax(axis=1))),
+        "auc": roc_auc_score(y_test, probabilities[:, 1])
+    }
 
-# Train final model using the top features
-final_model = RandomForestClassifier(random_state=42)
-final_model.fit(X_train_top_scaled, y_train)
+def compress(stage, final_model, X_train_scaled, y_train, X_test_scaled, y_test,
+             min_accuracy=None, min_auc=None, n_jobs=-1):
+    """Smallest forest that scores at least the floors on the held-out split.
 
-# Evaluate the final model on the test set
-y_pred_final = final_model.predict(X_test_top_scaled)
-accuracy = accuracy_score(y_test, y_pred_final)
-print(f"Model accuracy on test set: {accuracy:.4f}")
+    Candidates are forests refitted with each of COMPRESS_MAX_DEPTHS, keeping
+    the first n trees for each of COMPRESS_N_ESTIMATORS; size is the total
+    node count, which bounds both the artifact size and the engine's work per
+    row. The floors default to the current model's accuracy and AUC. When no
+    candidate meets them, the full model is kept and report["compressed"] is
+    None, with report["failed"] naming the floors nothing reached.
+    Returns (model, report).
+    """
+    baseline = evaluate(final_model, X_test_scaled, y_test)
+    min_accuracy = baseline["accuracy"] if min_accuracy is None else min_accuracy
+    min_auc = baseline["auc"] if min_auc is None else min_auc
 
-# Save model and scaler
-joblib.dump(final_model, 'final_model.pkl')
-joblib.dump(scaler_top, 'scaler_top.pkl')
-print("Model and scaler saved successfully.")
+    candidates = []
+    for max_depth in COMPRESS_MAX_DEPTHS:
+        forest = final_model if max_depth is None else stage(
+            f'compress_depth_{max_depth}', fit_final_model, X_train_scaled, y_train, RANDOM_STATE,
+            n_jobs=n_jobs, max_depth=max_depth)
+        for n_estimators in COMPRESS_N_ESTIMATORS:
+            if n_estimators > len(forest.estimators_):
+                continue
+            model = truncate_forest(forest, n_estimators)
+            metrics = evaluate(model, X_test_scaled, y_test)
+            candidates.append(dict(metrics, model=model, max_depth=max_depth,
+                                   n_estimators=n_estimators, nodes=node_count(model)))
 
-# ----------------------------
-# 2. DEFINE PREDICTION FUNCTION WITH CONFIDENCE & RISK LEVEL
-# ----------------------------
+    passing = [c for c in candidates if c["accuracy"] >= min_accuracy and c["auc"] >= min_auc]
+
+    def describe(model, metrics):
+        engine = ForestEngine.from_sklearn(model)
+        return dict(
+            metrics,
+            n_estimators=len(model.estimators_),
+            max_depth=int(engine.depth),
+            nodes=node_count(model),
+            pickle_bytes=len(pickle.dumps(model)),
+            sklearn_row_us=round(row_latency_us(model, X_test_scaled), 1),
+            engine_row_us=round(row_latency_us(engine, X_test_scaled), 1)
+        )
+
+    report = {
+        "floors": {"accuracy": min_accuracy, "auc": min_auc},
+        "candidates": len(candidates),
+        "passing": len(passing),
+        "baseline": describe(final_model, baseline),
+        "compressed": None,
+        "failed": []
+    }
+    if not passing:
+        for metric, floor in (("accuracy", min_accuracy), ("auc", min_auc)):
+            best_value = max(c[metric] for c in candidates)
+            if best_value < floor:
+                report["failed"].append(f"{metric} >= {floor:.4f} (best candidate: {best_value:.4f})")
+        if not report["failed"]:
+            report["failed"].append("accuracy and AUC floors together")
+        return final_model, report
+
+    best = min(passing, key=lambda c: (c["nodes"], -c["auc"], -c["accuracy"]))
+    report["compressed"] = describe(best["model"], {"accuracy": best["accuracy"], "auc": best["auc"]})
+    return best["model"], report
 
-def get_risk_assessment(pred_class, confidence_pct):
+def build_feature_info(top_features, X_train_top):
+    """Feature names, (dummy) descriptions and training statistics, as saved to feature_info.json.
+
+    The API rejects values too far outside the training min/max (see
+    app/predict/validation.py).
     """
-    Map confidence to risk level and provide an action message.
-    
-    For malignant predictions (class 0):
-      - High Risk: confidence >= 75%
-      - Moderate Risk: 60% <= confidence < 75%
-      - Low Risk: confidence < 60%
-    
-    For benign predictions (class 1), we assume Low Risk.
+    return {
+        "features": top_features,
+        "descriptions": {name: f"Description for {name}" for name in top_features},
+        "importance_order": {name: idx + 1 for idx, name in enumerate(top_features)},
+        "statistics": {
+            name: {
+                "min": float(X_train_top[name].min()),
+                "max": float(X_train_top[name].max()),
+                "mean": float(X_train_top[name].mean()),
+                "std": float(X_train_top[name].std())
+            }
+            for name in top_features
+        }
+    }
+
+def train(cache_dir='.cache/train', n_jobs=-1, compress_model=False, min_accuracy=None, min_auc=None):
+    """Run every stage, reusing cached results; n_jobs does not affect the results.
+
+    With compress_model, the final model is replaced by the smallest forest
+    meeting the accuracy/AUC floors (see compress). Returns a dict with the
+    fitted model and scaler, feature info, the held-out split, the test
+    accuracy, the compression report (or None) and the time spent in each
+    stage.
     """
-    # Note: In the breast cancer dataset, typically:
-    #    0 = malignant, 1 = benign
-    if pred_class == 0:  # malignant
-        if confidence_pct >= 75:
-            risk = "High Risk"
-            message = "High likelihood of malignancy detected. Please consult a doctor immediately."
-            actions = [
-                "Schedule immediate follow-up",
-                "Prepare detailed medical history",
-                "Contact oncology department"
-            ]
-        elif confidence_pct >= 60:
-            risk = "Moderate Risk"
-            message = "The results are borderline. Additional diagnostic tests are advised."
-            actions = [
-                "Consider further imaging and tests",
-                "Review previous medical records",
-                "Consult with a specialist"
-            ]
-        else:
-            risk = "Low Risk"
-            message = "Malignancy probability is lower; however, further monitoring is recommended."
-            actions = [
-                "Schedule regular follow-ups",
-                "Monitor any changes",
-                "Discuss concerns with your physician"
-            ]
-    else:  # benign
-        risk = "Low Risk"
-        message = "The model is highly confident in a benign diagnosis. Routine screening is advised."
-        actions = [
-            "Maintain regular check-ups",
-            "Continue with standard health monitoring"
-        ]
-    return risk, message, actions
-
-def predict_case(input_features):
+    memory = Memory(cache_dir, verbose=0)
+    timings = {}
+
+    def stage(name, func, *args, **kwargs):
+        start = time.perf_counter()
+        ignore = ['n_jobs'] if 'n_jobs' in kwargs else None
+        result = memory.cache(func, ignore=ignore)(*args, **kwargs)
+        timings[name] = round(time.perf_counter() - start, 3)
+        return result
+
+    X, y = stage('load', load_data)
+    X_train, X_test, y_train, y_test = stage('split', split_data, X, y, TEST_SIZE, RANDOM_STATE)
+
+    importances = stage('rank', rank_features, X_train, y_train, RANDOM_STATE, n_jobs=n_jobs)
+    indices = np.argsort(importances)[::-1]
+    top_features = X.columns[indices][:N_TOP_FEATURES].tolist()
+
+    X_train_top = X_train[top_features]
+    X_test_top = X_test[top_features]
+    scaler_top = stage('scale', fit_scaler, X_train_top)
+    X_train_top_scaled = scaler_top.transform(X_train_top)
+    X_test_top_scaled = scaler_top.transform(X_test_top)
+
+    final_model = stage('fit', fit_final_model, X_train_top_scaled, y_train, RANDOM_STATE, n_jobs=n_jobs)
+    compression = None
+    if compress_model:
+        final_model, compression = compress(stage, final_model, X_train_top_scaled, y_train,
+                                            X_test_top_scaled, y_test, min_accuracy, min_auc, n_jobs)
+    accuracy = accuracy_score(y_test, final_model.predict(X_test_top_scaled))
+
+    return {
+        "final_model": final_model,
+        "scaler_top": scaler_top,
+        "feature_info": build_feature_info(top_features, X_train_top),
+        "X_test_top": X_test_top,
+        "y_test": y_test,
+        "accuracy": accuracy,
+        "compression": compression,
+        "timings": timings
+    }
+
+# ----------------------------
+# 2. SAVE ARTIFACTS WITH A MANIFEST
+# ----------------------------
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def artifact_hashes(paths):
+    """sha256 of every file, expanding directories"""
+    hashes = {}
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                hashes[f"{path}/{name}"] = file_sha256(os.path.join(path, name))
+        elif os.path.exists(path):
+            hashes[path] = file_sha256(path)
+    return hashes
+
+def training_digest(result):
+    """Content hash of what would be written: model, scaler and feature info"""
+    return joblib.hash([result["final_model"], result["scaler_top"], result["feature_info"]])
+
+def artifacts_current(manifest_path, digest):
+    """True when the manifest was written for `digest` and no artifact changed since"""
+    if not os.path.exists(manifest_path):
+        return False
+    with open(manifest_path, 'r') as f:
+        manifest = json.load(f)
+    if manifest.get("training_digest") != digest:
+        return False
+    recorded = dict(manifest.get("artifacts", {}), **manifest.get("derived_artifacts", {}))
+    return artifact_hashes(ARTIFACTS + DERIVED_ARTIFACTS) == recorded
+
+def save_artifacts(result, manifest_path=MANIFEST_PATH):
+    """Write the model, scaler, feature info and their fused export, then the manifest"""
+    joblib.dump(result["final_model"], 'final_model.pkl')
+    joblib.dump(result["scaler_top"], 'scaler_top.pkl')
+    with open('feature_info.json', 'w') as f:
+        json.dump(result["feature_info"], f, indent=2)
+    print("Model and scaler saved successfully.")
+
+    # Fold the scaler into the split thresholds for serving and write the
+    # memory-mappable model_arrays/ export next to the pickle (see export_model.py)
+    export_fused_model('final_model.pkl', 'scaler_top.pkl', 'feature_info.json', 'fused_model.pkl', 'model_arrays')
+
+    manifest = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "sklearn_version": sklearn.__version__,
+        "params": {"test_size": TEST_SIZE, "random_state": RANDOM_STATE, "n_top_features": N_TOP_FEATURES},
+        "metrics": {"accuracy": result["accuracy"]},
+        "compression": result["compression"],
+        "training_digest": training_digest(result),
+        "artifacts": artifact_hashes(ARTIFACTS),
+        "derived_artifacts": artifact_hashes(DERIVED_ARTIFACTS)
+    }
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+    print(f"Manifest written to {manifest_path}")
+
+# ----------------------------
+# 3. DEFINE PREDICTION FUNCTION WITH CONFIDENCE & RISK LEVEL
+# ----------------------------
+
+# Risk tiers shared with the API (see app/predict/risk.py)
+risk_table = RiskTable.load('risk_tiers.json')
+
+def predict_case(input_features, final_model, scaler_top, top_features):
     """
     Given a dictionary of input features, scale them,
     generate a prediction with confidence and risk assessment.
-    
+
     If any feature is missing, fill it with the training mean.
     """
     # Create a DataFrame with the expected columns (top_features)
     df_input = pd.DataFrame([input_features], columns=top_features)
-    
+
     # Check for missing features (columns with NaN) and fill them with training mean from scaler_top
     missing_features = df_input.columns[df_input.isnull().any()].tolist()
     if missing_features:
         fill_values = {feature: scaler_top.mean_[i] for i, feature in enumerate(top_features) if feature in missing_features}
         df_input.fillna(fill_values, inplace=True)
-    
-    # Scale features
-    scaled_input = scaler_top.transform(df_input)
-    
-    # Get prediction probabilities from the trained model
-    proba = final_model.predict_proba(scaled_input)[0]
-    # The model's classes: 0 -> malignant, 1 -> benign
-    pred_class = np.argmax(proba)
-    confidence_pct = round(proba[pred_class] * 100, 1)
-    diagnosis = "Malignant" if pred_class == 0 else "Benign"
-    risk, message, actions = get_risk_assessment(pred_class, confidence_pct)
-    
+
+    # One predict_proba pass; label and confidence are derived from it
+    _, labels, confidence = score(final_model, df_input, scaler_top)
+    confidence_pct = round(confidence[0] * 100, 1)
+    diagnosis = diagnose(labels)[0].capitalize()
+    risk = risk_table.responses(labels, confidence)[0]
+
     result = {
         "Diagnosis": diagnosis,
         "Confidence": f"{confidence_pct}%",
-        "Severity": risk,
-        "Message": message,
-        "Recommended Actions": actions
+        "Severity": risk["severity"],
+        "Message": risk["message"],
+        "Recommended Actions": risk["recommended_actions"]
     }
     return result
 
-# ----------------------------
-# 3. TEST ON 10 CASES FROM X_TEST WITH GROUND TRUTH COMPARISON
-# ----------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the model and write the serving artifacts")
+    parser.add_argument('--cache-dir', default='.cache/train',
+                        help="joblib.Memory cache of the training stages ('' to disable)")
+    parser.add_argument('--n-jobs', type=int, default=-1, help="Cores used to fit the forests")
+    parser.add_argument('--force', action='store_true', help="Rewrite the artifacts even if unchanged")
+    parser.add_argument('--compress', action='store_true',
+                        help="Ship the smallest forest that keeps the accuracy/AUC of the full one")
+    parser.add_argument('--min-accuracy', type=float, help="Accuracy floor for --compress (default: full model's)")
+    parser.add_argument('--min-auc', type=float, help="ROC-AUC floor for --compress (default: full model's)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    result = train(args.cache_dir or None, args.n_jobs, args.compress, args.min_accuracy, args.min_auc)
+    final_model = result["final_model"]
+    scaler_top = result["scaler_top"]
+    top_features = result["feature_info"]["features"]
+
+    print("Selected Feature Info:")
+    print(json.dumps(result["feature_info"], indent=2))
+    print(f"Model accuracy on test set: {result['accuracy']:.4f}")
+    print(f"Stage timings (s): {result['timings']}")
+    if result["compression"]:
+        report = result["compression"]
+        print(f"Compression: {report['passing']} of {report['candidates']} candidates meet "
+              f"accuracy >= {report['floors']['accuracy']:.4f} and AUC >= {report['floors']['auc']:.4f}")
+        if report["compressed"] is None:
+            print(f"No candidate meets {', '.join(report['failed'])}; keeping the uncompressed model.")
+        else:
+            print(pd.DataFrame([report["baseline"], report["compressed"]],
+                               index=["baseline", "compressed"]).to_string())
+
+    if not args.force and artifacts_current(MANIFEST_PATH, training_digest(result)):
+        print(f"Artifacts unchanged since {MANIFEST_PATH} was written; nothing to save.")
+    else:
+        save_artifacts(result)
+    print(f"Done in {time.perf_counter() - start:.1f}s")
+
+    # ----------------------------
+    # 4. TEST ON 10 CASES FROM X_TEST WITH GROUND TRUTH COMPARISON
+    # ----------------------------
+
+    print("\n--- Testing 10 Cases from X_test ---")
+
+    # Convert y_test to a list for easy lookup (the order is maintained from train_test_split)
+    y_test_list = result["y_test"].tolist()
+
+    for i in range(10):
+        # Extract the i-th row from the original X_test_top DataFrame
+        input_case = result["X_test_top"].iloc[i].to_dict()
+
+        # Get prediction results for the input case
+        prediction = predict_case(input_case, final_model, scaler_top, top_features)
+
+        # Map ground truth: 0 -> "Malignant", 1 -> "Benign"
+        ground_truth = y_test_list[i]
+        gt_label = "Malignant" if ground_truth == 0 else "Benign"
+
+        # Add ground truth to prediction output and compare with predicted label
+        prediction["Ground Truth"] = gt_label
+        prediction["Correct Prediction"] = (prediction["Diagnosis"] == gt_label)
 
-print("\n--- Testing 10 Cases from X_test ---")
-
-# Convert y_test to a list for easy lookup (the order is maintained from train_test_split)
-y_test_list = y_test.tolist()
-
-for i in range(10):
-    # Extract the i-th row from the original X_test_top DataFrame
-    input_case = X_test_top.iloc[i].to_dict()
-    
-    # Get prediction results for the input case
-    prediction = predict_case(input_case)
-    
-    # Map ground truth: 0 -> "Malignant", 1 -> "Benign"
-    ground_truth = y_test_list[i]
-    gt_label = "Malignant" if ground_truth == 0 else "Benign"
-    
-    # Add ground truth to prediction output and compare with predicted label
-    prediction["Ground Truth"] = gt_label
-    prediction["Correct Prediction"] = (prediction["Diagnosis"] == gt_label)
-    
-    print(f"\nTest Case {i+1}:")
-    print("Input Features:")
-    print(json.dumps(input_case, indent=2))
-    print("Prediction Results:")
-    print(json.dumps(prediction, indent=2))
+        print(f"\nTest Case {i+1}:")
+        print("Input Features:")
+        print(json.dumps(input_case, indent=2))
+        print("Prediction Results:")
+        print(json.dumps(prediction, indent=2))